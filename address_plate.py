@@ -1,35 +1,142 @@
-from argparse import ArgumentParser
-from address_plate.pdf_maker import street_name_pdf, house_number_pdf, vertical_pdf
+from argparse import ArgumentParser, BooleanOptionalAction
+import os
 import sys
 
+# reportlab, cairo и шрифты импортируются в обработчиках, --help и ошибки аргументов их не ждут
+
+
+def check_fields(args, kind: str, **fields):
+    """ номера домов и поля до рендера: ошибка одной строкой, как у batch, а не traceback
+
+    """
+    from address_plate.plate_spec import SpecError, spec_from_dict
+
+    try:
+        spec_from_dict(dict(fields, kind=kind, wide='wide' if args.wide else 'thin'))
+    except SpecError as e:
+        sys.exit(str(e))
+
+
+def png_preview(args, kind: str, **fields):
+    from address_plate.plate_spec import PlateSpec
+    from address_plate.raster import render_png
+
+    render_png(PlateSpec(kind, 'wide' if args.wide else 'thin', **fields), args.png, sys.stdout.buffer)
+
 
 def street_name(args):
-    pdf, file_name = street_name_pdf(street_type=args.type, street_name=args.name,
-                                     street_translit=args.translit,
-                                     wide='wide' if args.wide else 'thin')
-    sys.stdout = sys.stdout.detach()
-    sys.stdout.write(pdf.read())
+    from address_plate.pdf_maker import street_name_pdf
+
+    check_fields(args, 'name', type=args.type, name=args.name, translit=args.translit)
+    if args.png:
+        return png_preview(args, 'name', type=args.type, name=args.name, translit=args.translit)
+    street_name_pdf(street_type=args.type, street_name=args.name, street_translit=args.translit,
+                    wide='wide' if args.wide else 'thin', glyph_forms=bool(args.glyph_forms),
+                    profile=args.output_profile, output=sys.stdout.buffer)
 
 
 def house_number(args):
-    pdf, file_name = house_number_pdf(house_num=args.number, left_num=args.left, right_num=args.right,
-                                      wide='wide' if args.wide else 'thin')
-    sys.stdout = sys.stdout.detach()
-    sys.stdout.write(pdf.read())
+    from address_plate.pdf_maker import house_number_pdf
+
+    check_fields(args, 'number', number=args.number, left=args.left, right=args.right)
+    if args.png:
+        return png_preview(args, 'number', number=args.number, left=args.left, right=args.right)
+    house_number_pdf(house_num=args.number, left_num=args.left, right_num=args.right,
+                     wide='wide' if args.wide else 'thin', glyph_forms=bool(args.glyph_forms),
+                     profile=args.output_profile, output=sys.stdout.buffer)
 
 
 def vertical(args):
-    pdf, file_name = vertical_pdf(street_type=args.type, street_name=args.name,
-                                  street_translit=args.translit, house_num=args.number,
-                                  wide='wide' if args.wide else 'thin')
-    sys.stdout = sys.stdout.detach()
-    sys.stdout.write(pdf.read())
+    from address_plate.pdf_maker import vertical_pdf
+
+    check_fields(args, 'vertical', type=args.type, name=args.name, translit=args.translit, number=args.number)
+    if args.png:
+        return png_preview(args, 'vertical', type=args.type, name=args.name, translit=args.translit,
+                           number=args.number)
+    vertical_pdf(street_type=args.type, street_name=args.name, street_translit=args.translit,
+                 house_num=args.number, wide='wide' if args.wide else 'thin', glyph_forms=bool(args.glyph_forms),
+                 profile=args.output_profile, output=sys.stdout.buffer)
+
+
+def batch(args):
+    if args.check:
+        from address_plate.plate_spec import validate_manifest
+
+        errors = validate_manifest(args.manifest, 'wide' if args.wide else 'thin')
+        for row_number, error in errors:
+            print(f'{args.manifest}:{row_number}: {error}', file=sys.stderr)
+        print(f'{len(errors)} bad rows')
+        sys.exit(1 if errors else 0)
+
+    from address_plate.batch import run_batch
+
+    if not args.output and not args.document and not args.sheets:
+        sys.exit('batch: one of --output, --document, --sheets or --check is required')
+    if (args.incremental or args.dry_run or args.prune or args.verify) and not args.output:
+        sys.exit('batch: --incremental, --dry-run, --prune and --verify work with --output only')
+    sheet = None
+    if args.sheets:
+        from address_plate.imposition import parse_sheet
+
+        try:
+            sheet = parse_sheet(args.sheet, args.sheet_margin, args.gap)
+        except ValueError as e:
+            sys.exit(f'batch: {e}')
+    summary = run_batch(args.manifest, args.output, wide='wide' if args.wide else 'thin', document=args.document,
+                        workers=args.workers, chunksize=args.chunksize, glyph_forms=args.glyph_forms,
+                        profile=args.output_profile, sheets=args.sheets, sheet=sheet, rotate=args.rotate,
+                        incremental=args.incremental, prune=args.prune, dry_run=args.dry_run, verify=args.verify)
+    print(summary)
+    if summary.failed:
+        sys.exit(1)
+
+
+def atlas(args):
+    from address_plate.atlas import AtlasError, GlyphAtlas, build_atlas, is_current
+    from address_plate.pdf_maker import FONT_FACE
+
+    if args.check:
+        current = is_current(FONT_FACE, args.atlas)
+        print('up to date' if current else 'missing or stale')
+        sys.exit(0 if current else 1)
+    try:
+        path = build_atlas(FONT_FACE, args.atlas)
+        glyph_atlas = GlyphAtlas(path)
+    except (OSError, AtlasError) as e:
+        sys.exit(f'atlas: {e}')
+    glyphs = sum(face.num_glyphs for face in glyph_atlas.faces.values())
+    print(f'{path}: {len(glyph_atlas)} fonts, {glyphs} glyphs, {os.path.getsize(path) / 1024:.0f} KB')
+
+
+def serve(args):
+    from address_plate.server import run_server
+
+    run_server(args.host, args.port, workers=args.workers, executor=args.executor,
+               max_concurrency=args.max_concurrency, max_queue=args.max_queue,
+               wide='wide' if args.wide else 'thin')
 
 
 def main():
     parser = ArgumentParser()
 
     parser.add_argument('--wide', help='Wide', action='store_true')
+    parser.add_argument('--outline-backend', help='Glyph outlines from cairo, straight from the .ttf files or from '
+                                                  'the glyph atlas (see atlas)', choices=('cairo', 'truetype', 'atlas'))
+    parser.add_argument('--output-profile', help='PDF compression, coordinate rounding and reproducibility',
+                        choices=('default', 'compact', 'archive', 'plain'), default='default')
+    parser.add_argument('--cache', help='Directory for finished plates, repeated plates are read instead of rendered',
+                        type=str)
+    parser.add_argument('--cache-max-mb', help='Cache size limit, least recently used plates are removed',
+                        type=float)
+    parser.add_argument('--cache-max-days', help='Remove plates not used for so many days', type=float)
+    parser.add_argument('--profile', help='Print time per render stage to stderr (this process only, '
+                                          'not batch --workers processes)', action='store_true')
+    parser.add_argument('--glyph-forms', help='Each glyph once as a form XObject, smaller multi-page documents '
+                                              '(on by default for batch --sheets)', action=BooleanOptionalAction)
+    parser.add_argument('--png', help='name, number, vertical: PNG preview at this DPI instead of pdf', type=float,
+                        metavar='DPI')
+    parser.add_argument('--layout', help='JSON file with plate sizes and fonts, variants not in it stay default',
+                        type=str)
 
     sub_parser = parser.add_subparsers(title='Address plate', description='Address plate description')
 
@@ -52,8 +159,79 @@ def main():
     vertical_parser.add_argument('--number', help='House number', type=str, required=True)
     vertical_parser.set_defaults(func=vertical)
 
+    batch_parser = sub_parser.add_parser('batch', help='Many plates from CSV or JSONL manifest')
+    batch_parser.add_argument('manifest', help='CSV or JSONL: kind,wide,type,name,translit,number,left,right,file',
+                              type=str)
+    batch_parser.add_argument('--output', help='Output directory, pdf per plate', type=str)
+    batch_parser.add_argument('--document', help='One pdf file, page per plate', type=str)
+    batch_parser.add_argument('--workers', help='Worker processes for --output, 0 - all cores', type=int)
+    batch_parser.add_argument('--chunksize', help='Plates per worker task', type=int, default=16)
+    batch_parser.add_argument('--sheets', help='One pdf, plates packed on print sheets with cut marks, page per sheet',
+                              type=str)
+    batch_parser.add_argument('--sheet', help='Sheet size for --sheets, mm', type=str, default='2500x1250')
+    batch_parser.add_argument('--sheet-margin', help='Sheet edge left empty, mm', type=float, default=10.0)
+    batch_parser.add_argument('--gap', help='Space between plates for the cut, mm', type=float, default=4.0)
+    batch_parser.add_argument('--rotate', help='Turn plates that fit on the sheet only turned', action='store_true')
+    batch_parser.add_argument('--check', help='Only validate the manifest (kinds, fields, house numbers), no pdf',
+                              action='store_true')
+    batch_parser.add_argument('--incremental', help='--output: render only plates added or changed since the last '
+                                                    'build, skip the rest', action='store_true')
+    batch_parser.add_argument('--dry-run', help='--output: print what --incremental would render, move and remove',
+                              action='store_true')
+    batch_parser.add_argument('--prune', help='--incremental: delete pdf of plates gone from the manifest',
+                              action='store_true')
+    batch_parser.add_argument('--verify', help='--incremental: compare unchanged files by sha256, not only size',
+                              action='store_true')
+    batch_parser.set_defaults(func=batch)
+
+    serve_parser = sub_parser.add_parser('serve', help='HTTP service: /name, /number, /vertical, /health')
+    serve_parser.add_argument('--host', help='Listen address', type=str, default='127.0.0.1')
+    serve_parser.add_argument('--port', help='Listen port', type=int, default=8000)
+    serve_parser.add_argument('--workers', help='Render processes/threads, default all cores', type=int)
+    serve_parser.add_argument('--executor', help='Render in processes (parallel) or threads (one shared cache)',
+                              choices=('process', 'thread'), default='process')
+    serve_parser.add_argument('--max-concurrency', help='Renders at once, default --workers', type=int)
+    serve_parser.add_argument('--max-queue', help='Requests waiting for a render, more get 503', type=int,
+                              default=64)
+    serve_parser.set_defaults(func=serve)
+
+    atlas_parser = sub_parser.add_parser('atlas', help='Build the glyph atlas of all fonts for --outline-backend atlas')
+    atlas_parser.add_argument('--atlas', help='Atlas file, default ADDRESS_PLATE_ATLAS or address_plate/fonts/'
+                                              'glyph_atlas.bin', type=str)
+    atlas_parser.add_argument('--check', help='Only tell if the atlas is missing or built from other fonts',
+                              action='store_true')
+    atlas_parser.set_defaults(func=atlas)
+
     args = parser.parse_args()
-    args.func(args)
+    if args.outline_backend:
+        # через окружение, чтобы дошло и до процессов batch --workers
+        os.environ['ADDRESS_PLATE_OUTLINE_BACKEND'] = args.outline_backend
+    if args.layout:
+        os.environ['ADDRESS_PLATE_LAYOUT'] = args.layout
+        from address_plate.layout import LayoutError, load_layout
+
+        try:
+            load_layout(args.layout)  # ошибки файла до рендера, шрифты проверит pdf_maker
+        except (OSError, LayoutError) as e:
+            sys.exit(f'--layout: {e}')
+    if args.cache:
+        os.environ['ADDRESS_PLATE_CACHE_DIR'] = args.cache
+        if args.cache_max_mb is not None:
+            os.environ['ADDRESS_PLATE_CACHE_MAX_MB'] = str(args.cache_max_mb)
+        if args.cache_max_days is not None:
+            os.environ['ADDRESS_PLATE_CACHE_MAX_DAYS'] = str(args.cache_max_days)
+    if not args.profile:
+        args.func(args)
+        return
+
+    from address_plate import instrument
+
+    recorder = instrument.enable()
+    try:
+        args.func(args)
+    finally:
+        instrument.disable()
+        print(recorder.report(), file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -62,6 +240,19 @@ if __name__ == '__main__':
 # python address_plate.py --wide vertical --type 'улица' --name 'street name' --translit translit --number '25/3А' > test.pdf
 # python address_plate.py name --type 'проспект' --name 'Название узкой улицы' --translit translit  > test.pdf
 # python address_plate.py number --number '25/3А' --left 23А > test.pdf
+# python address_plate.py --wide batch plates.csv --output out/
+# python address_plate.py batch street.csv --document street.pdf
+# python address_plate.py batch city.csv --output out/ --workers 0
+# python address_plate.py --outline-backend truetype number --number '12' > 12.pdf
+# python address_plate.py atlas && python address_plate.py --outline-backend atlas batch city.csv --output out/
+# python address_plate.py --glyph-forms batch city.csv --document city.pdf
+# python address_plate.py --output-profile archive batch city.csv --output out/
+# python address_plate.py serve --port 8000 --workers 4
+# python address_plate.py --profile batch city.csv --output out/
+# python address_plate.py --cache ~/.cache/address_plate --cache-max-mb 2048 batch city.csv --output out/
+# python address_plate.py --layout municipal.json number --number '12' > 12.pdf
+# python address_plate.py batch city.csv --check
+# python address_plate.py batch city.csv --output out/ --incremental --prune
 
 # python address_plate.py vertical --type 'вулиця' --name 'Омеляновича-Павленка' --translit 'Omelyanovycha-Pavlenka vulytsia' --number '25' > Омеляновича-Павленка25.pdf
 # python address_plate.py name --type 'вулиця' --name 'Хорива' --translit 'Khoryva vulytsia'  > Хорива.pdf
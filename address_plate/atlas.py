@@ -0,0 +1,346 @@
+""" контуры и метрики всех глифов FONT_FILES одним бинарным файлом, читается через mmap
+
+собирается один раз (python address_plate.py atlas) из .ttf через truetype.py: кривые уже кубические,
+в единицах шрифта, y вниз; процесс только отображает файл в память - без разбора шрифтов и без FreeType,
+страницы файла общие у всех процессов пула через page cache, Outline глифа - memoryview в файл без копии
+
+формат (little-endian, секции выровнены на 8):
+    заголовок: MAGIC, ATLAS_VERSION, число шрифтов
+    запись шрифта: имя, sha256 файла шрифта, faceindex, units_per_em, числа символов, глифов и пар kern,
+        смещения секций
+    секции шрифта: codepoints 'I' (по возрастанию) и glyph_ids 'I' - cmap;
+        metrics 'd' - advance, x1, y1, x2, y2 на глиф (x1 = nan - глиф без контура);
+        op_index, coord_index 'I' - начало контура глифа в ops и coords (глифов + 1);
+        ops 'B' - PATH_*, coords 'd'; kern_keys 'I' (left << 16 | right, по возрастанию), kern_values 'i'
+
+atlas = GlyphAtlas('address_plate/fonts/glyph_atlas.bin'); face = atlas['bold']
+face.outline(face.glyph_id('А'))  # Outline в единицах шрифта, без копии
+"""
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+import hashlib
+import math
+import mmap
+import os
+import pathlib
+import struct
+import sys
+import tempfile
+
+from .glyph_cache import PATH_MOVE_TO, PATH_LINE_TO, PATH_CURVE_TO, PATH_CLOSE_PATH
+from .outline import Outline
+from .truetype import SEG_MOVE, SEG_LINE, SEG_QUAD
+
+MAGIC = b'APATLAS\0'
+ATLAS_VERSION = 1
+
+# ADDRESS_PLATE_ATLAS - другой файл атласа
+DEFAULT_ATLAS = str(pathlib.Path(__file__).parent.joinpath('fonts', 'glyph_atlas.bin'))
+
+_HEADER = struct.Struct('<8sHH4x')
+_FACE = struct.Struct('<32s32sIIIII4x9Q')
+# секции записи шрифта по порядку смещений
+_SECTIONS = ('codepoints', 'glyph_ids', 'metrics', 'op_index', 'coord_index', 'ops', 'coords', 'kern_keys',
+             'kern_values')
+_TYPECODES = ('I', 'I', 'd', 'I', 'I', 'B', 'd', 'I', 'i')
+
+_NO_INK = float('nan')
+
+
+class AtlasError(ValueError):
+    pass
+
+
+AtlasFaceRecord = namedtuple('AtlasFaceRecord', ('name', 'sha256', 'faceindex', 'units_per_em', 'chars', 'glyphs',
+                                                 'kern_pairs', 'offsets'))
+AtlasFaceRecord.__doc__ = """запись шрифта из заголовка атласа, sha256 - hex файла шрифта, из которого собран"""
+
+
+def atlas_path() -> str:
+    return os.environ.get('ADDRESS_PLATE_ATLAS') or DEFAULT_ATLAS
+
+
+def _sha256_file(filename) -> str:
+    return hashlib.sha256(pathlib.Path(filename).read_bytes()).hexdigest()
+
+
+def _font_source(font_files, face: str) -> tuple:
+    """ (filename, faceindex) как у TrueTypeBackend
+
+    """
+    if isinstance(font_files, dict):
+        return font_files[face], 0
+    return font_files.files[face], font_files.faceindex(face)
+
+
+def _face_sections(face: str, font_files) -> tuple:
+    """ массивы секций одного шрифта
+
+    :return: (TrueTypeFont, {section: array})
+    """
+    from .outline_backend import TrueTypeBackend
+
+    backend = TrueTypeBackend(font_files)
+    font = backend.font(face)
+
+    cmap = sorted((ord(char), glyph_id) for char, glyph_id in font.cmap.items())
+    metrics = array('d')
+    op_index = array('I', [0])
+    coord_index = array('I', [0])
+    ops = array('B')
+    coords = array('d')
+    for glyph_id in range(font.num_glyphs):
+        bounds = backend._units_bounds(face, font, glyph_id)
+        if bounds:
+            x1, y1, x2, y2 = bounds
+            metrics.extend((font.advance(glyph_id), x1, -y2, x2, -y1))
+        else:
+            metrics.extend((font.advance(glyph_id), _NO_INK, _NO_INK, _NO_INK, _NO_INK))
+
+        # как TrueTypeBackend.glyph, только без масштаба
+        x0 = y0 = 0.0
+        for seg in font.outline(glyph_id):
+            op = seg[0]
+            if op == SEG_MOVE or op == SEG_LINE:
+                x0, y0 = float(seg[1]), float(-seg[2])
+                ops.append(PATH_MOVE_TO if op == SEG_MOVE else PATH_LINE_TO)
+                coords.extend((x0, y0))
+            elif op == SEG_QUAD:
+                cx, cy = seg[1], -seg[2]
+                x, y = float(seg[3]), float(-seg[4])
+                ops.append(PATH_CURVE_TO)
+                coords.extend((x0 + 2 / 3 * (cx - x0), y0 + 2 / 3 * (cy - y0),
+                               x + 2 / 3 * (cx - x), y + 2 / 3 * (cy - y),
+                               x, y))
+                x0, y0 = x, y
+            else:
+                ops.append(PATH_CLOSE_PATH)
+        op_index.append(len(ops))
+        coord_index.append(len(coords))
+
+    kerning = sorted(((left << 16) | right, value) for (left, right), value in font.kerning().items())
+    sections = {
+        'codepoints': array('I', [codepoint for codepoint, _ in cmap]),
+        'glyph_ids': array('I', [glyph_id for _, glyph_id in cmap]),
+        'metrics': metrics,
+        'op_index': op_index,
+        'coord_index': coord_index,
+        'ops': ops,
+        'coords': coords,
+        'kern_keys': array('I', [key for key, _ in kerning]),
+        'kern_values': array('i', [value for _, value in kerning]),
+    }
+    return font, sections
+
+
+def build_atlas(font_files, path: str = None) -> str:
+    """ атлас всех глифов всех шрифтов font_files, запись через временный файл и os.replace
+
+    :param font_files: FontManager (files + faceindex) or {face: filename}
+    :param path: default atlas_path()
+    :return: path
+    """
+    path = pathlib.Path(path or atlas_path())
+    faces = sorted(font_files)
+    records = []
+    chunks = []
+    position = _HEADER.size + _FACE.size * len(faces)
+    for face in faces:
+        name = face.encode()
+        if len(name) > 32:
+            raise AtlasError(f'{face}: font name longer than 32 bytes')
+        filename, faceindex = _font_source(font_files, face)
+        font, sections = _face_sections(face, font_files)
+        offsets = []
+        for section in _SECTIONS:
+            values = sections[section]
+            if sys.byteorder != 'little':
+                values.byteswap()
+            position += -position % 8
+            offsets.append(position)
+            chunks.append((position, values.tobytes()))
+            position += len(values) * values.itemsize
+        records.append(_FACE.pack(name, bytes.fromhex(_sha256_file(filename)), faceindex, font.units_per_em,
+                                  len(sections['codepoints']), font.num_glyphs, len(sections['kern_keys']),
+                                  *offsets))
+
+    data = bytearray(position)
+    data[:_HEADER.size] = _HEADER.pack(MAGIC, ATLAS_VERSION, len(faces))
+    for i, record in enumerate(records):
+        start = _HEADER.size + _FACE.size * i
+        data[start:start + _FACE.size] = record
+    for start, chunk in chunks:
+        data[start:start + len(chunk)] = chunk
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return str(path)
+
+
+class AtlasFace:
+    """ один шрифт атласа: cmap, метрики, контуры и kern - memoryview в отображенный файл
+
+    всё в единицах шрифта, y вниз (как у cairo, масштаб size / units_per_em)
+    """
+
+    def __init__(self, buffer: memoryview, record: AtlasFaceRecord):
+        self.record = record
+        self.name = record.name
+        self.units_per_em = record.units_per_em
+        self.num_glyphs = record.glyphs
+        lengths = (record.chars, record.chars, 5 * record.glyphs, record.glyphs + 1, record.glyphs + 1, None, None,
+                   record.kern_pairs, record.kern_pairs)
+        self._sections = dict(zip(_SECTIONS, zip(record.offsets, _TYPECODES, lengths)))
+        self._buffer = buffer
+        self._codepoints = self._view('codepoints')
+        self._glyph_ids = self._view('glyph_ids')
+        self._metrics = self._view('metrics')
+        self._op_index = self._view('op_index')
+        self._coord_index = self._view('coord_index')
+        self._ops = self._view('ops', self._op_index[-1])
+        self._coords = self._view('coords', self._coord_index[-1])
+        self._kern_keys = self._view('kern_keys')
+        self._kern_values = self._view('kern_values')
+
+    def _view(self, section: str, length: int = None) -> memoryview:
+        offset, typecode, known = self._sections[section]
+        length = known if length is None else length
+        size = struct.calcsize(typecode)
+        if offset + length * size > len(self._buffer):
+            raise AtlasError(f'{self.name}: {section} out of the atlas file')
+        return self._buffer[offset:offset + length * size].cast(typecode)
+
+    def glyph_id(self, char: str) -> int:
+        """ 0 (.notdef) for chars missing in the font, как TrueTypeFont
+
+        """
+        codepoint = ord(char)
+        i = bisect_left(self._codepoints, codepoint)
+        if i < len(self._codepoints) and self._codepoints[i] == codepoint:
+            return self._glyph_ids[i]
+        return 0
+
+    def advance(self, glyph_id: int) -> float:
+        return self._metrics[5 * glyph_id]
+
+    def extents(self, glyph_id: int):
+        """ (x1, y1, x2, y2) контура с экстремумами кривых или None
+
+        """
+        i = 5 * glyph_id
+        x1 = self._metrics[i + 1]
+        if math.isnan(x1):
+            return None
+        return x1, self._metrics[i + 2], self._metrics[i + 3], self._metrics[i + 4]
+
+    def outline(self, glyph_id: int) -> Outline:
+        """ контур без копирования: ops и coords - срезы отображенного файла
+
+        """
+        ops = self._ops[self._op_index[glyph_id]:self._op_index[glyph_id + 1]]
+        coords = self._coords[self._coord_index[glyph_id]:self._coord_index[glyph_id + 1]]
+        return Outline(ops, coords, self.extents(glyph_id), (self.advance(glyph_id), 0.0))
+
+    def kerning(self, left: int, right: int) -> int:
+        """ поправка kern пары глифов, 0 если её нет
+
+        """
+        key = (left << 16) | right
+        i = bisect_left(self._kern_keys, key)
+        if i < len(self._kern_keys) and self._kern_keys[i] == key:
+            return self._kern_values[i]
+        return 0
+
+
+class GlyphAtlas:
+    """ файл build_atlas(), отображенный в память только для чтения
+
+    atlas[face] -> AtlasFace; файл не закрывается, пока живы контуры из него
+    """
+
+    def __init__(self, path: str = None):
+        self.path = str(path or atlas_path())
+        if sys.byteorder != 'little':
+            raise AtlasError('glyph atlas is little-endian only')
+        try:
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise AtlasError(f'{self.path}: {e}, build it with: python address_plate.py atlas') from e
+        buffer = memoryview(self._mmap)
+        if len(buffer) < _HEADER.size:
+            raise AtlasError(f'{self.path}: not a glyph atlas')
+        magic, version, count = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise AtlasError(f'{self.path}: not a glyph atlas')
+        if version != ATLAS_VERSION:
+            raise AtlasError(f'{self.path}: atlas version {version}, expected {ATLAS_VERSION}, rebuild it')
+        if len(buffer) < _HEADER.size + _FACE.size * count:
+            raise AtlasError(f'{self.path}: truncated atlas')
+
+        self.header = bytes(buffer[:_HEADER.size + _FACE.size * count])
+        self.faces = {}
+        for i in range(count):
+            name, sha256, faceindex, units_per_em, chars, glyphs, kern_pairs, *offsets = \
+                _FACE.unpack_from(buffer, _HEADER.size + _FACE.size * i)
+            record = AtlasFaceRecord(name.rstrip(b'\0').decode(), sha256.hex(), faceindex, units_per_em, chars,
+                                     glyphs, kern_pairs, tuple(offsets))
+            self.faces[record.name] = AtlasFace(buffer, record)
+
+    def __getitem__(self, face: str) -> AtlasFace:
+        try:
+            return self.faces[face]
+        except KeyError:
+            raise AtlasError(f'{self.path}: no font {face!r}, rebuild the atlas') from None
+
+    def __contains__(self, face):
+        return face in self.faces
+
+    def __iter__(self):
+        return iter(self.faces)
+
+    def __len__(self):
+        return len(self.faces)
+
+    @property
+    def digest(self) -> str:
+        """ sha256 заголовка: версия и sha256 исходных шрифтов
+
+        """
+        return hashlib.sha256(self.header).hexdigest()
+
+    def stale_faces(self, font_files) -> list:
+        """ шрифты font_files, которых нет в атласе или чей файл изменился после сборки
+
+        файлы, которых нет на диске, не проверяются: атлас можно раздавать без .ttf
+        """
+        stale = []
+        for face in font_files:
+            filename, faceindex = _font_source(font_files, face)
+            record = self.faces[face].record if face in self.faces else None
+            if record is None or record.faceindex != faceindex:
+                stale.append(face)
+            elif os.path.exists(filename) and _sha256_file(filename) != record.sha256:
+                stale.append(face)
+        return stale
+
+
+def is_current(font_files, path: str = None) -> bool:
+    """ атлас есть и собран из тех же файлов шрифтов
+
+    """
+    try:
+        return not GlyphAtlas(path).stale_faces(font_files)
+    except AtlasError:
+        return False
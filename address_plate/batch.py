@@ -0,0 +1,249 @@
+from collections import namedtuple
+import os
+import pathlib
+import sys
+import time
+
+from .plate_spec import read_manifest, render_result, make_plate
+
+BatchResult = namedtuple('BatchResult', ('row', 'spec', 'file', 'size', 'error'))
+
+
+class BatchSummary:
+
+    def __init__(self):
+        self.rendered = 0
+        self.failed = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.sheets = None
+        self.sheets_used = 0.0
+        self.plan = None  # incremental.BuildPlan
+        self.dry_run = False
+
+    def add(self, result: BatchResult):
+        if result.error is None:
+            self.rendered += 1
+            self.bytes += result.size
+        else:
+            self.failed += 1
+        self.seconds = time.perf_counter() - self.started
+
+    @property
+    def plates_per_second(self) -> float:
+        return self.rendered / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        if self.dry_run:
+            return f'dry run: {self.plan}'
+        text = (f'{self.rendered} plates rendered, {self.failed} errors, {self.bytes} bytes '
+                f'in {self.seconds:.2f} s ({self.plates_per_second:.1f} plates/s)')
+        if self.sheets is not None:
+            text += f', {self.sheets} sheets ({self.sheets_used:.0%} used)'
+        if self.plan is not None:
+            text += (f', {len(self.plan.moved)} of them moved, {len(self.plan.unchanged)} unchanged, '
+                     f'{len(self.plan.removed)} removed')
+        return text
+
+
+def unique_file_name(file_name: str, used: set) -> str:
+    """ vertical_pdf дает одно имя на всю улицу, дописываем _2, _3...
+
+    :param file_name:
+    :param used: already written names, updated
+    :return:
+    """
+    name = file_name
+    stem, dot, suffix = file_name.rpartition('.')
+    if not dot:
+        stem, suffix = file_name, ''
+    n = 1
+    while name in used:
+        n += 1
+        name = f'{stem}_{n}{dot}{suffix}'
+    used.add(name)
+    return name
+
+
+def render_batch(rows, output_dir, workers: int = None, chunksize: int = 16, profile=None):
+    """ рендерит все строки манифеста в output_dir, ошибки строк не прерывают работу
+
+    :param rows: iterable of (row_number, PlateSpec or Exception) as read_manifest
+    :param output_dir:
+    :param workers: 0 - os.cpu_count(), > 1 - process pool, see parallel.render_parallel
+    :param chunksize: specs per worker task
+    :param profile: pdf_maker.OutputProfile or its name
+    :return: generator of BatchResult
+    """
+    output_dir = pathlib.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    used = set()
+
+    if workers == 0 or workers is not None and workers > 1:
+        from .parallel import render_parallel
+
+        row_numbers = {}
+
+        def specs():
+            for index, (row_number, spec) in enumerate(rows):
+                row_numbers[index] = row_number
+                yield spec
+
+        rendered = ((row_numbers.pop(result.index), result)
+                    for result in render_parallel(specs(), workers=workers, chunksize=chunksize,
+                                                   profile=profile))
+    else:
+        rendered = ((row_number, render_result(spec, profile=profile)) for row_number, spec in rows)
+
+    for row_number, result in rendered:
+        if result.error is not None:
+            yield BatchResult(row_number, result.spec, None, 0, result.error)
+            continue
+        try:
+            file_name = unique_file_name(result.file_name, used)
+            output_dir.joinpath(file_name).write_bytes(result.data)
+        except OSError as e:
+            yield BatchResult(row_number, result.spec, None, 0, e)
+        else:
+            yield BatchResult(row_number, result.spec, file_name, len(result.data), None)
+
+
+def render_document_batch(rows, document, glyph_forms: bool = False, profile=None):
+    """ все строки манифеста одним pdf документом, плохие строки пропускаются
+
+    таблички создаются по одной, пока plates_pdf рисует страницы: в памяти одна табличка, а не весь реестр;
+    результаты строк - после записи документа, в порядке строк
+
+    :param rows: iterable of (row_number, PlateSpec or Exception) as read_manifest
+    :param document: output pdf file
+    :param glyph_forms: glyphs as form XObjects shared by all pages
+    :param profile: pdf_maker.OutputProfile or its name
+    :return: generator of BatchResult, size of the whole document in the last successful one
+    """
+    from .pdf_maker import plates_pdf
+
+    results = []
+    last = None
+
+    def plates():
+        nonlocal last
+        for row_number, spec in rows:
+            if isinstance(spec, Exception):
+                results.append(BatchResult(row_number, None, None, 0, spec))
+                continue
+            try:
+                plate = make_plate(spec)
+            except Exception as e:
+                results.append(BatchResult(row_number, spec, None, 0, e))
+                continue
+            last = len(results)
+            results.append(BatchResult(row_number, spec, str(document), 0, None))
+            yield plate
+
+    plates_pdf(plates(), glyph_forms, profile, output=document)
+    if last is not None:
+        results[last] = results[last]._replace(size=os.path.getsize(document))
+    yield from results
+
+
+def render_sheets_batch(rows, sheets, sheet=None, rotate: bool = False, glyph_forms: bool = True, profile=None,
+                        summary: BatchSummary = None):
+    """ все строки манифеста разложены на листы, один pdf, страница на лист, см. imposition
+
+    :param rows: iterable of (row_number, PlateSpec or Exception) as read_manifest
+    :param sheets: output pdf file
+    :param sheet: imposition.Sheet, default imposition.DEFAULT_SHEET
+    :param rotate: see imposition.pack
+    :param glyph_forms:
+    :param profile: pdf_maker.OutputProfile or its name
+    :param summary: gets the number of sheets and the used area
+    :return: generator of BatchResult, size of the whole document in the last one
+    """
+    from .imposition import DEFAULT_SHEET, impose
+
+    sheet = sheet or DEFAULT_SHEET
+    plates = []
+    placed = []
+    for row_number, spec in rows:
+        if isinstance(spec, Exception):
+            yield BatchResult(row_number, None, None, 0, spec)
+            continue
+        try:
+            plates.append(make_plate(spec))
+        except Exception as e:
+            yield BatchResult(row_number, spec, None, 0, e)
+        else:
+            placed.append((row_number, spec))
+
+    imposition = impose(plates, sheets, sheet, rotate, glyph_forms=glyph_forms, profile=profile)
+    if summary is not None:
+        summary.sheets, summary.sheets_used = imposition.sheets, imposition.used
+    results = []
+    for (row_number, spec), plate, placement in zip(placed, plates, imposition.placements):
+        if placement is None:
+            error = ValueError(f'{plate.width / 72 * 25.4:.0f}x{plate.height / 72 * 25.4:.0f} mm plate does not fit '
+                               f'on a {sheet.width:g}x{sheet.height:g} mm sheet')
+            yield BatchResult(row_number, spec, None, 0, error)
+        else:
+            results.append(BatchResult(row_number, spec, f'{sheets}#{placement.sheet + 1}', 0, None))
+    if results:
+        results[-1] = results[-1]._replace(size=os.path.getsize(sheets))
+    yield from results
+
+
+def run_batch(manifest, output_dir=None, wide: str = 'thin', log=sys.stderr, document=None,
+              workers: int = None, chunksize: int = 16, glyph_forms: bool = None,
+              profile=None, sheets=None, sheet=None, rotate: bool = False, incremental: bool = False,
+              prune: bool = False, dry_run: bool = False, verify: bool = False) -> BatchSummary:
+    """ batch команда: манифест -> pdf файлы, ошибки строк в log
+
+    :param manifest: CSV or JSONL file
+    :param output_dir: pdf per plate
+    :param wide: default for rows without wide
+    :param log:
+    :param document: or one pdf for all plates
+    :param workers: processes for output_dir mode
+    :param chunksize: specs per worker task
+    :param glyph_forms: for document and sheets mode, see pdf_maker.plates_pdf; None - on for sheets only
+    :param profile: pdf_maker.OutputProfile or its name
+    :param sheets: or one pdf with plates packed on print sheets, see render_sheets_batch
+    :param sheet: imposition.Sheet for sheets mode
+    :param rotate: sheets mode, turn plates that fit only turned
+    :param incremental: output_dir mode, render only plates changed since the last build, see incremental
+    :param prune: incremental, delete files of plates gone from the manifest
+    :param dry_run: incremental, only log what would change
+    :param verify: incremental, check unchanged files by sha256, not only by size
+    :return:
+    """
+    summary = BatchSummary()
+    rows = read_manifest(manifest, wide)
+    if incremental or dry_run:
+        from .incremental import build_incremental, plan_build
+
+        summary.plan = plan = plan_build(rows, output_dir, profile, verify)
+        if dry_run:
+            summary.dry_run = True
+            summary.failed = len(plan.errors)
+            for row_number, error in plan.errors:
+                print(f'{manifest}:{row_number}: {type(error).__name__}: {error}', file=log)
+            for plate in plan.plates:
+                if plate.reason == 'moved':
+                    print(f'{plate.file}: moved from {plate.source}', file=log)
+                elif plate.reason is not None:
+                    print(f'{plate.file}: {plate.reason}', file=log)
+            for file in plan.removed:
+                print(f'{file}: removed', file=log)
+            return summary
+        results = build_incremental(plan, output_dir, workers, chunksize, profile, prune)
+    elif sheets:
+        results = render_sheets_batch(rows, sheets, sheet, rotate, glyph_forms is not False, profile, summary)
+    elif document:
+        results = render_document_batch(rows, document, bool(glyph_forms), profile)
+    else:
+        results = render_batch(rows, output_dir, workers, chunksize, profile)
+    for result in results:
+        summary.add(result)
+        if result.error is not None:
+            print(f'{manifest}:{result.row}: {type(result.error).__name__}: {result.error}', file=log)
+    return summary
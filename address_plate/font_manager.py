@@ -0,0 +1,211 @@
+import ctypes as ct
+import threading
+
+CAIRO_STATUS_SUCCESS = 0
+FT_Err_Ok = 0
+
+
+class PycairoContext(ct.Structure):
+    _fields_ = \
+        [
+            ("PyObject_HEAD", ct.c_byte * object.__basicsize__),
+            ("ctx", ct.c_void_p),
+            ("base", ct.c_void_p),
+        ]
+# end PycairoContext
+
+
+_libs = None
+_libs_lock = threading.Lock()
+
+
+def _load_libs():
+    """ libfreetype и libcairo через ctypes, один раз на процесс
+
+    :return: (freetype_so, cairo_so)
+    """
+    global _libs
+    with _libs_lock:
+        if _libs is None:
+            freetype_so = ct.CDLL("libfreetype.so.6")
+            freetype_so.FT_Init_FreeType.argtypes = (ct.c_void_p,)
+            freetype_so.FT_New_Face.argtypes = (ct.c_void_p, ct.c_char_p, ct.c_long, ct.c_void_p)
+            freetype_so.FT_Done_Face.argtypes = (ct.c_void_p,)
+            freetype_so.FT_Reference_Library.argtypes = (ct.c_void_p,)
+            freetype_so.FT_Done_Library.argtypes = (ct.c_void_p,)
+
+            cairo_so = ct.CDLL("libcairo.so.2")
+            cairo_so.cairo_ft_font_face_create_for_ft_face.restype = ct.c_void_p
+            cairo_so.cairo_ft_font_face_create_for_ft_face.argtypes = [ct.c_void_p, ct.c_int]
+            cairo_so.cairo_font_face_get_user_data.restype = ct.c_void_p
+            cairo_so.cairo_font_face_get_user_data.argtypes = (ct.c_void_p, ct.c_void_p)
+            cairo_so.cairo_font_face_set_user_data.argtypes = (ct.c_void_p, ct.c_void_p, ct.c_void_p, ct.c_void_p)
+            cairo_so.cairo_set_font_face.argtypes = [ct.c_void_p, ct.c_void_p]
+            cairo_so.cairo_font_face_status.argtypes = [ct.c_void_p]
+            cairo_so.cairo_font_face_destroy.argtypes = (ct.c_void_p,)
+            cairo_so.cairo_status.argtypes = [ct.c_void_p]
+            _libs = freetype_so, cairo_so
+    return _libs
+
+
+# dummy addresses, cairo user data keys
+_ft_face_key = ct.c_int()
+_ft_library_key = ct.c_int()
+
+
+class FontManager:
+    """ один FT_Library на менеджер, один cairo.FontFace на (файл, faceindex)
+
+    FONT_FACE[face] -> cairo.FontFace, файлы берутся из files (FONT_FILES)
+    каждый cairo face держит ссылку на FT_Library и отпускает её вместе с FT_Face,
+    поэтому close() безопасен, даже если cairo ещё кеширует шрифты
+    """
+
+    def __init__(self, files: dict = None):
+        """
+
+        :param files: {name: filename}, not copied - register() adds to it
+        """
+        self.files = files if files is not None else {}
+        self._face_indexes = {}
+        self._faces = {}
+        self._ft_lib = None
+        self._ctx = None
+        self._lock = threading.RLock()
+
+    def register(self, name: str, filename: str, faceindex: int = 0):
+        """ ещё один шрифт помимо FONT_FILES
+
+        :param name: key for FONT_FACE[name] and layout fonts, Font(name, size)
+        :param filename:
+        :param faceindex: face in .ttc collections
+        """
+        with self._lock:
+            self.files[name] = str(filename)
+            self._face_indexes[name] = faceindex
+
+    def __getitem__(self, name: str):
+        return self.face(name)
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def faceindex(self, name: str) -> int:
+        return self._face_indexes.get(name, 0)
+
+    def face(self, name: str):
+        """ cairo.FontFace by registered name, loaded once
+
+        :param name:
+        :return:
+        """
+        return self.load(self.files[name], self.faceindex(name))
+
+    def load(self, filename: str, faceindex: int = 0, loadoptions: int = 0):
+        """ cairo.FontFace for a font file, loaded once per (filename, faceindex, loadoptions)
+
+        :param filename:
+        :param faceindex: passed to FT_New_Face
+        :param loadoptions: passed to cairo_ft_font_face_create_for_ft_face
+        :return:
+        """
+        key = (filename, faceindex, loadoptions)
+        face = self._faces.get(key)
+        if face is None:
+            with self._lock:
+                face = self._faces.get(key)
+                if face is None:
+                    face = self._faces[key] = self._create_face(filename, faceindex, loadoptions)
+        return face
+
+    def _library(self):
+        if self._ft_lib is None:
+            import cairo
+
+            freetype_so, _ = _load_libs()
+            ft_lib = ct.c_void_p()
+            status = freetype_so.FT_Init_FreeType(ct.byref(ft_lib))
+            if status != FT_Err_Ok:
+                raise RuntimeError("Error %d initializing FreeType library." % status)
+            self._ft_lib = ft_lib
+            self._ctx = cairo.Context(cairo.ImageSurface(cairo.FORMAT_A8, 0, 0))
+        return self._ft_lib
+
+    def _create_face(self, filename, faceindex, loadoptions):
+        freetype_so, cairo_so = _load_libs()
+        ft_lib = self._library()
+
+        ft_face = ct.c_void_p()
+        cr_face = None
+        try:
+            # load FreeType face
+            status = freetype_so.FT_New_Face(ft_lib, filename.encode("utf-8"), faceindex, ct.byref(ft_face))
+            if status != FT_Err_Ok:
+                raise RuntimeError("Error %d creating FreeType font face for %s" % (status, filename))
+
+            # create Cairo font face for freetype face
+            cr_face = cairo_so.cairo_ft_font_face_create_for_ft_face(ft_face, loadoptions)
+            status = cairo_so.cairo_font_face_status(cr_face)
+            if status != CAIRO_STATUS_SUCCESS:
+                raise RuntimeError("Error %d creating cairo font face for %s" % (status, filename))
+
+            # Cairo doesn't know to call FT_Done_Face when its font_face object is
+            # destroyed, so we attach it as user data destroy callback. The face also
+            # holds a reference to the FT_Library, released right after FT_Done_Face
+            # (user data is destroyed in the order it was set).
+            status = cairo_so.cairo_font_face_set_user_data(
+                cr_face, ct.byref(_ft_face_key), ft_face, freetype_so.FT_Done_Face)
+            if status != CAIRO_STATUS_SUCCESS:
+                raise RuntimeError("Error %d doing user_data dance for %s" % (status, filename))
+            ft_face = None  # Cairo has stolen my reference
+
+            freetype_so.FT_Reference_Library(ft_lib)
+            status = cairo_so.cairo_font_face_set_user_data(
+                cr_face, ct.byref(_ft_library_key), ft_lib, freetype_so.FT_Done_Library)
+            if status != CAIRO_STATUS_SUCCESS:
+                freetype_so.FT_Done_Library(ft_lib)
+                raise RuntimeError("Error %d doing user_data dance for %s" % (status, filename))
+
+            # set Cairo font face into Cairo context, get it back as a Python object
+            cairo_t = PycairoContext.from_address(id(self._ctx)).ctx
+            cairo_so.cairo_set_font_face(cairo_t, cr_face)
+            status = cairo_so.cairo_status(cairo_t)
+            if status != CAIRO_STATUS_SUCCESS:
+                raise RuntimeError("Error %d creating cairo font face for %s" % (status, filename))
+            face = self._ctx.get_font_face()
+            self._ctx.set_font_face(None)
+
+        finally:
+            if cr_face:
+                cairo_so.cairo_font_face_destroy(cr_face)
+            if ft_face:
+                freetype_so.FT_Done_Face(ft_face)
+
+        return face
+
+    def close(self):
+        """ отпускает шрифты и FT_Library
+
+        cairo.FontFace, которые ещё используются, остаются рабочими до своего удаления
+        """
+        with self._lock:
+            self._faces.clear()
+            self._ctx = None
+            if self._ft_lib is not None:
+                # FT_Done_Library, not FT_Done_FreeType: the latter frees the memory manager
+                # even while cairo faces still hold references to the library
+                freetype_so, _ = _load_libs()
+                freetype_so.FT_Done_Library(self._ft_lib)
+                self._ft_lib = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
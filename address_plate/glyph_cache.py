@@ -0,0 +1,75 @@
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+# как cairo.PATH_*, чтобы не импортировать cairo ради констант
+PATH_MOVE_TO = 0
+PATH_LINE_TO = 1
+PATH_CURVE_TO = 2
+PATH_CLOSE_PATH = 3
+
+CacheInfo = namedtuple('CacheInfo', ('hits', 'misses', 'maxsize', 'currsize'))
+
+Glyph = namedtuple('Glyph', ('path', 'advance', 'extents'))
+"""outline of one glyph drawn from (0, 0)
+
+path: outline.Outline, iterates as (type_op, points) like cairo.Path
+advance: (x, y) current point after the glyph
+extents: (x1, y1, x2, y2) or None for glyphs without outline (space)
+"""
+
+GlyphMetrics = namedtuple('GlyphMetrics', ('advance', 'extents'))
+"""Glyph without path, from font metrics only"""
+
+
+class GlyphCache:
+    """ bounded LRU cache, hit/miss stats like functools.lru_cache
+
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, factory):
+        """ cached value for key, factory(*key) on miss
+
+        :param key: tuple
+        :param factory: callable
+        :return:
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                pass
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = factory(*key)
+
+        with self._lock:
+            self.misses += 1
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def cache_clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+GLYPH_CACHE = GlyphCache()
+METRICS_CACHE = GlyphCache()
@@ -0,0 +1,161 @@
+""" номер дома -> части для рисования, одна скомпилированная грамматика вместо перебора regex
+
+12, 12-14, 12А, 12/3, 12/3Б, 12 к2 - табличка номера; 12, 12А - номера соседних домов над стрелками
+
+parse_house_number('25/3А') -> HouseNumber(lvl1='25', lvl2_slash='/', lvl2c=None, lvl2s='3', lvl3='А')
+ошибка - HouseNumberError с позицией и ожидаемым, до любого рендера:
+
+validate_house_numbers(column) -> [(index, HouseNumberError), ...] для реестра целиком
+"""
+from collections import namedtuple
+import re
+
+from .instrument import timed
+
+_NUMBER = r'[1-9][0-9]*'
+_LETTERS = r'[А-Я]'
+
+HOUSE_NUMBER_RE = re.compile(
+    rf'(?P<lvl1>{_NUMBER}(?:-{_NUMBER})?)'
+    rf'(?:(?P<lvl2c>{_LETTERS}+| к{_NUMBER})|(?P<lvl2_slash>/)(?P<lvl2s>{_NUMBER})(?P<lvl3>{_LETTERS}*))?')
+ARROW_NUMBER_RE = re.compile(rf'(?P<lvl_a1>{_NUMBER}(?:-{_NUMBER})?)(?P<lvl_a2c>{_LETTERS}+)?')
+
+
+class HouseNumber(namedtuple('HouseNumber', ('lvl1', 'lvl2_slash', 'lvl2c', 'lvl2s', 'lvl3'))):
+    """ части номера, None - нет такой части; порядок полей - порядок рисования (layout.NumberLayout.levels)
+
+    lvl1 - основной номер (12, 12-14), lvl2c - литера (А) или корпус (' к2'), lvl2_slash - '/',
+    lvl2s - номер после дроби, lvl3 - литера после дроби
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        return ''.join(part for part in self if part)
+
+
+class ArrowNumber(namedtuple('ArrowNumber', ('lvl_a1', 'lvl_a2c'))):
+    """ номер соседнего дома: lvl_a1 - номер, lvl_a2c - литера или None
+
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        return self.lvl_a1 + (self.lvl_a2c or '')
+
+
+class HouseNumberError(ValueError):
+    """ value - весь номер, position - индекс первого неверного символа, expected - что там должно быть
+
+    """
+
+    def __init__(self, value, position: int, expected: str):
+        self.value, self.position, self.expected = value, position, expected
+        if not isinstance(value, str):
+            found = type(value).__name__
+        else:
+            found = repr(value[position]) if position < len(value) else 'end'
+        super().__init__(f'bad house number {value!r}: expected {expected} at {position}, found {found}')
+
+    def __reduce__(self):
+        # RenderResult с ошибкой идет из процессов пула через pickle
+        return type(self), (self.value, self.position, self.expected)
+
+    def as_dict(self) -> dict:
+        return {'value': self.value, 'position': self.position, 'expected': self.expected, 'message': str(self)}
+
+
+def _scan_number(value: str, position: int) -> tuple:
+    """ [1-9][0-9]* с position
+
+    :return: (end, None) or (position, expected)
+    """
+    if position >= len(value) or not '1' <= value[position] <= '9':
+        return position, 'digit 1-9'
+    position += 1
+    while position < len(value) and '0' <= value[position] <= '9':
+        position += 1
+    return position, None
+
+
+def _scan_letters(value: str, position: int) -> int:
+    while position < len(value) and 'А' <= value[position] <= 'Я':
+        position += 1
+    return position
+
+
+def _diagnose(value: str, arrow: bool) -> tuple:
+    """ тот же разбор вручную, только для неверных номеров: где и что ожидалось
+
+    :return: (position, expected)
+    """
+    position, expected = _scan_number(value, 0)
+    if expected:
+        return position, expected
+    if value.startswith('-', position):
+        position, expected = _scan_number(value, position + 1)
+        if expected:
+            return position, expected
+    if arrow:
+        position = _scan_letters(value, position)
+        return position, 'letter А-Я or end'
+    if position < len(value) and 'А' <= value[position] <= 'Я':
+        return _scan_letters(value, position), 'end'
+    if value.startswith('/', position):
+        position, expected = _scan_number(value, position + 1)
+        if expected:
+            return position, expected
+        return _scan_letters(value, position), 'letter А-Я or end'
+    if value.startswith(' ', position):
+        if not value.startswith('к', position + 1):
+            return position + 1, "'к'"
+        position, expected = _scan_number(value, position + 2)
+        return position, expected or 'end'
+    return position, "digit, '-', letter А-Я, '/', ' к' or end"
+
+
+def _error(value, arrow: bool) -> HouseNumberError:
+    if not isinstance(value, str):
+        return HouseNumberError(value, 0, 'a string')
+    return HouseNumberError(value, *_diagnose(value, arrow))
+
+
+@timed('parse')
+def parse_house_number(value: str) -> HouseNumber:
+    """ номер таблички номера дома или вертикальной
+
+    :raise HouseNumberError:
+    """
+    match = HOUSE_NUMBER_RE.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        raise _error(value, False)
+    lvl1, lvl2c, slash, lvl2s, lvl3 = match.groups()
+    return HouseNumber(lvl1, slash, lvl2c, lvl2s, lvl3 or None)
+
+
+@timed('parse')
+def parse_arrow_number(value: str) -> ArrowNumber:
+    """ номер соседнего дома (--left, --right)
+
+    :raise HouseNumberError:
+    """
+    match = ARROW_NUMBER_RE.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        raise _error(value, True)
+    return ArrowNumber(*match.groups())
+
+
+def validate_house_numbers(values, arrow: bool = False) -> list:
+    """ весь столбец адресов сразу, без рендера: одна fullmatch на строку, разбор ошибки только для плохих
+
+    :param values: iterable of str, e.g. the number column of a city registry
+    :param arrow: neighbour numbers (left/right) instead of plate numbers
+    :return: [(index, HouseNumberError), ...] for bad values only, in order
+    """
+    fullmatch = (ARROW_NUMBER_RE if arrow else HOUSE_NUMBER_RE).fullmatch
+    errors = []
+    for index, value in enumerate(values):
+        if not isinstance(value, str) or fullmatch(value) is None:
+            errors.append((index, _error(value, arrow)))
+    return errors
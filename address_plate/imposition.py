@@ -0,0 +1,212 @@
+""" раскладка табличек на листы (алюминий, пленка) для печати и резки
+
+размеры табличек известны до рисования: ширина номера из layout (NumberLayout.width), улиц -
+max_width_plus, вертикальные фиксированы; plate.width/height считаются из метрик без кривых
+
+упаковка - полки (shelf, first fit decreasing height с выбором самой низкой подходящей полки):
+таблички одного вида одной высоты, полки почти без потерь, все резы гильотинные
+10 000 табличек раскладываются за доли секунды, дольше рисование самих табличек
+
+impose(plates, 'sheets.pdf', Sheet(2500, 1250, margin=10, gap=4)) -> Imposition
+"""
+from collections import namedtuple
+
+from reportlab.lib.colors import PCMYKColor
+
+from . import instrument
+from .pdf_maker import pt, new_canvas, pdf_sink, save_canvas
+
+Sheet = namedtuple('Sheet', ('width', 'height', 'margin', 'gap'), defaults=(10.0, 4.0))
+Sheet.__doc__ = """лист в мм: width x height, поле по краю margin, промежуток между табличками gap (рез)"""
+
+DEFAULT_SHEET = Sheet(2500.0, 1250.0)
+
+Placement = namedtuple('Placement', ('index', 'sheet', 'x', 'y', 'width', 'height', 'rotated'))
+Placement.__doc__ = """табличка на листе, pt: левый верхний угол (x, y) от левого верхнего угла листа,
+width/height как лежит на листе, rotated - повернута на 90 градусов"""
+
+Imposition = namedtuple('Imposition', ('placements', 'sheets', 'used', 'pdf'))
+Imposition.__doc__ = """placements - Placement or None (не помещается на лист) по индексу таблички,
+sheets - число листов, used - доля площади листов под табличками, pdf - как у plates_pdf"""
+
+COLOR_MARKS = PCMYKColor(100, 100, 100, 100)  # registration, видно на любой пленке
+MARK_LENGTH = pt(5)
+MARK_LINE_WIDTH = 0.25
+
+
+def sheet_size_pt(sheet: Sheet) -> tuple:
+    return pt(sheet.width), pt(sheet.height)
+
+
+def parse_sheet(value: str, margin: float = None, gap: float = None) -> Sheet:
+    """ '2500x1250' (мм) -> Sheet, для CLI
+
+    """
+    try:
+        width, height = (float(v) for v in value.lower().replace('х', 'x').split('x'))
+    except ValueError:
+        raise ValueError(f'bad sheet size: {value!r}, expected WIDTHxHEIGHT in mm')
+    sheet = Sheet(width, height)
+    if margin is not None:
+        sheet = sheet._replace(margin=margin)
+    if gap is not None:
+        sheet = sheet._replace(gap=gap)
+    return sheet
+
+
+def pack(sizes: list, sheet: Sheet = DEFAULT_SHEET, rotate: bool = False):
+    """ прямоугольники на листы полками
+
+    промежуток gap добавляется к каждой табличке справа и снизу, поэтому рабочая область листа
+    тоже больше на gap; полка закрывается, когда в нее не влезет ни одна из оставшихся табличек
+
+    :param sizes: [(width, height), ...] in pt
+    :param sheet:
+    :param rotate: turn plates that fit only turned (long street names on a narrow roll); plates of
+        one kind keep one height on purpose, turning them all short side down gave more sheets
+    :return: ([Placement or None, ...] by index, number of sheets)
+    """
+    gap, margin = pt(sheet.gap), pt(sheet.margin)
+    area_width = pt(sheet.width) - 2 * pt(sheet.margin) + gap
+    area_height = pt(sheet.height) - 2 * pt(sheet.margin) + gap
+
+    items = []
+    placements = [None] * len(sizes)
+    for index, (width, height) in enumerate(sizes):
+        w, h, rotated = width + gap, height + gap, False
+        fits = w <= area_width and h <= area_height
+        fits_rotated = h <= area_width and w <= area_height
+        if not fits:
+            if not (rotate and fits_rotated):
+                continue
+            w, h, rotated = h, w, True
+        items.append((h, w, index, rotated))
+    items.sort(key=lambda item: (-item[0], -item[1]))
+
+    # минимальная ширина среди оставшихся: полка уже, чем она, больше не нужна
+    min_width = [0.0] * len(items)
+    smallest = float('inf')
+    for i in range(len(items) - 1, -1, -1):
+        smallest = min(smallest, items[i][1])
+        min_width[i] = smallest
+    min_height = items[-1][0] if items else 0.0
+
+    shelves = []  # открытые полки: [sheet, y, height, x]
+    sheets = []  # занятая высота по листам, и открытые листы
+    open_sheets = []
+    for i, (h, w, index, rotated) in enumerate(items):
+        best = None
+        for shelf in shelves:
+            if shelf[2] >= h and area_width - shelf[3] >= w and (best is None or shelf[2] < best[2]):
+                best = shelf
+                if shelf[2] == h:
+                    break
+        if best is None:
+            for number in open_sheets:
+                if area_height - sheets[number] >= h:
+                    break
+            else:
+                number = len(sheets)
+                sheets.append(0.0)
+                open_sheets.append(number)
+            best = [number, sheets[number], h, 0.0]
+            sheets[number] += h
+            shelves.append(best)
+            if area_height - sheets[number] < min_height:
+                open_sheets.remove(number)
+
+        number, y, _, x = best
+        placements[index] = Placement(index, number, margin + x, margin + y, w - gap, h - gap, rotated)
+        best[3] += w
+        if i + 1 < len(items) and area_width - best[3] < min_width[i + 1]:
+            shelves.remove(best)
+
+    return placements, len(sheets)
+
+
+def draw_marks(work_canvas, x: float, y: float, width: float, height: float, length: float):
+    """ метки реза в углах прямоугольника, наружу от углов
+
+    """
+    for corner_x, dx in ((x, -1), (x + width, 1)):
+        for corner_y, dy in ((y, -1), (y + height, 1)):
+            work_canvas.line(corner_x, corner_y, corner_x + dx * length, corner_y)
+            work_canvas.line(corner_x, corner_y, corner_x, corner_y + dy * length)
+
+
+def draw_sheet(work_canvas, plates: list, placements: list, sheet: Sheet, marks: bool = True, label: str = None):
+    """ одна страница-лист: таблички на местах, метки реза, подпись в поле
+
+    :param work_canvas: bottomup=0, see pdf_maker.new_canvas
+    :param plates: all plates
+    :param placements: Placement of this sheet
+    :param sheet:
+    :param marks: cut marks, shorter than the gap so they stay between plates
+    :param label: text in the bottom margin
+    """
+    for placement in placements:
+        plate = plates[placement.index]
+        x, y = placement.x, placement.y
+        work_canvas.saveState()
+        if placement.rotated:
+            # (u, v) таблички -> (x + height - v, y + u), поворот на 90 по часовой
+            work_canvas.transform(0, 1, -1, 0, x + placement.width, y)
+        else:
+            work_canvas.translate(x, y)
+        plate.draw(work_canvas)
+        work_canvas.restoreState()
+        instrument.plate_done(plate.file_name)
+
+    work_canvas.saveState()
+    work_canvas.setStrokeColor(COLOR_MARKS)
+    work_canvas.setFillColor(COLOR_MARKS)
+    work_canvas.setLineWidth(MARK_LINE_WIDTH)
+    offset = pt(sheet.margin)
+    if marks:
+        length = min(MARK_LENGTH, pt(sheet.gap) * 0.75, offset)
+        if length > 0:
+            for placement in placements:
+                draw_marks(work_canvas, placement.x, placement.y, placement.width, placement.height, length)
+    if label and offset >= pt(4):
+        work_canvas.setFont('Helvetica', 8)
+        work_canvas.drawString(offset, pt(sheet.height) - offset / 2 + 3, label)
+    work_canvas.restoreState()
+
+
+def impose(plates, output=None, sheet: Sheet = DEFAULT_SHEET, rotate: bool = False, marks: bool = True,
+           glyph_forms: bool = True, profile=None) -> Imposition:
+    """ таблички -> многостраничный pdf, страница на лист
+
+    :param plates: iterable of HouseNumberPlate, StreetNamePlate or VerticalPlate
+    :param output: see pdf_maker.pdf_sink, default io.BytesIO
+    :param sheet: Sheet in mm
+    :param rotate: see pack
+    :param marks: cut marks at plate corners
+    :param glyph_forms: on by default, a sheet repeats the same glyphs many times, see pdf_maker.TextPath.draw
+    :param profile: pdf_maker.OutputProfile or its name
+    :return:
+    """
+    plates = list(plates)
+    placements, count = pack([(plate.width, plate.height) for plate in plates], sheet, rotate)
+    by_sheet = [[] for _ in range(count)]
+    for placement in placements:
+        if placement is not None:
+            by_sheet[placement.sheet].append(placement)
+
+    with pdf_sink(output) as pdf:
+        work_canvas = new_canvas(pdf, sheet_size_pt(sheet), glyph_forms, profile)
+        for number, sheet_placements in enumerate(by_sheet, 1):
+            label = (f'sheet {number}/{count}, {len(sheet_placements)} plates, '
+                     f'{sheet.width:g}x{sheet.height:g} mm, gap {sheet.gap:g} mm')
+            draw_sheet(work_canvas, plates, sheet_placements, sheet, marks, label)
+            work_canvas.showPage()
+        save_canvas(work_canvas)
+    if output is None:
+        pdf.seek(0)
+    else:
+        pdf = output
+
+    area = sum(placement.width * placement.height for placement in placements if placement is not None)
+    sheet_width, sheet_height = sheet_size_pt(sheet)
+    used = area / (count * sheet_width * sheet_height) if count else 0.0
+    return Imposition(placements, count, used, pdf)
@@ -0,0 +1,259 @@
+""" batch --output без лишнего рендера: манифест сборки в каталоге вывода
+
+BUILD_MANIFEST в output_dir: отпечаток pdf_maker.layout_fingerprint(), профиль и по имени файла - ключ
+таблички (plate_cache.spec_key: параметры, профиль, отпечаток), sha256 и размер pdf
+
+следующий прогон по тому же реестру рисует только новые и измененные таблички; те же (файл на месте
+того же размера) пропускаются, переехавшие на другое имя (сдвинулись _2, _3 улицы) копируются из старого
+файла, лишние файлы удаляются (prune) или остаются в манифесте с пометкой removed
+
+plan = plan_build(read_manifest('city.csv'), 'out/'); print(plan)  # dry run
+"""
+from collections import namedtuple
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+
+from .batch import BatchResult, unique_file_name
+from .plate_cache import spec_key
+from .plate_spec import plate_file_name, render_result
+
+BUILD_MANIFEST = '.address_plate_build.json'
+BUILD_FORMAT = 1
+
+# причины рендера
+NEW = 'new'
+CHANGED = 'changed'
+MISSING = 'missing'  # файл удален или изменен снаружи
+LAYOUT = 'layout'  # другой отпечаток: размеры, шрифты, код рендера
+
+PlannedPlate = namedtuple('PlannedPlate', ('row', 'spec', 'file', 'key', 'reason', 'source'))
+PlannedPlate.__doc__ = """строка реестра -> файл: reason - одна из причин рендера, 'moved' (source - старый файл
+с теми же байтами) или None (без изменений)"""
+
+
+class BuildPlan(namedtuple('BuildPlan', ('plates', 'removed', 'errors', 'fingerprint', 'previous'))):
+    """ plates - PlannedPlate по строкам, removed - файлы прошлой сборки, которых нет в реестре,
+    errors - (row, SpecError) плохих строк, previous - манифест прошлой сборки
+
+    """
+
+    __slots__ = ()
+
+    def select(self, *reasons) -> list:
+        return [plate for plate in self.plates if plate.reason in reasons]
+
+    @property
+    def render(self) -> list:
+        return self.select(NEW, CHANGED, MISSING, LAYOUT)
+
+    @property
+    def moved(self) -> list:
+        return self.select('moved')
+
+    @property
+    def unchanged(self) -> list:
+        return self.select(None)
+
+    def __str__(self):
+        counts = {}
+        for plate in self.render:
+            counts[plate.reason] = counts.get(plate.reason, 0) + 1
+        reasons = ', '.join(f'{count} {reason}' for reason, count in sorted(counts.items()))
+        return (f'{len(self.render)} to render' + (f' ({reasons})' if reasons else '')
+                + f', {len(self.moved)} to move, {len(self.unchanged)} unchanged, {len(self.removed)} removed, '
+                  f'{len(self.errors)} bad rows')
+
+
+def _sha256_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_build_manifest(output_dir) -> dict:
+    """ манифест прошлой сборки, пустой если его нет или он другого формата
+
+    :return: {'fingerprint': ..., 'profile': ..., 'files': {file: {'key', 'sha256', 'size', 'row'}}}
+    """
+    try:
+        with open(pathlib.Path(output_dir, BUILD_MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'files': {}}
+    if not isinstance(manifest, dict) or manifest.get('format') != BUILD_FORMAT:
+        return {'files': {}}
+    return manifest
+
+
+def save_build_manifest(output_dir, manifest: dict):
+    """ через временный файл и os.replace: прерванная сборка оставляет прошлый манифест целым
+
+    """
+    output_dir = pathlib.Path(output_dir)
+    fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=output_dir)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dict(manifest, format=BUILD_FORMAT), f, ensure_ascii=False, indent=0, sort_keys=True)
+        os.replace(tmp, output_dir.joinpath(BUILD_MANIFEST))
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _is_intact(path: pathlib.Path, entry: dict, verify: bool) -> bool:
+    """ файл прошлой сборки на месте и не изменен: размер, при verify - sha256
+
+    """
+    try:
+        if path.stat().st_size != entry.get('size'):
+            return False
+        return not verify or _sha256_file(path) == entry.get('sha256')
+    except OSError:
+        return False
+
+
+def _unlink(path: pathlib.Path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def plan_build(rows, output_dir, profile=None, verify: bool = False) -> BuildPlan:
+    """ что изменится, без рендера и записи
+
+    имена файлов - plate_spec.plate_file_name с _2, _3 как у batch.render_batch, но по всем хорошим строкам
+
+    :param rows: iterable of (row_number, PlateSpec or Exception) as read_manifest
+    :param output_dir:
+    :param profile: pdf_maker.OutputProfile or its name
+    :param verify: sha256 of every unchanged file instead of its size only
+    :return:
+    """
+    from .pdf_maker import layout_fingerprint, output_profile
+
+    output_dir = pathlib.Path(output_dir)
+    previous = load_build_manifest(output_dir)
+    old_files = previous.get('files', {})
+    fingerprint = layout_fingerprint()
+    same_layout = previous.get('fingerprint') == fingerprint and previous.get('profile') == list(output_profile(profile))
+    by_key = {}
+    for file, entry in old_files.items():
+        if not entry.get('removed'):
+            by_key.setdefault(entry['key'], file)
+
+    plates = []
+    errors = []
+    used = set()
+    for row_number, spec in rows:
+        if isinstance(spec, Exception):
+            errors.append((row_number, spec))
+            continue
+        file = unique_file_name(plate_file_name(spec), used)
+        key = spec_key(spec, fingerprint, profile)
+        entry = old_files.get(file)
+        reason, source = NEW, None
+        if entry is not None and not entry.get('removed'):
+            if entry['key'] != key:
+                reason = CHANGED if same_layout else LAYOUT
+            elif _is_intact(output_dir.joinpath(file), entry, verify):
+                reason = None
+            else:
+                reason = MISSING
+        if reason is not None and by_key.get(key) not in (None, file):
+            # те же байты лежат под другим именем
+            old = by_key[key]
+            if _is_intact(output_dir.joinpath(old), old_files[old], verify):
+                reason, source = 'moved', old
+        plates.append(PlannedPlate(row_number, spec, file, key, reason, source))
+
+    removed = sorted(set(old_files) - used)
+    return BuildPlan(plates, removed, errors, fingerprint, previous)
+
+
+def build_incremental(plan: BuildPlan, output_dir, workers: int = None, chunksize: int = 16, profile=None,
+                      prune: bool = False):
+    """ выполняет plan_build: рендер, перенос, удаление лишних, новый манифест в конце
+
+    манифест пишется после всех файлов; прерванная сборка при следующем запуске дорисует то,
+    чего нет в старом манифесте или что не совпало по размеру; файл таблички, которую не удалось
+    перерисовать, удаляется и выпадает из манифеста - следующая сборка повторит ее
+
+    :param plan: plan_build(...) for the same output_dir and profile
+    :param output_dir:
+    :param workers: see batch.render_batch
+    :param chunksize:
+    :param profile:
+    :param prune: delete files of rows gone from the registry, else keep them flagged removed
+    :return: generator of BatchResult for rendered and moved plates and bad rows
+    """
+    from .pdf_maker import output_profile
+
+    output_dir = pathlib.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    old_files = plan.previous.get('files', {})
+    files = {}
+
+    for row_number, error in plan.errors:
+        yield BatchResult(row_number, None, None, 0, error)
+
+    for plate in plan.unchanged:
+        files[plate.file] = dict(old_files[plate.file], row=plate.row)
+
+    # сначала все чтения: старый файл переехавшей таблички может быть перезаписан другой табличкой
+    moved = []
+    for plate in plan.moved:
+        try:
+            moved.append((plate, output_dir.joinpath(plate.source).read_bytes()))
+        except OSError as e:
+            yield BatchResult(plate.row, plate.spec, None, 0, e)
+    for plate, data in moved:
+        try:
+            output_dir.joinpath(plate.file).write_bytes(data)
+        except OSError as e:
+            yield BatchResult(plate.row, plate.spec, None, 0, e)
+            continue
+        files[plate.file] = dict(old_files[plate.source], row=plate.row)
+        yield BatchResult(plate.row, plate.spec, plate.file, len(data), None)
+
+    to_render = plan.render
+    if workers == 0 or workers is not None and workers > 1:
+        from .parallel import render_parallel
+
+        results = render_parallel((plate.spec for plate in to_render), workers=workers, chunksize=chunksize,
+                                  profile=profile)
+    else:
+        results = (render_result(plate.spec, index, profile) for index, plate in enumerate(to_render))
+    for plate, result in zip(to_render, results):
+        error = result.error
+        if error is None:
+            try:
+                output_dir.joinpath(plate.file).write_bytes(result.data)
+            except OSError as e:
+                error = e
+        if error is not None:
+            # старый файл не соответствует строке реестра; без него и без записи в манифесте
+            # следующая сборка нарисует табличку заново как new
+            _unlink(output_dir.joinpath(plate.file))
+            yield BatchResult(plate.row, plate.spec, None, 0, error)
+            continue
+        files[plate.file] = {'key': plate.key, 'sha256': hashlib.sha256(result.data).hexdigest(),
+                             'size': len(result.data), 'row': plate.row}
+        yield BatchResult(plate.row, plate.spec, plate.file, len(result.data), None)
+
+    for file in plan.removed:
+        if prune:
+            _unlink(output_dir.joinpath(file))
+        else:
+            files[file] = dict(old_files[file], removed=True)
+
+    save_build_manifest(output_dir, {'fingerprint': plan.fingerprint, 'profile': list(output_profile(profile)),
+                                     'files': files})
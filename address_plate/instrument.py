@@ -0,0 +1,185 @@
+""" время по стадиям рендера, включается явно
+
+parse - parse_house_number, measure - measure_text, outline - TextPath._init_pieces (_init_path),
+glyph - контур/метрики глифа из backend (промах кеша), draw - TextPath.draw (сегменты -> pdf операторы),
+save - Canvas.save, cache - чтение/запись plate_cache
+
+время стадии собственное: draw не включает outline, который строится внутри него
+
+with instrument.profiling(on_plate=print) as recorder:
+    house_number_pdf('12')
+print(recorder.report())
+
+выключено - одна проверка глобальной переменной на вызов обернутой функции
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import wraps
+import threading
+from time import perf_counter
+
+STAGES = ('parse', 'measure', 'outline', 'glyph', 'draw', 'save', 'cache')
+
+PlateTiming = namedtuple('PlateTiming', ('name', 'seconds', 'calls'))
+"""one plate: name (file_name), seconds and calls {stage: ...}, passed to Recorder hooks"""
+
+_recorder = None
+
+
+class Recorder:
+    """ счетчики и суммарное время по стадиям за прогон и по табличкам
+
+    """
+
+    def __init__(self, on_plate=None):
+        """
+
+        :param on_plate: callable(PlateTiming) after every plate, e.g. export to a metrics system
+        """
+        self.hooks = [on_plate] if on_plate else []
+        self.calls = {}
+        self.seconds = {}
+        self.plates = 0
+        self.started = perf_counter()
+        self.stopped = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def _state(self):
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            # стек времени вложенных стадий, стадии текущей таблички
+            state = self._local.state = ([], {}, {})
+        return state
+
+    def enter(self):
+        self._state()[0].append(0.0)
+
+    def exit(self, stage: str, elapsed: float):
+        stack, plate_calls, plate_seconds = self._state()
+        own = elapsed - stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        plate_calls[stage] = plate_calls.get(stage, 0) + 1
+        plate_seconds[stage] = plate_seconds.get(stage, 0.0) + own
+        with self._lock:
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + own
+
+    def plate_done(self, name: str = None):
+        """ всё, что записано в этом потоке с прошлой таблички, относится к этой
+
+        """
+        stack, plate_calls, plate_seconds = self._state()
+        self._local.state = (stack, {}, {})
+        with self._lock:
+            self.plates += 1
+        timing = PlateTiming(name, plate_seconds, plate_calls)
+        for hook in self.hooks:
+            hook(timing)
+
+    def stop(self):
+        self.stopped = perf_counter()
+
+    @property
+    def wall(self) -> float:
+        return (self.stopped or perf_counter()) - self.started
+
+    def as_dict(self) -> dict:
+        """ для JSON и систем метрик
+
+        """
+        with self._lock:
+            stages = {stage: {'calls': self.calls[stage], 'seconds': self.seconds[stage]}
+                      for stage in _ordered(self.calls)}
+        return {'plates': self.plates, 'wall_seconds': self.wall, 'stages': stages}
+
+    def report(self) -> str:
+        """ таблица по стадиям: вызовы, мс всего, мс на табличку, доля от wall
+
+        other - всё вне стадий: фон, стрелки, чтение манифеста, запись файлов
+        """
+        data = self.as_dict()
+        wall = data['wall_seconds']
+        plates = data['plates'] or 1
+        rows = [(stage, values['calls'], values['seconds']) for stage, values in data['stages'].items()]
+        rows.append(('other', None, wall - sum(seconds for _, _, seconds in rows)))
+        lines = [f'{"stage":<10} {"calls":>8} {"total ms":>10} {"ms/plate":>9} {"%":>6}']
+        for stage, calls, seconds in rows:
+            lines.append(f'{stage:<10} {"" if calls is None else calls:>8} {seconds * 1000:>10.1f} '
+                         f'{seconds * 1000 / plates:>9.3f} {seconds / wall * 100 if wall else 0:>6.1f}')
+        lines.append(f'{"wall":<10} {data["plates"]:>8} {wall * 1000:>10.1f} {wall * 1000 / plates:>9.3f} '
+                     f'{100.0:>6.1f}')
+        return '\n'.join(lines)
+
+
+def _ordered(stages):
+    return sorted(stages, key=lambda stage: (STAGES.index(stage) if stage in STAGES else len(STAGES), stage))
+
+
+def timed(stage: str):
+    """ декоратор стадии, пока инструментирование выключено - прямой вызов
+
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder
+            if recorder is None:
+                return func(*args, **kwargs)
+            recorder.enter()
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.exit(stage, perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def plate_done(name: str = None):
+    recorder = _recorder
+    if recorder is not None:
+        recorder.plate_done(name)
+
+
+def enable(recorder: Recorder = None) -> Recorder:
+    """ включает для всего процесса
+
+    :param recorder: or a new one
+    :return:
+    """
+    global _recorder
+    _recorder = recorder or Recorder()
+    return _recorder
+
+
+def disable() -> Recorder:
+    """
+
+    :return: the recorder that was active, stopped
+    """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.stop()
+    return recorder
+
+
+def get_recorder():
+    return _recorder
+
+
+@contextmanager
+def profiling(on_plate=None):
+    """ with profiling() as recorder: ... - enable() на время блока
+
+    """
+    recorder = enable(Recorder(on_plate))
+    try:
+        yield recorder
+    finally:
+        disable()
@@ -0,0 +1,419 @@
+""" размеры и шрифты табличек: описание вариантов (thin, wide, ...) -> проверенные неизменяемые объекты
+
+описание - dict вида DEFAULT_LAYOUT или JSON файл того же вида (load_layout): длина числом в pt или
+строкой с единицами '40mm', '215mm-173mm', '36mm+32.625pt'; размер шрифта и угол - числа
+
+compile_layout проверяет описание целиком при загрузке (лишние и пропущенные ключи, типы, шрифты)
+и дает namedtuple со всеми значениями в pt, рендер берет их атрибутами:
+
+variant = get_layout().variant('thin')
+variant.number.fonts.lvl1.size, variant.arrow.size.length, variant.vertical.name.max_lines
+
+файл может описывать не все варианты: недостающие берутся из DEFAULT_LAYOUT, новые добавляются
+"""
+from collections import namedtuple
+import json
+import os
+import pathlib
+import re
+
+# номер дома, см. pdf_maker: уровни в порядке рисования, как поля house_number.HouseNumber
+LVL1 = 'lvl1'
+SLASH = 'lvl2_slash'
+LVL2C = 'lvl2c'
+LVL2S = 'lvl2s'
+LVL3 = 'lvl3'
+
+
+def pt(mm: float) -> float:
+    """ mm to pt
+
+    :param mm:
+    :return:
+    """
+    return mm*2.834645669  # 72/25.4
+
+
+class LayoutError(ValueError):
+    pass
+
+
+class Font(namedtuple('Font', ('face', 'size', 'leading'), defaults=(None,))):
+    """ face - ключ FONT_FILES, size и leading (межстрочный) в pt
+
+    """
+
+    __slots__ = ()
+
+
+TextLine = namedtuple('TextLine', ('font', 'baseline'))
+TextLine.__doc__ = """строка таблички названия: шрифт и базовая линия от верха"""
+
+Rule = namedtuple('Rule', ('width', 'baseline'))
+Rule.__doc__ = """линия под названием: толщина и положение от верха"""
+
+SlashSize = namedtuple('SlashSize', ('margin', 'angle', 'length', 'width'))
+SlashSize.__doc__ = """дробь номера: отступы, угол в градусах, длина и толщина линии"""
+
+ArrowSize = namedtuple('ArrowSize', ('line_width', 'length', 'half_height', 'half_space'))
+ArrowSize.__doc__ = """стрелки draw_house_number_arrows: линия, длина и полувысота наконечника, полупромежуток"""
+
+NumberFonts = namedtuple('NumberFonts', (LVL1, LVL2C, LVL2S, LVL3))
+
+
+class NumberLayout(namedtuple('NumberLayout', ('widths', 'baseline', 'fonts', 'slash', 'levels'))):
+    """ номер дома: ширины таблички по длине номера, базовая линия, шрифты уровней, дробь
+
+    levels - ((имя группы, Font or None для дроби), ...) в порядке рисования, собирается при компиляции
+    """
+
+    __slots__ = ()
+
+    def width(self, length: int) -> float:
+        """ ширина таблички для номера из length символов
+
+        """
+        widths = self.widths
+        return widths[min(length, len(widths)) - 1]
+
+
+ArrowLayout = namedtuple('ArrowLayout', ('baseline', 'size', 'number_baseline', 'lvl_a1', 'lvl_a2c'))
+ArrowLayout.__doc__ = """стрелки и номера соседних домов над ними"""
+
+NameLayout = namedtuple('NameLayout', ('type', 'name', 'line', 'translit'))
+NameLayout.__doc__ = """табличка названия улицы, ширина по тексту (pdf_maker.max_width_plus)"""
+
+VerticalText = namedtuple('VerticalText', ('font', 'offset', 'max_lines'))
+VerticalText.__doc__ = """строка вертикальной таблички: сдвиг вниз от предыдущей, переносом не больше max_lines строк
+(см. line_breaking), None - без переноса"""
+
+VerticalRule = namedtuple('VerticalRule', ('width', 'offset'))
+
+VerticalLayout = namedtuple('VerticalLayout', ('width', 'height', 'margin', 'number_margin', 'type', 'name',
+                                               'line', 'translit', 'number'))
+VerticalLayout.__doc__ = """вертикальная табличка: фиксированный размер, текст сверху, номер снизу
+number_margin - левый отступ номера"""
+
+Variant = namedtuple('Variant', ('name', 'margin', 'height', 'radius', 'street', 'number', 'number_arrow', 'arrow',
+                                 'vertical'))
+Variant.__doc__ = """один вариант (thin, wide): общие margin/height/radius и раскладки всех видов табличек"""
+
+
+class Layout:
+    """ скомпилированные варианты, variant(name) или variants[name]
+
+    """
+
+    __slots__ = ('variants', 'source')
+
+    def __init__(self, variants: dict, source: str = None):
+        self.variants = variants
+        self.source = source
+
+    def variant(self, name: str) -> Variant:
+        try:
+            return self.variants[name]
+        except KeyError:
+            raise LayoutError(f'no layout variant {name!r}, known: {", ".join(self.variants)}') from None
+
+    def __repr__(self):
+        return f'Layout({self.variants!r})'
+
+
+def _font(face: str, size: float, leading: float = None) -> dict:
+    font = {'face': face, 'size': size}
+    if leading is not None:
+        font['leading'] = leading
+    return font
+
+
+def _number(baseline: str, lvl1: dict, lvl2c: dict, lvl2s: dict, lvl3: dict, slash: tuple, widths: list = None):
+    number = {'baseline': baseline, 'fonts': {LVL1: lvl1, LVL2C: lvl2c, LVL2S: lvl2s, LVL3: lvl3},
+              'slash': dict(zip(('margin', 'angle', 'length', 'width'), slash))}
+    if widths is not None:
+        number['widths'] = [f'{width}mm' for width in widths]
+    return number
+
+
+# маленькие значения ограничивают длину строки: pdf_maker.ABSTRACT_SIZE (3360mm ~ 50 больших символов)
+DEFAULT_LAYOUT = {
+    'thin': {
+        'margin': '40mm',
+        'height': '215mm',
+        'radius': '15mm',
+        'street': {
+            'type': {'font': _font('regular', 90.0), 'baseline': '215mm-173mm'},
+            'name': {'font': _font('semi-bold', 220.0), 'baseline': '215mm-94mm'},
+            'line': {'width': 4.0, 'baseline': '215mm-62mm'},
+            'translit': {'font': _font('regular', 90.0), 'baseline': '215mm-24mm'},
+        },
+        'number': _number('215mm-50mm', _font('semi-bold', 480.0), _font('bold', 300.0), _font('semi-bold', 300.0),
+                          _font('semi-bold', 220.0), ('12mm', 75, '80mm', '6mm'), (215, 280, 380, 440, 520)),
+        'number_arrow': _number('215mm-90mm', _font('semi-bold', 380.0), _font('bold', 240.0), _font('bold', 240.0),
+                                _font('semi-bold', 140.0), ('10mm', 75, '65mm', '5mm'), (215, 215, 280, 340, 440)),
+        'arrow': {
+            'baseline': '215mm-62mm',
+            'size': {'line_width': 4, 'length': '9.8mm', 'half_height': '4.25mm', 'half_space': '7.5mm'},
+            'number_baseline': '215mm-24mm',
+            'lvl_a1': _font('regular', 90),
+            'lvl_a2c': _font('semi-bold', 50),
+        },
+        'vertical': {
+            'width': '360mm',
+            'height': '480mm',
+            'margin': '36mm',
+            'number_margin': '40mm',
+            'type': {'font': _font('regular', 65.0), 'offset': '36mm+32.625pt'},
+            'name': {'font': _font('semi-bold', 110.0, 120.0), 'offset': '18mm+77.984375pt', 'max_lines': 3},
+            'line': {'width': '2mm', 'offset': '24mm'},
+            'translit': {'font': _font('regular', 65.0, 78.0), 'offset': '24mm+32.625pt', 'max_lines': 2},
+            'number': _number('480mm-48mm', _font('semi-bold', 540.0), _font('bold', 312.0), _font('bold', 312.0),
+                              _font('bold', 220.0), ('12mm', 75, '80mm', '6mm')),
+        },
+    },
+    'wide': {
+        'margin': '60mm',
+        'height': '320mm',
+        'radius': '22.5mm',
+        'street': {
+            'type': {'font': _font('regular', 135.0), 'baseline': '320mm-260mm'},
+            'name': {'font': _font('semi-bold', 330.0), 'baseline': '320mm-140mm'},
+            'line': {'width': 6.0, 'baseline': '320mm-92mm'},
+            'translit': {'font': _font('regular', 135.0), 'baseline': '320mm-36mm'},
+        },
+        'number': _number('320mm-75mm', _font('semi-bold', 720.0), _font('bold', 450.0), _font('bold', 450.0),
+                          _font('bold', 330.0), ('20mm', 75, '125mm', '9mm'), (320, 420, 565, 640, 720)),
+        'number_arrow': _number('320mm-135mm', _font('semi-bold', 570.0), _font('bold', 330.0), _font('bold', 330.0),
+                                _font('bold', 210.0), ('12mm', 75, '98mm', '7.5mm'), (320, 320, 420, 510, 660)),
+        'arrow': {
+            'baseline': '320mm-94mm',
+            'size': {'line_width': 6, 'length': '18.8mm', 'half_height': '7.4mm', 'half_space': '11.25mm'},
+            'number_baseline': '320mm-37mm',
+            'lvl_a1': _font('regular', 135),
+            'lvl_a2c': _font('semi-bold', 75),
+        },
+        'vertical': {
+            'width': '540mm',
+            'height': '720mm',
+            'margin': '54mm',
+            'number_margin': '60mm',
+            'type': {'font': _font('regular', 100.0), 'offset': '54mm+50.203125pt'},
+            'name': {'font': _font('semi-bold', 165.0, 180.0), 'offset': '18mm+116.984375pt', 'max_lines': 3},
+            'line': {'width': '3mm', 'offset': '36mm'},
+            'translit': {'font': _font('regular', 100.0, 120.0), 'offset': '57mm', 'max_lines': 2},
+            'number': _number('720mm-72mm', _font('semi-bold', 810.0), _font('bold', 470.0), _font('bold', 470.0),
+                              _font('bold', 330.0), ('12mm', 75, '80mm', '6mm')),
+        },
+    },
+}
+
+_LENGTH_TERM = re.compile(r'\s*([+-]?)\s*(\d+(?:\.\d*)?|\.\d+)\s*(mm|pt)\s*')
+
+
+class _Compiler:
+    """ проверка и перевод одного описания, ошибки с путем к значению: thin.number.fonts.lvl1.size
+
+    """
+
+    def __init__(self, faces=None):
+        self.faces = set(faces) if faces is not None else None
+
+    @staticmethod
+    def error(path: str, message: str):
+        raise LayoutError(f'{path}: {message}')
+
+    def fields(self, value, path: str, required: tuple, optional: tuple = ()) -> dict:
+        if not isinstance(value, dict):
+            self.error(path, f'expected an object, got {type(value).__name__}')
+        unknown = set(value) - set(required) - set(optional)
+        if unknown:
+            self.error(path, f'unknown keys {", ".join(sorted(unknown))}')
+        missing = [key for key in required if key not in value]
+        if missing:
+            self.error(path, f'missing {", ".join(missing)}')
+        return value
+
+    def number(self, value, path: str, positive: bool = True) -> float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            self.error(path, f'expected a number, got {value!r}')
+        if positive and not value > 0:
+            self.error(path, f'expected a positive number, got {value!r}')
+        return float(value)
+
+    def length(self, value, path: str, positive: bool = True) -> float:
+        """ 12.5 (pt), '40mm', '215mm-173mm', '36mm+32.625pt'
+
+        сначала сумма мм, потом перевод: pt(215 - 173), а не pt(215) - pt(173), те же байты pdf
+        """
+        if isinstance(value, str):
+            mm = points = 0.0
+            position = 0
+            text = value.strip()
+            while position < len(text):
+                match = _LENGTH_TERM.match(text, position)
+                if match is None or (position and not match.group(1)):
+                    self.error(path, f'bad length {value!r}, expected e.g. 40mm, 215mm-173mm, 36mm+32.625pt')
+                sign, amount, unit = match.groups()
+                amount = -float(amount) if sign == '-' else float(amount)
+                if unit == 'mm':
+                    mm += amount
+                else:
+                    points += amount
+                position = match.end()
+            if not text:
+                self.error(path, 'empty length')
+            result = pt(mm) + points if mm else points
+            if positive and not result > 0:
+                self.error(path, f'expected a positive length, got {value!r}')
+            return result
+        return self.number(value, path, positive)
+
+    def count(self, value, path: str) -> int:
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            self.error(path, f'expected a positive integer, got {value!r}')
+        return value
+
+    def font(self, value, path: str, leading: bool = False) -> Font:
+        value = self.fields(value, path, ('face', 'size'), ('leading',))
+        face = value['face']
+        if not isinstance(face, str) or self.faces is not None and face not in self.faces:
+            known = f', known: {", ".join(sorted(self.faces))}' if self.faces is not None else ''
+            self.error(f'{path}.face', f'unknown font face {face!r}{known}')
+        if leading and 'leading' not in value:
+            self.error(path, 'missing leading, needed for wrapped lines')
+        return Font(face, self.number(value['size'], f'{path}.size'),
+                    self.length(value['leading'], f'{path}.leading') if 'leading' in value else None)
+
+    def slash(self, value, path: str) -> SlashSize:
+        value = self.fields(value, path, ('margin', 'angle', 'length', 'width'))
+        return SlashSize(self.length(value['margin'], f'{path}.margin', positive=False),
+                         self.number(value['angle'], f'{path}.angle'),
+                         self.length(value['length'], f'{path}.length'),
+                         self.length(value['width'], f'{path}.width'))
+
+    def number_layout(self, value, path: str, widths: bool = True) -> NumberLayout:
+        value = self.fields(value, path, ('baseline', 'fonts', 'slash') + (('widths',) if widths else ()))
+        fonts_value = self.fields(value['fonts'], f'{path}.fonts', NumberFonts._fields)
+        fonts = NumberFonts(*(self.font(fonts_value[key], f'{path}.fonts.{key}') for key in NumberFonts._fields))
+        plate_widths = ()
+        if widths:
+            if not isinstance(value['widths'], list) or not value['widths']:
+                self.error(f'{path}.widths', 'expected a non-empty list, width by number length 1, 2, ...')
+            plate_widths = tuple(self.length(width, f'{path}.widths[{i}]') for i, width in enumerate(value['widths']))
+        levels = ((LVL1, fonts.lvl1), (SLASH, None), (LVL2C, fonts.lvl2c), (LVL2S, fonts.lvl2s), (LVL3, fonts.lvl3))
+        return NumberLayout(plate_widths, self.length(value['baseline'], f'{path}.baseline'), fonts,
+                            self.slash(value['slash'], f'{path}.slash'), levels)
+
+    def text_line(self, value, path: str) -> TextLine:
+        value = self.fields(value, path, ('font', 'baseline'))
+        return TextLine(self.font(value['font'], f'{path}.font'), self.length(value['baseline'], f'{path}.baseline'))
+
+    def vertical_text(self, value, path: str, max_lines: int = None) -> VerticalText:
+        """
+
+        :param max_lines: wrapped text, default for files with max_chars (переносы по числу символов
+            до line_breaking), None - one line
+        """
+        wrapped = max_lines is not None
+        value = self.fields(value, path, ('font', 'offset'), ('max_lines', 'max_chars') if wrapped else ())
+        if wrapped and 'max_lines' not in value and 'max_chars' not in value:
+            self.error(path, 'missing max_lines')
+        return VerticalText(self.font(value['font'], f'{path}.font', leading=wrapped),
+                            self.length(value['offset'], f'{path}.offset'),
+                            self.count(value.get('max_lines', max_lines), f'{path}.max_lines') if wrapped else None)
+
+    def variant(self, name: str, value) -> Variant:
+        path = name
+        value = self.fields(value, path, Variant._fields[1:])
+
+        street = self.fields(value['street'], f'{path}.street', NameLayout._fields)
+        line = self.fields(street['line'], f'{path}.street.line', Rule._fields)
+        street = NameLayout(self.text_line(street['type'], f'{path}.street.type'),
+                            self.text_line(street['name'], f'{path}.street.name'),
+                            Rule(self.length(line['width'], f'{path}.street.line.width'),
+                                 self.length(line['baseline'], f'{path}.street.line.baseline')),
+                            self.text_line(street['translit'], f'{path}.street.translit'))
+
+        arrow = self.fields(value['arrow'], f'{path}.arrow', ArrowLayout._fields)
+        size = self.fields(arrow['size'], f'{path}.arrow.size', ArrowSize._fields)
+        arrow = ArrowLayout(self.length(arrow['baseline'], f'{path}.arrow.baseline'),
+                            ArrowSize(*(self.length(size[key], f'{path}.arrow.size.{key}') for key in ArrowSize._fields)),
+                            self.length(arrow['number_baseline'], f'{path}.arrow.number_baseline'),
+                            self.font(arrow['lvl_a1'], f'{path}.arrow.lvl_a1'),
+                            self.font(arrow['lvl_a2c'], f'{path}.arrow.lvl_a2c'))
+
+        vertical = self.fields(value['vertical'], f'{path}.vertical', VerticalLayout._fields)
+        vertical_line = self.fields(vertical['line'], f'{path}.vertical.line', VerticalRule._fields)
+        vertical = VerticalLayout(
+            self.length(vertical['width'], f'{path}.vertical.width'),
+            self.length(vertical['height'], f'{path}.vertical.height'),
+            self.length(vertical['margin'], f'{path}.vertical.margin', positive=False),
+            self.length(vertical['number_margin'], f'{path}.vertical.number_margin', positive=False),
+            self.vertical_text(vertical['type'], f'{path}.vertical.type'),
+            self.vertical_text(vertical['name'], f'{path}.vertical.name', max_lines=3),
+            VerticalRule(self.length(vertical_line['width'], f'{path}.vertical.line.width'),
+                         self.length(vertical_line['offset'], f'{path}.vertical.line.offset')),
+            self.vertical_text(vertical['translit'], f'{path}.vertical.translit', max_lines=2),
+            self.number_layout(vertical['number'], f'{path}.vertical.number', widths=False))
+        if 2 * vertical.margin >= vertical.width:
+            self.error(f'{path}.vertical.margin', 'leaves no room for text')
+
+        result = Variant(name,
+                         self.length(value['margin'], f'{path}.margin', positive=False),
+                         self.length(value['height'], f'{path}.height'),
+                         self.length(value['radius'], f'{path}.radius', positive=False),
+                         street,
+                         self.number_layout(value['number'], f'{path}.number'),
+                         self.number_layout(value['number_arrow'], f'{path}.number_arrow'),
+                         arrow,
+                         vertical)
+        if 2 * result.radius > result.height:
+            self.error(f'{path}.radius', 'more than half of the plate height')
+        return result
+
+
+def compile_layout(description: dict, faces=None, source: str = None) -> Layout:
+    """ описание -> Layout, все ошибки описания здесь, а не при рендере
+
+    :param description: {variant name: {...}} like DEFAULT_LAYOUT
+    :param faces: known font faces (pdf_maker.FONT_FILES), None - do not check
+    :param source: file name for messages
+    :return:
+    """
+    if not isinstance(description, dict) or not description:
+        raise LayoutError(f'{source or "layout"}: expected an object with variants')
+    compiler = _Compiler(faces)
+    try:
+        variants = {name: compiler.variant(name, value) for name, value in description.items()}
+    except LayoutError as e:
+        if source:
+            raise LayoutError(f'{source}: {e}') from None
+        raise
+    return Layout(variants, source)
+
+
+def load_layout(path, faces=None) -> Layout:
+    """ JSON файл с вариантами поверх DEFAULT_LAYOUT
+
+    :param path:
+    :param faces: see compile_layout
+    :return:
+    """
+    path = pathlib.Path(path)
+    try:
+        description = json.loads(path.read_text(encoding='utf-8'))
+    except ValueError as e:
+        raise LayoutError(f'{path}: bad JSON: {e}') from None
+    if not isinstance(description, dict):
+        raise LayoutError(f'{path}: expected an object with variants')
+    return compile_layout(dict(DEFAULT_LAYOUT, **description), faces, str(path))
+
+
+def default_layout(faces=None) -> Layout:
+    """ ADDRESS_PLATE_LAYOUT (файл, доходит и до процессов пула) или DEFAULT_LAYOUT
+
+    """
+    path = os.environ.get('ADDRESS_PLATE_LAYOUT')
+    if path:
+        return load_layout(path, faces)
+    return compile_layout(DEFAULT_LAYOUT, faces)
@@ -0,0 +1,116 @@
+""" переносы строк вертикальной таблички по измеренной ширине, а не по числу символов
+
+места переноса - пробелы (пробел пропадает) и дефисы между буквами (дефис остается в строке);
+ширина любой строки из слов i..j - из advance и ink extents глифов (метрики, без кривых), один проход
+по символам текста; динамика по границам слов дает для каждого числа строк разбиение с самой узкой
+самой широкой строкой
+
+выбор: меньше всего строк, при котором текст влезает в ширину без уменьшения, иначе разбиение
+с наибольшим масштабом в пределах max_lines (при равном - меньше строк)
+
+break_lines('Омеляновича-Павленка', metrics, width, max_lines=3) -> (['Омеляновича-', 'Павленка'], widest)
+"""
+import re
+
+_WORD = re.compile(r'\S+')
+_HYPHEN = re.compile(r'(?<=\w)-(?=\w)')
+
+
+def break_points(text: str) -> list:
+    """ куски текста между местами переноса
+
+    :return: [(start, end), ...], a line of pieces i..j is text[pieces[i][0]:pieces[j][1]]
+    """
+    pieces = []
+    for word in _WORD.finditer(text):
+        start = word.start()
+        for hyphen in _HYPHEN.finditer(text, word.start(), word.end()):
+            pieces.append((start, hyphen.end()))
+            start = hyphen.end()
+        pieces.append((start, word.end()))
+    return pieces
+
+
+def _ink_right(text: str, metrics) -> tuple:
+    """ x начала и правый край ink каждого символа от начала текста
+
+    :return: (x, right), right[c] = -inf for chars without outline
+    """
+    x = [0.0] * (len(text) + 1)
+    right = [float('-inf')] * len(text)
+    position = 0.0
+    for c, char in enumerate(text):
+        glyph = metrics(char)
+        if glyph.extents:
+            right[c] = position + glyph.extents[2]
+        position += glyph.advance[0]
+        x[c + 1] = position
+    return x, right
+
+
+def line_widths(text: str, pieces: list, metrics) -> list:
+    """ ширина (правый край ink, как measure_text(...).extents[2]) строки из кусков i..j
+
+    :return: widths[i][j - i]
+    """
+    x, right = _ink_right(text, metrics)
+    widths = []
+    for i, (start, _) in enumerate(pieces):
+        row = []
+        widest = float('-inf')
+        c = start
+        for _, end in pieces[i:]:
+            while c < end:
+                if right[c] > widest:
+                    widest = right[c]
+                c += 1
+            row.append(widest - x[start] if widest > float('-inf') else 0.0)
+        widths.append(row)
+    return widths
+
+
+def break_lines(text: str, metrics, width: float, max_lines: int) -> tuple:
+    """ строки текста и ширина самой широкой
+
+    :param text:
+    :param metrics: char -> glyph_cache.GlyphMetrics, e.g. lambda char: get_glyph_metrics(face, size, char)
+    :param width: room for the text, pt
+    :param max_lines: line budget, a word longer than width stays whole and is scaled down
+    :return: ([str, ...], widest)
+    """
+    pieces = break_points(text)
+    if not pieces:
+        return [text.strip()], 0.0
+    widths = line_widths(text, pieces, metrics)
+    n = len(pieces)
+    max_lines = max(1, min(max_lines, n))
+
+    # best[k][j] - самая широкая строка лучшего разбиения кусков 0..j-1 на k строк, start[k][j] - начало последней
+    inf = float('inf')
+    best = [[inf] * (n + 1) for _ in range(max_lines + 1)]
+    start = [[0] * (n + 1) for _ in range(max_lines + 1)]
+    best[0][0] = 0.0
+    lines = 1
+    for k in range(1, max_lines + 1):
+        previous, row, row_start = best[k - 1], best[k], start[k]
+        for j in range(k, n + 1):
+            for i in range(k - 1, j):
+                value = widths[i][j - 1 - i]
+                if previous[i] > value:
+                    value = previous[i]
+                if value < row[j]:
+                    row[j] = value
+                    row_start[j] = i
+        if row[n] < best[lines][n]:
+            lines = k
+        if row[n] <= width:
+            break
+
+    result = []
+    j = n
+    for k in range(lines, 0, -1):
+        i = start[k][j]
+        result.append(text[pieces[i][0]:pieces[j - 1][1]])
+        j = i
+    result.reverse()
+    return result, best[lines][n]
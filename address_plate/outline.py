@@ -0,0 +1,141 @@
+""" контур плоскими массивами: операторы array('B') и координаты array('d') подряд
+
+вместо кортежа (type_op, points) на сегмент с float объектами: глиф в GLYPH_CACHE в ~10 раз меньше,
+pickle - два bytes, GlyphCode и numpy (numpy.frombuffer(outline.coords)) берут координаты без копии
+
+for type_op, points in outline - как раньше по Glyph.path и cairo.Path
+outline[2:5] - сегменты без копирования (memoryview), outline.transformed(scale, dx, dy) - те же операторы,
+новые координаты
+"""
+from array import array
+
+from .glyph_cache import PATH_MOVE_TO, PATH_LINE_TO, PATH_CURVE_TO, PATH_CLOSE_PATH
+
+# чисел на сегмент по PATH_*
+POINT_COUNTS = {PATH_MOVE_TO: 2, PATH_LINE_TO: 2, PATH_CURVE_TO: 6, PATH_CLOSE_PATH: 0}
+
+
+class Outline:
+    """ ops - PATH_* по сегментам, coords - x, y, x, y, ... всех сегментов, extents - (x1, y1, x2, y2) или None,
+    advance - (x, y) после контура
+
+    ops/coords - array или memoryview (срез), менять их после создания нельзя: контуры общие в кешах
+    """
+
+    __slots__ = ('ops', 'coords', 'extents', 'advance')
+
+    def __init__(self, ops=None, coords=None, extents=None, advance=(0.0, 0.0)):
+        self.ops = array('B') if ops is None else ops
+        self.coords = array('d') if coords is None else coords
+        self.extents = extents
+        self.advance = advance
+
+    @classmethod
+    def from_path(cls, path, extents=None, advance=(0.0, 0.0)) -> 'Outline':
+        """ из (type_op, points), как Glyph.path раньше или cairo.Path
+
+        """
+        ops = array('B')
+        coords = array('d')
+        for type_op, points in path:
+            ops.append(type_op)
+            coords.extend(points)
+        return cls(ops, coords, extents, advance)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __bool__(self):
+        return len(self.ops) > 0
+
+    def __iter__(self):
+        coords = self.coords
+        i = 0
+        for type_op in self.ops:
+            n = POINT_COUNTS[type_op]
+            yield type_op, tuple(coords[i:i + n])
+            i += n
+
+    def offset(self, index: int) -> int:
+        """ индекс в coords первого числа сегмента index
+
+        """
+        return sum(POINT_COUNTS[type_op] for type_op in self.ops[:index])
+
+    def __getitem__(self, index):
+        """ outline[i] - (type_op, points), outline[i:j] - Outline на тех же массивах
+
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self.ops))
+            if step != 1:
+                raise ValueError('Outline slice step must be 1')
+            stop = max(start, stop)
+            first = self.offset(start)
+            last = first + sum(POINT_COUNTS[type_op] for type_op in self.ops[start:stop])
+            return Outline(memoryview(self.ops)[start:stop], memoryview(self.coords)[first:last])
+        if index < 0:
+            index += len(self.ops)
+        type_op = self.ops[index]
+        first = self.offset(index)
+        return type_op, tuple(self.coords[first:first + POINT_COUNTS[type_op]])
+
+    def transformed(self, scale: float = 1.0, dx: float = 0.0, dy: float = 0.0) -> 'Outline':
+        """ (x * scale + dx, y * scale + dy), операторы общие с исходным
+
+        """
+        coords = array('d', self.coords)
+        coords[0::2] = array('d', [x * scale + dx for x in coords[0::2]])
+        coords[1::2] = array('d', [y * scale + dy for y in coords[1::2]])
+        extents = self.extents
+        if extents is not None:
+            x1, y1, x2, y2 = extents
+            x1, x2 = sorted((x1 * scale + dx, x2 * scale + dx))
+            y1, y2 = sorted((y1 * scale + dy, y2 * scale + dy))
+            extents = (x1, y1, x2, y2)
+        return Outline(self.ops, coords, extents, (self.advance[0] * scale, self.advance[1] * scale))
+
+    @property
+    def nbytes(self) -> int:
+        """ размер массивов без накладных расходов объектов
+
+        """
+        return len(self.ops) + len(self.coords) * 8
+
+    def __reduce__(self):
+        return _from_bytes, (bytes(self.ops), self.coords.tobytes(), self.extents, self.advance)
+
+    def __eq__(self, other):
+        if not isinstance(other, Outline):
+            return NotImplemented
+        return (bytes(self.ops) == bytes(other.ops) and self.coords.tobytes() == other.coords.tobytes()
+                and self.extents == other.extents and self.advance == other.advance)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'Outline({len(self.ops)} segments, extents={self.extents}, advance={self.advance})'
+
+
+def _from_bytes(ops: bytes, coords: bytes, extents, advance) -> Outline:
+    values = array('d')
+    values.frombytes(coords)
+    return Outline(array('B', ops), values, extents, advance)
+
+
+def concatenate(pieces, extents=None, advance=(0.0, 0.0)) -> Outline:
+    """ контуры подряд, каждый сдвинут на свои (x, y): строка текста из глифов
+
+    :param pieces: iterable of (Outline, x, y)
+    """
+    ops = array('B')
+    coords = array('d')
+    for outline, x, y in pieces:
+        ops.extend(outline.ops)
+        start = len(coords)
+        coords.extend(outline.coords)
+        if x:
+            coords[start::2] = array('d', [v + x for v in outline.coords[0::2]])
+        if y:
+            coords[start + 1::2] = array('d', [v + y for v in outline.coords[1::2]])
+    return Outline(ops, coords, extents, advance)
@@ -0,0 +1,249 @@
+""" откуда берутся контуры глифов: cairo (FreeType), чтение .ttf на чистом python или атлас глифов (mmap)
+
+все отдают Glyph/GlyphMetrics в координатах cairo: пункты, y вниз, начало в (0, 0)
+"""
+from array import array
+import threading
+
+from .atlas import AtlasError, GlyphAtlas
+from .glyph_cache import Glyph, GlyphMetrics, PATH_MOVE_TO, PATH_LINE_TO, PATH_CURVE_TO, PATH_CLOSE_PATH
+from .outline import Outline
+from .truetype import TrueTypeFont, SEG_MOVE, SEG_LINE, SEG_QUAD
+
+
+class CairoBackend:
+    """ text_path() на одном cairo.Context на поток
+
+    """
+
+    name = 'cairo'
+
+    def __init__(self, font_faces, surface_size: tuple):
+        """
+
+        :param font_faces: FontManager, font_faces[face] -> cairo.FontFace
+        :param surface_size: (width, height) of the never written PDFSurface
+        """
+        self.font_faces = font_faces
+        self.surface_size = surface_size
+        self._local = threading.local()
+
+    def _context(self):
+        """ PDFSurface, чтобы настройки шрифта (без хинтинга) были как при рендере в pdf
+
+        """
+        ctx = getattr(self._local, 'ctx', None)
+        if ctx is None:
+            import cairo
+
+            surface = cairo.PDFSurface(None, *self.surface_size)
+            ctx = self._local.ctx = cairo.Context(surface)
+        return ctx
+
+    def load_fonts(self):
+        """ все шрифты сразу, для процессов пула
+
+        """
+        for face in self.font_faces:
+            self.font_faces[face]
+
+    def glyph(self, face: str, size: float, char: str) -> Glyph:
+        ctx = self._context()
+        ctx.new_path()
+        ctx.set_font_face(self.font_faces[face])
+        ctx.set_font_size(size)
+        ctx.move_to(0, 0)
+        ctx.text_path(char)
+        path = Outline.from_path(ctx.copy_path())
+        advance = ctx.get_current_point()
+        if any(type_op != PATH_MOVE_TO for type_op in path.ops):
+            extents = ctx.path_extents()
+        else:
+            path, extents = Outline(), None
+        ctx.new_path()
+        path.extents, path.advance = extents, advance
+        return Glyph(path, advance, extents)
+
+    def metrics(self, face: str, size: float, char: str) -> GlyphMetrics:
+        ctx = self._context()
+        ctx.set_font_face(self.font_faces[face])
+        ctx.set_font_size(size)
+        x_bearing, y_bearing, width, height, x_advance, y_advance = ctx.text_extents(char)
+        extents = (x_bearing, y_bearing, x_bearing + width, y_bearing + height) if width or height else None
+        return GlyphMetrics((x_advance, y_advance), extents)
+
+
+def _quad_extrema(p0: float, c: float, p1: float):
+    """ экстремум квадратичной кривой по одной оси, если он внутри отрезка
+
+    """
+    denominator = p0 - 2 * c + p1
+    if denominator:
+        t = (p0 - c) / denominator
+        if 0 < t < 1:
+            yield (1 - t) * (1 - t) * p0 + 2 * t * (1 - t) * c + t * t * p1
+
+
+class TrueTypeBackend:
+    """ контуры прямо из glyf таблиц FONT_FILES, без cairo и FreeType
+
+    квадратичные сплайны TrueType переводятся в кубические, как это делает cairo
+    """
+
+    name = 'truetype'
+
+    def __init__(self, font_files):
+        """
+
+        :param font_files: FontManager (files + faceindex) or {face: filename}
+        """
+        self.font_files = font_files
+        self._fonts = {}
+        self._bounds = {}
+        self._lock = threading.Lock()
+
+    def font(self, face: str) -> TrueTypeFont:
+        font = self._fonts.get(face)
+        if font is None:
+            with self._lock:
+                font = self._fonts.get(face)
+                if font is None:
+                    if isinstance(self.font_files, dict):
+                        filename, faceindex = self.font_files[face], 0
+                    else:
+                        filename, faceindex = self.font_files.files[face], self.font_files.faceindex(face)
+                    font = self._fonts[face] = TrueTypeFont(filename, faceindex)
+        return font
+
+    def load_fonts(self):
+        """ все шрифты сразу, для процессов пула
+
+        """
+        for face in self.font_files:
+            self.font(face)
+
+    def _units_bounds(self, face: str, font: TrueTypeFont, glyph_id: int):
+        """ точные границы контура (с экстремумами кривых) в единицах шрифта, y вверх
+
+        """
+        key = (face, glyph_id)
+        bounds = self._bounds.get(key)
+        if bounds is None and key not in self._bounds:
+            xs, ys = [], []
+            x0 = y0 = 0
+            for seg in font.outline(glyph_id):
+                if seg[0] == SEG_QUAD:
+                    _, cx, cy, x, y = seg
+                    xs.extend(_quad_extrema(x0, cx, x))
+                    ys.extend(_quad_extrema(y0, cy, y))
+                if seg[0] in (SEG_MOVE, SEG_LINE, SEG_QUAD):
+                    x0, y0 = seg[-2], seg[-1]
+                    xs.append(x0)
+                    ys.append(y0)
+            bounds = self._bounds[key] = (min(xs), min(ys), max(xs), max(ys)) if xs else None
+        return bounds
+
+    def glyph(self, face: str, size: float, char: str) -> Glyph:
+        font = self.font(face)
+        glyph_id = font.glyph_id(char)
+        scale = size / font.units_per_em
+
+        ops = array('B')
+        coords = array('d')
+        x0 = y0 = 0.0
+        for seg in font.outline(glyph_id):
+            op = seg[0]
+            if op == SEG_MOVE:
+                x0, y0 = seg[1] * scale, -seg[2] * scale
+                ops.append(PATH_MOVE_TO)
+                coords.extend((x0, y0))
+            elif op == SEG_LINE:
+                x0, y0 = seg[1] * scale, -seg[2] * scale
+                ops.append(PATH_LINE_TO)
+                coords.extend((x0, y0))
+            elif op == SEG_QUAD:
+                cx, cy = seg[1] * scale, -seg[2] * scale
+                x, y = seg[3] * scale, -seg[4] * scale
+                ops.append(PATH_CURVE_TO)
+                coords.extend((x0 + 2 / 3 * (cx - x0), y0 + 2 / 3 * (cy - y0),
+                               x + 2 / 3 * (cx - x), y + 2 / 3 * (cy - y),
+                               x, y))
+                x0, y0 = x, y
+            else:
+                ops.append(PATH_CLOSE_PATH)
+
+        metrics = self.metrics(face, size, char)
+        return Glyph(Outline(ops, coords, metrics.extents, metrics.advance), metrics.advance, metrics.extents)
+
+    def metrics(self, face: str, size: float, char: str) -> GlyphMetrics:
+        font = self.font(face)
+        glyph_id = font.glyph_id(char)
+        scale = size / font.units_per_em
+        bounds = self._units_bounds(face, font, glyph_id)
+        extents = None
+        if bounds:
+            x1, y1, x2, y2 = bounds
+            extents = (x1 * scale, -y2 * scale, x2 * scale, -y1 * scale)
+        return GlyphMetrics((font.advance(glyph_id) * scale, 0.0), extents)
+
+
+class AtlasBackend:
+    """ контуры и метрики из атласа atlas.build_atlas(): mmap файла, без разбора .ttf, cairo и FreeType
+
+    те же кривые и границы, что у TrueTypeBackend; глиф в размере - копия контура атласа с масштабом
+    """
+
+    name = 'atlas'
+
+    def __init__(self, font_files, path: str = None):
+        """
+
+        :param font_files: FontManager (files + faceindex) or {face: filename}, to check the atlas is not stale
+        :param path: default atlas.atlas_path() when first used
+        """
+        self.font_files = font_files
+        self.path = path
+        self._atlas = None
+        self._lock = threading.Lock()
+
+    def atlas(self) -> GlyphAtlas:
+        atlas = self._atlas
+        if atlas is None:
+            with self._lock:
+                atlas = self._atlas
+                if atlas is None:
+                    atlas = GlyphAtlas(self.path)
+                    stale = atlas.stale_faces(self.font_files)
+                    if stale:
+                        raise AtlasError(f'{atlas.path}: built from other fonts ({", ".join(stale)}), '
+                                         f'rebuild it with: python address_plate.py atlas')
+                    self._atlas = atlas
+        return atlas
+
+    def load_fonts(self):
+        """ отображение атласа, для процессов пула
+
+        """
+        self.atlas()
+
+    def glyph(self, face: str, size: float, char: str) -> Glyph:
+        font = self.atlas()[face]
+        path = font.outline(font.glyph_id(char)).transformed(size / font.units_per_em)
+        return Glyph(path, path.advance, path.extents)
+
+    def metrics(self, face: str, size: float, char: str) -> GlyphMetrics:
+        font = self.atlas()[face]
+        glyph_id = font.glyph_id(char)
+        scale = size / font.units_per_em
+        extents = font.extents(glyph_id)
+        if extents:
+            x1, y1, x2, y2 = extents
+            extents = (x1 * scale, y1 * scale, x2 * scale, y2 * scale)
+        return GlyphMetrics((font.advance(glyph_id) * scale, 0.0), extents)
+
+    def kerning(self, face: str, size: float, left: str, right: str) -> float:
+        """ поправка advance между двумя символами по таблице kern, пункты
+
+        """
+        font = self.atlas()[face]
+        return font.kerning(font.glyph_id(left), font.glyph_id(right)) * size / font.units_per_em
@@ -0,0 +1,65 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import os
+
+from .plate_spec import render_result
+
+
+def _init_worker():
+    """ шрифты грузятся один раз на процесс, а не на табличку
+
+    """
+    from . import pdf_maker
+
+    pdf_maker.get_outline_backend().load_fonts()
+
+
+def _render_chunk(chunk, profile=None):
+    return [render_result(spec, index, profile) for index, spec in chunk]
+
+
+def _chunks(specs, chunksize):
+    chunk = []
+    for item in enumerate(specs):
+        chunk.append(item)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_parallel(specs, workers: int = None, chunksize: int = 16, ordered: bool = True, prefetch: int = 4,
+                    profile=None):
+    """ рендер PlateSpec в пуле процессов
+
+    :param specs: iterable of PlateSpec, читается по мере работы; Exception вместо PlateSpec уходит в error
+    :param workers: processes, default os.cpu_count()
+    :param chunksize: specs per task, больше - меньше накладных расходов на pickle
+    :param ordered: results in specs order, else as they complete
+    :param prefetch: chunks in flight per worker, ограничивает память
+    :param profile: pdf_maker.OutputProfile or its name
+    :return: generator of RenderResult, ошибки строк в RenderResult.error
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(specs, chunksize)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = deque()
+
+        def submit():
+            while len(pending) < workers * prefetch:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.append(executor.submit(_render_chunk, chunk, profile))
+
+        submit()
+        while pending:
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+            submit()
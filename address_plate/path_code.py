@@ -0,0 +1,198 @@
+""" контуры -> операторы пути pdf одной строкой, без moveTo/lineTo/curveTo и fp_str на каждый сегмент
+
+GlyphCode - контур глифа, разобранный один раз: шаблон операторов '%s %s m %s %s l ... h' и плоский кортеж
+координат; строка текста - шаблоны глифов подряд, координаты сдвинуты на advance (и масштаб/перенос)
+за один проход, числа форматируются одной операцией % на всю строку
+
+байты те же, что у PDFPathObject: числа как у reportlab fp_str (6 значащих после точки по величине,
+без хвостовых нулей, .5 вместо 0.5), округление OutputProfile.digits - тот же round; где формат
+не совпал бы (|x| >= 10**5), вся строка идет через fp_str
+
+numpy (если установлен) считает сдвиги и точность для длинных строк, от STRING_NUMPY_MIN координат;
+ADDRESS_PLATE_NUMPY=0 - без него
+"""
+from collections import namedtuple
+import os
+
+from .glyph_cache import GlyphCache, PATH_MOVE_TO, PATH_LINE_TO, PATH_CURVE_TO, PATH_CLOSE_PATH
+from .outline import Outline
+
+_OPERATORS = {PATH_MOVE_TO: 'm', PATH_LINE_TO: 'l', PATH_CURVE_TO: 'c', PATH_CLOSE_PATH: 'h'}
+_TEMPLATES = {PATH_MOVE_TO: '%s %s m', PATH_LINE_TO: '%s %s l', PATH_CURVE_TO: '%s %s %s %s %s %s c',
+              PATH_CLOSE_PATH: 'h'}
+
+# точность '%.Nf' у fp_str: 6 для |x| < 10, на одну меньше на каждый порядок
+_PRECISION_FORMATS = ('%.6f', '%.5f', '%.4f', '%.3f', '%.2f')
+_FORMAT_LIMIT = 1e5
+_TINY = 1e-7
+
+
+STRING_NUMPY_MIN = 2048
+
+GlyphCode = namedtuple('GlyphCode', ('template', 'coords'))
+GlyphCode.__doc__ = """операторы глифа с '%s' вместо чисел и координаты (x, y, x, y, ...) от (0, 0),
+tuple или array('d') контура"""
+
+GLYPH_CODE_CACHE = GlyphCache()
+
+_numpy = None
+
+
+def _get_numpy():
+    """ numpy или False, импорт при первой длинной строке (127 ms, не на старте CLI)
+
+    """
+    global _numpy
+    if _numpy is None:
+        _numpy = False
+        if os.environ.get('ADDRESS_PLATE_NUMPY', '1') not in ('0', 'false', 'no'):
+            try:
+                import numpy
+                _numpy = numpy
+            except ImportError:
+                pass
+    return _numpy
+
+
+def glyph_code(path) -> GlyphCode:
+    """ Glyph.path (outline.Outline) или (type_op, points) -> GlyphCode
+
+    у Outline координаты не копируются, GlyphCode.coords - тот же array('d')
+    """
+    if isinstance(path, Outline):
+        return GlyphCode(' '.join(map(_TEMPLATES.__getitem__, path.ops)), path.coords)
+    parts = []
+    coords = []
+    for type_op, points in path:
+        parts.append('%s ' * len(points) + _OPERATORS[type_op])
+        coords.extend(points)
+    return GlyphCode(' '.join(parts), tuple(coords))
+
+
+def _strip(text: str, decimals: int) -> str:
+    """ числа '%.Nf' через пробел -> как у fp_str: без хвостовых нулей и точки, '.5' вместо '0.5'
+
+    replace вместо regex: за проход снимается по нулю с конца каждого числа, точка защищает целую часть
+
+    :param decimals: largest N
+    """
+    if not decimals:
+        return text
+    text = f' {text} '
+    for _ in range(decimals):
+        text = text.replace('0 ', ' ')
+    return text.replace('. ', ' ').replace(' 0.', ' .')[1:-1]
+
+
+def _fp_str(values) -> str:
+    from reportlab.lib.rl_accel import fp_str
+
+    return fp_str(values)
+
+
+def format_numbers(values: list, digits: int = None) -> str:
+    """ fp_str(values) (или fp_str округленных до digits) одной строкой
+
+    :param values: list of float
+    :param digits: see OutputProfile.digits
+    :return: numbers separated by spaces
+    """
+    if not values:
+        return ''
+    largest = max(max(values), -min(values))
+    if digits is not None:
+        if largest >= 10 ** (6 - digits) or digits > 6:
+            return _fp_str([round(v, digits) for v in values])
+        # '%.2f' уже округляет как round(x, 2), -0.00 -> 0 как у fp_str для round(x, 2) == -0.0
+        text = _strip(' '.join((f'%.{digits}f',) * len(values)) % tuple(values), digits)
+        if '-0' in text:
+            text = f' {text} '
+            while ' -0 ' in text:
+                text = text.replace(' -0 ', ' 0 ')
+            text = text[1:-1]
+        return text
+    if largest >= _FORMAT_LIMIT:
+        return _fp_str(values)
+
+    numpy = _get_numpy() if len(values) >= STRING_NUMPY_MIN else False
+    if numpy:
+        array = numpy.asarray(values)
+        magnitude = numpy.abs(array)
+        array[magnitude <= _TINY] = 0.0
+        precision = numpy.searchsorted((10.0, 100.0, 1000.0, 10000.0), magnitude, side='right').tolist()
+        values = array.tolist()
+    else:
+        precision = []
+        tiny = []
+        for i, v in enumerate(values):
+            magnitude = v if v >= 0 else -v
+            if magnitude <= _TINY:
+                tiny.append(i)
+            precision.append((magnitude >= 10.0) + (magnitude >= 100.0) + (magnitude >= 1000.0)
+                             + (magnitude >= 10000.0))
+        if tiny:
+            # fp_str: '0' и для -1e-9, '%.6f' дал бы '-0'
+            values = list(values)
+            for i in tiny:
+                values[i] = 0.0
+    return _strip(' '.join(map(_PRECISION_FORMATS.__getitem__, precision)) % tuple(values), 6)
+
+
+def _coords(pieces, scale: float, dx: float, dy: float) -> list:
+    """ координаты всех глифов подряд: сдвиг каждого в (x, y) на строке, потом масштаб и перенос
+
+    """
+    transform = scale != 1.0 or dx or dy
+    numpy = _get_numpy() if sum(len(code.coords) for code, _, _ in pieces) >= STRING_NUMPY_MIN else False
+    if numpy:
+        arrays = []
+        for code, x, y in pieces:
+            if code.coords:
+                array = numpy.array(code.coords).reshape(-1, 2)
+                if x or y:
+                    array += (x, y)
+                arrays.append(array)
+        if not arrays:
+            return []
+        array = numpy.concatenate(arrays)
+        if transform:
+            array *= scale
+            array += (dx, dy)
+        return array.ravel().tolist()
+
+    coords = []
+    for code, x, y in pieces:
+        if not x and not y:
+            coords.extend(code.coords)
+        else:
+            start = len(coords)
+            coords.extend(code.coords)
+            coords[start::2] = [v + x for v in code.coords[0::2]]
+            if y:
+                coords[start + 1::2] = [v + y for v in code.coords[1::2]]
+    if transform:
+        coords[0::2] = [v * scale + dx for v in coords[0::2]]
+        coords[1::2] = [v * scale + dy for v in coords[1::2]]
+    return coords
+
+
+def path_code(pieces, digits: int = None, scale: float = 1.0, dx: float = 0.0, dy: float = 0.0) -> str:
+    """ операторы пути pdf для нескольких контуров, как getCode() у PDFPathObject после add_path
+
+    точка (u, v) глифа, поставленного в (x, y): ((u + x) * scale + dx, (v + y) * scale + dy)
+
+    :param pieces: iterable of (GlyphCode, x, y)
+    :param digits: round coordinates, see OutputProfile.digits
+    :param scale:
+    :param dx:
+    :param dy:
+    :return: e.g. '1 2 m 3 4 l h', '' for no segments
+    """
+    pieces = [piece for piece in pieces if piece[0].template]
+    if not pieces:
+        return ''
+    template = ' '.join(code.template for code, _, _ in pieces)
+    coords = _coords(pieces, scale, dx, dy)
+    if not coords:
+        return template
+    return template % tuple(format_numbers(coords, digits).split(' '))
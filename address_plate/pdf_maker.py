@@ -1,15 +1,35 @@
 # -*- coding: utf-8 -*-
-import cairo
+from array import array
+import hashlib
 import io
+from collections import namedtuple
+from contextlib import contextmanager
 from math import sin, cos, radians
 from reportlab.pdfgen import canvas
+from reportlab.pdfgen.pathobject import PDFPathObject
 from reportlab.lib.colors import PCMYKColor
-import textwrap
+import os
 import pathlib
 import sys
-
-from .regex_objs import house_number_re_tuple, house_number_arrow_re_tuple
-from .pdf_utils import create_cairo_font_face_for_file
+import threading
+from reportlab import rl_config
+
+from .house_number import HouseNumber, parse_house_number, parse_arrow_number
+from .font_manager import FontManager
+from .glyph_cache import GLYPH_CACHE, METRICS_CACHE, Glyph, GlyphCache, GlyphMetrics
+from .plate_spec import PlateSpec, NAME, NUMBER, VERTICAL, number_file_name, street_file_name
+from .plate_cache import get_cache
+from . import instrument
+from .instrument import timed
+from .glyph_cache import PATH_MOVE_TO, PATH_LINE_TO, PATH_CURVE_TO, PATH_CLOSE_PATH
+from . import atlas, house_number, layout, line_breaking, outline, outline_backend, truetype
+from . import path_code as path_code_module  # path_code ниже - функция
+from .layout import (pt, Font, Layout, NumberLayout, ArrowLayout, NameLayout, VerticalLayout, VerticalText,
+                     compile_layout, default_layout, load_layout)
+from .line_breaking import break_lines
+from .outline import Outline, concatenate
+from .path_code import GLYPH_CODE_CACHE, GlyphCode, glyph_code, path_code
+from .outline_backend import AtlasBackend, CairoBackend, TrueTypeBackend
 
 COLOR_WHITE = PCMYKColor(0, 0, 0, 0)
 COLOR_DARK_BLUE = PCMYKColor(75, 65, 0, 75)
@@ -36,15 +56,6 @@ ARROW_RIGHT = 0b01
 ARROW_BOTH = ARROW_LEFT | ARROW_RIGHT
 
 
-def pt(mm: float) -> float:
-    """ mm to pt
-
-    :param mm:
-    :return:
-    """
-    return mm*2.834645669  # 72/25.4
-
-
 current_file_path = pathlib.Path(__file__).parent.absolute()
 FONT_FILES = {
     # 'regular': 'address_plate/fonts/probanav2-regular-webfont.ttf',
@@ -55,129 +66,34 @@ FONT_FILES = {
     'bold': str(current_file_path.joinpath('fonts', 'probanav2-bold-webfont.ttf')),
 }
 
-FONT_FACE = {
-    'regular': create_cairo_font_face_for_file(FONT_FILES['regular'], faceindex=0),
-    'semi-bold': create_cairo_font_face_for_file(FONT_FILES['semi-bold'], faceindex=0),
-    'bold': create_cairo_font_face_for_file(FONT_FILES['bold'], faceindex=0),
-}
 
-SIZES_PT = {
-    # маленькие заначения ограничивают длину строки (3360mm ~ 50 больших символов
-    'abstract_width': pt(3360),
-    'abstract_height': pt(720),
-
-    'thin_round_radius': pt(15.0),
-    'wide_round_radius': pt(22.5),
-
-    'thin_margin': pt(40),
-    'thin_height': pt(215),
-
-    'wide_margin': pt(60),
-    'wide_height': pt(320),
-
-    'thin_street_type_font': {'face': 'regular', 'size': 90.0},
-    'thin_street_type_bl': pt(215-173),
-    'thin_street_name_font': {'face': 'semi-bold', 'size': 220.0},
-    'thin_street_name_bl': pt(215-94),
-    'thin_street_line_width': 4.0,
-    'thin_street_line_bl': pt(215-62),
-    'thin_street_translit_font': {'face': 'regular', 'size': 90.0},
-    'thin_street_translit_bl': pt(215-24),
-
-    'wide_street_type_font': {'face': 'regular', 'size': 135.0},
-    'wide_street_type_bl': pt(320-260),
-    'wide_street_name_font': {'face': 'semi-bold', 'size': 330.0},
-    'wide_street_name_bl': pt(320-140),
-    'wide_street_line_width': 6.0,
-    'wide_street_line_bl': pt(320-92),
-    'wide_street_translit_font': {'face': 'regular', 'size': 135.0},
-    'wide_street_translit_bl': pt(320-36),
-
-    'thin_house_number_width': (pt(215), pt(280), pt(380), pt(440), pt(520)),
-    'thin_house_number_bl': pt(215-50),
-    'thin_house_number_font_lvl1': {'face': 'semi-bold', 'size': 480.0},
-    'thin_house_number_font_lvl2c': {'face': 'bold', 'size': 300.0},
-    'thin_house_number_font_lvl2s': {'face': 'semi-bold', 'size': 300.0},
-    'thin_house_number_font_lvl3': {'face': 'semi-bold', 'size': 220.0},
-    'thin_house_number_slash_size': (pt(12), 75, pt(80), pt(6)),
-
-    'wide_house_number_width': (pt(320), pt(420), pt(565), pt(640), pt(720)),
-    'wide_house_number_bl': pt(320-75),
-    'wide_house_number_font_lvl1': {'face': 'semi-bold', 'size': 720.0},
-    'wide_house_number_font_lvl2c': {'face': 'bold', 'size': 450.0},
-    'wide_house_number_font_lvl2s': {'face': 'bold', 'size': 450.0},
-    'wide_house_number_font_lvl3': {'face': 'bold', 'size': 330.0},
-    'wide_house_number_slash_size': (pt(20), 75, pt(125), pt(9)),
-
-    'thin_house_number_arrow_width': (pt(215), pt(215), pt(280), pt(340), pt(440)),
-    'thin_house_number_arrow_bl': pt(215 - 90),
-    'thin_house_number_arrow_font_lvl1': {'face': 'semi-bold', 'size': 380.0},
-    'thin_house_number_arrow_font_lvl2c': {'face': 'bold', 'size': 240.0},
-    'thin_house_number_arrow_font_lvl2s': {'face': 'bold', 'size': 240.0},
-    'thin_house_number_arrow_font_lvl3': {'face': 'semi-bold', 'size': 140.0},
-    'thin_house_number_arrow_slash_size': (pt(10), 75, pt(65), pt(5)),
-    'thin_house_number_arrow_arrow_bl': pt(215-62),
-    'thin_house_number_arrow_arrow_size': {'line_width': 4, 'length': pt(9.8),
-                                           'half_height': pt(8.5/2), 'half_space': pt(15/2)},
-    'thin_house_number_arrow_number_bl': pt(215-24),
-    'thin_house_number_arrow_number_font_lvl_a1': {'face': 'regular', 'size': 90},
-    'thin_house_number_arrow_number_font_lvl_a2c': {'face': 'semi-bold', 'size': 50},
-
-    'wide_house_number_arrow_width': (pt(320), pt(320), pt(420), pt(510), pt(660)),
-    'wide_house_number_arrow_bl': pt(320 - 135),
-    'wide_house_number_arrow_font_lvl1': {'face': 'semi-bold', 'size': 570.0},
-    'wide_house_number_arrow_font_lvl2c': {'face': 'bold', 'size': 330.0},
-    'wide_house_number_arrow_font_lvl2s': {'face': 'bold', 'size': 330.0},
-    'wide_house_number_arrow_font_lvl3': {'face': 'bold', 'size': 210.0},
-    'wide_house_number_arrow_slash_size': (pt(12), 75, pt(98), pt(7.5)),
-    'wide_house_number_arrow_arrow_bl': pt(320-94),
-    'wide_house_number_arrow_arrow_size': {'line_width': 6, 'length': pt(18.8),
-                                           'half_height': pt(14.8/2), 'half_space': pt(22.5/2)},
-    'wide_house_number_arrow_number_bl': pt(320-37),
-    'wide_house_number_arrow_number_font_lvl_a1': {'face': 'regular', 'size': 135},
-    'wide_house_number_arrow_number_font_lvl_a2c': {'face': 'semi-bold', 'size': 75},
-
-    'thin_vertical_width': pt(360),
-    'thin_vertical_height': pt(480),
-    'thin_vertical_margin': pt(36),
-    'thin_vertical_street_type_font': {'face': 'regular', 'size': 65.0},
-    'thin_vertical_street_type_bl': pt(36.0) + 32.625,
-    'thin_vertical_street_name_font': {'face': 'semi-bold', 'size': 110.0, 'leading': 120.0},
-    'thin_vertical_street_name_translate': pt(18) + 77.984375,
-    'thin_vertical_street_line_width': pt(2.0),
-    'thin_vertical_street_line_translate': pt(24.0),
-    'thin_vertical_street_name_max_char': 15,
-    'thin_vertical_street_translit_font': {'face': 'regular', 'size': 65.0, 'leading': 78.0},
-    'thin_vertical_street_translit_translate': pt(24) + 32.625,
-    'thin_vertical_street_translit_max_char': 30,
-    'thin_vertical_house_number_bl': pt(480 - 48),
-    'thin_vertical_house_number_font_lvl1': {'face': 'semi-bold', 'size': 540.0},
-    'thin_vertical_house_number_font_lvl2c': {'face': 'bold', 'size': 312.0},
-    'thin_vertical_house_number_font_lvl2s': {'face': 'bold', 'size': 312.0},
-    'thin_vertical_house_number_font_lvl3': {'face': 'bold', 'size': 220.0},
-    'thin_vertical_house_number_slash_size': (pt(12), 75, pt(80), pt(6)),
-
-    'wide_vertical_width': pt(540),
-    'wide_vertical_height': pt(720),
-    'wide_vertical_margin': pt(54),
-    'wide_vertical_street_type_font': {'face': 'regular', 'size': 100.0},
-    'wide_vertical_street_type_bl': pt(54.0) + 50.203125,
-    'wide_vertical_street_name_font': {'face': 'semi-bold', 'size': 165.0, 'leading': 180.0},
-    'wide_vertical_street_name_translate': pt(18) + 116.984375,
-    'wide_vertical_street_name_max_char': 15,
-    'wide_vertical_street_line_width': pt(3.0),
-    'wide_vertical_street_line_translate': pt(36.0),
-    'wide_vertical_street_translit_font': {'face': 'regular', 'size': 100.0, 'leading': 120.0},
-    'wide_vertical_street_translit_translate': pt(57.0),
-    'wide_vertical_street_translit_max_char': 30,
-    'wide_vertical_house_number_bl': pt(720 - 72),
-    'wide_vertical_house_number_font_lvl1': {'face': 'semi-bold', 'size': 810.0},
-    'wide_vertical_house_number_font_lvl2c': {'face': 'bold', 'size': 470.0},
-    'wide_vertical_house_number_font_lvl2s': {'face': 'bold', 'size': 470.0},
-    'wide_vertical_house_number_font_lvl3': {'face': 'bold', 'size': 330.0},
-    'wide_vertical_house_number_slash_size': (pt(12), 75, pt(80), pt(6)),
+# FONT_FACE[face] -> cairo.FontFace, грузится при первом обращении
+# ещё шрифты: FONT_FACE.register('condensed', path), потом Font('condensed', size) или 'face' в layout
+FONT_FACE = FontManager(FONT_FILES)
 
-}
+# маленькие значения ограничивают длину строки (3360mm ~ 50 больших символов)
+ABSTRACT_SIZE = (pt(3360), pt(720))
+
+# размеры и шрифты табличек, см. layout.py; ADDRESS_PLATE_LAYOUT - свой JSON файл
+_layout = default_layout(FONT_FILES)
+
+
+def set_layout(value):
+    """ другие размеры табличек: Layout, описание как layout.DEFAULT_LAYOUT или путь к JSON
+
+    шрифты проверяются по FONT_FILES, свои FONT_FACE.register до вызова
+    """
+    global _layout
+    if isinstance(value, Layout):
+        _layout = value
+    elif isinstance(value, dict):
+        _layout = compile_layout(value, FONT_FILES)
+    else:
+        _layout = load_layout(value, FONT_FILES)
+
+
+def get_layout() -> Layout:
+    return _layout
 
 
 def draw_background(work_canvas, width, height, radius):
@@ -189,88 +105,363 @@ def draw_background(work_canvas, width, height, radius):
 
 
 def draw_house_number_arrows(work_canvas: canvas.Canvas, width: float, margin: float, base_line: float,
-                             size: dict, arrows: int):
+                             size, arrows: int):
 
     def draw_arrow(x: float, y: float, k: int):
         """ k= -1 or 1
         """
         p = work_canvas.beginPath()
         p.moveTo(x, y)
-        p.lineTo(x + k * size['length'], y + size['half_height'])
-        p.lineTo(x + k * size['length'], y - size['half_height'])
+        p.lineTo(x + k * size.length, y + size.half_height)
+        p.lineTo(x + k * size.length, y - size.half_height)
         p.close()
         work_canvas.drawPath(p, fill=1, stroke=0)
 
     work_canvas.saveState()
     work_canvas.setFillColor(COLOR_WHITE)
     work_canvas.setStrokeColor(COLOR_WHITE)
-    work_canvas.setLineWidth(size['line_width'])
+    work_canvas.setLineWidth(size.line_width)
 
     if arrows & ARROW_LEFT:
         draw_arrow(margin, base_line, 1)
-        work_canvas.line(margin + size['length'], base_line, width/2-size['half_space'], base_line)
+        work_canvas.line(margin + size.length, base_line, width/2-size.half_space, base_line)
     else:
-        work_canvas.line(margin, base_line, width/2+size['half_space'], base_line)
+        work_canvas.line(margin, base_line, width/2+size.half_space, base_line)
 
     if arrows & ARROW_RIGHT:
         draw_arrow(width-margin, base_line, -1)
-        work_canvas.line(width/2+size['half_space'], base_line, width - margin - size['length'], base_line)
+        work_canvas.line(width/2+size.half_space, base_line, width - margin - size.length, base_line)
     else:
-        work_canvas.line(width/2-size['half_space'], base_line, width - margin, base_line)
+        work_canvas.line(width/2-size.half_space, base_line, width - margin, base_line)
 
     work_canvas.restoreState()
 
 
+OUTLINE_BACKENDS = {
+    'cairo': CairoBackend(FONT_FACE, ABSTRACT_SIZE),
+    'truetype': TrueTypeBackend(FONT_FACE),
+    'atlas': AtlasBackend(FONT_FACE),
+}
+_outline_backend = OUTLINE_BACKENDS[os.environ.get('ADDRESS_PLATE_OUTLINE_BACKEND', 'cairo')]
+
+
+def set_outline_backend(name: str):
+    """ 'cairo' (по умолчанию), 'truetype' или 'atlas', ключ кешей глифов включает имя
+
+    :param name: OUTLINE_BACKENDS key
+    """
+    global _outline_backend
+    _outline_backend = OUTLINE_BACKENDS[name]
+
+
+def get_outline_backend():
+    return _outline_backend
+
+
+_file_digests = {}
+
+
+def _file_digest(filename: str) -> str:
+    """ sha256 содержимого, пересчитывается только если файл изменился
+
+    """
+    stat = os.stat(filename)
+    key = (filename, stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(key)
+    if digest is None:
+        digest = _file_digests[key] = hashlib.sha256(pathlib.Path(filename).read_bytes()).hexdigest()
+    return digest
+
+
+def layout_fingerprint() -> str:
+    """ всё, от чего зависят байты pdf кроме параметров таблички
+
+    размеры get_layout(), цвета, содержимое файлов шрифтов (у backend atlas - заголовок атласа), backend контуров,
+    исходники рендера, версия reportlab;
+    любое изменение дает новый отпечаток, и кешированные таблички становятся недоступны
+    """
+    from reportlab import Version
+
+    digest = hashlib.sha256()
+    digest.update(repr(_layout).encode())
+    digest.update(repr((COLOR_WHITE, COLOR_DARK_BLUE)).encode())
+    if isinstance(_outline_backend, AtlasBackend):
+        # атлас работает без .ttf: sha256 шрифтов, faceindex и версия записаны в его заголовке
+        digest.update(_outline_backend.atlas().digest.encode())
+    else:
+        for face in sorted(FONT_FILES):
+            digest.update(f'{face}:{FONT_FACE.faceindex(face)}:{_file_digest(FONT_FILES[face])}'.encode())
+    digest.update(_outline_backend.name.encode())
+    for module_file in (__file__, outline_backend.__file__, truetype.__file__, atlas.__file__, layout.__file__,
+                        path_code_module.__file__, outline.__file__, house_number.__file__, line_breaking.__file__):
+        digest.update(_file_digest(module_file).encode())
+    digest.update(Version.encode())
+    return digest.hexdigest()
+
+
+@timed('glyph')
+def _make_glyph(backend: str, face: str, size: float, char: str) -> Glyph:
+    return OUTLINE_BACKENDS[backend].glyph(face, size, char)
+
+
+@timed('glyph')
+def _make_glyph_metrics(backend: str, face: str, size: float, char: str) -> GlyphMetrics:
+    return OUTLINE_BACKENDS[backend].metrics(face, size, char)
+
+
+def get_glyph(face: str, size: float, char: str) -> Glyph:
+    """ outline of one char from (0, 0)
+
+    :param face: FONT_FACE key
+    :param size: font size
+    :param char:
+    :return:
+    """
+    return GLYPH_CACHE.get((_outline_backend.name, face, size, char), _make_glyph)
+
+
+@timed('glyph')
+def _make_glyph_code(backend: str, face: str, size: float, char: str) -> GlyphCode:
+    return glyph_code(get_glyph(face, size, char).path)
+
+
+def get_glyph_code(face: str, size: float, char: str) -> GlyphCode:
+    """ outline of one char as a pdf operator template, see path_code
+
+    """
+    return GLYPH_CODE_CACHE.get((_outline_backend.name, face, size, char), _make_glyph_code)
+
+
+def get_glyph_metrics(face: str, size: float, char: str) -> GlyphMetrics:
+    """ advance and ink extents of one char without building its outline
+
+    """
+    return METRICS_CACHE.get((_outline_backend.name, face, size, char), _make_glyph_metrics)
+
+
+COMPONENT_CACHE = GlyphCache(1024)
+"""готовые части табличек: шапка вертикальной (тип, название, транслит), стрелки с соседями, номер,
+строки названия улицы; улица из 300 домов - одна шапка и 300 номеров"""
+
+
+def get_component(kind: str, make, *inputs):
+    """ часть таблички по ее входам, make(*inputs) только при промахе
+
+    в ключе kind, backend контуров и inputs - тексты и части layout варианта (namedtuple, по значению,
+    set_layout дает новые ключи); компонент после создания не меняется и общий для табличек и потоков
+
+    :param kind: e.g. 'vertical-header'
+    :param make: callable(*inputs)
+    :param inputs: hashable
+    """
+    return COMPONENT_CACHE.get((kind, _outline_backend.name) + inputs, lambda kind, backend, *args: make(*args))
+
+
+class TextMetrics(namedtuple('TextMetrics', ('extents', 'current_point'))):
+    """ размеры текста без кривых, те же get_* что у TextPath
+
+    """
+
+    __slots__ = ()
+
+    def get_path_extents(self):
+        return self.extents
+
+    def get_current_point(self):
+        return self.current_point
+
+
+@timed('measure')
+def measure_text(text: str, font: Font) -> TextMetrics:
+    """ ink extents и advance строки из метрик шрифта, для решений о раскладке
+
+    :param text:
+    :param font: layout.Font
+    :return:
+    """
+    x1 = y1 = float('inf')
+    x2 = y2 = float('-inf')
+    x, y = 0.0, 0.0
+    face, size = font.face, font.size
+    for char in text or '':
+        metrics = get_glyph_metrics(face, size, char)
+        if metrics.extents:
+            gx1, gy1, gx2, gy2 = metrics.extents
+            x1, y1 = min(x1, gx1 + x), min(y1, gy1 + y)
+            x2, y2 = max(x2, gx2 + x), max(y2, gy2 + y)
+        x += metrics.advance[0]
+        y += metrics.advance[1]
+    return TextMetrics((x1, y1, x2, y2) if x1 <= x2 else (0.0, 0.0, 0.0, 0.0), (x, y))
+
+
+def add_path(canvas_path, path, digits: int = None):
+    """ cairo-style (type_op, points) -> reportlab PDFPathObject
+
+    :param canvas_path: work_canvas.beginPath()
+    :param path: iterable of (type_op, points)
+    :param digits: round coordinates, see OutputProfile.digits
+    """
+    if digits is not None:
+        path = ((type_op, tuple(round(p, digits) for p in points)) for type_op, points in path)
+    for type_op, points in path:
+        if type_op == PATH_MOVE_TO:
+            x, y = points
+            canvas_path.moveTo(x, y)
+
+        elif type_op == PATH_LINE_TO:
+            x, y = points
+            canvas_path.lineTo(x, y)
+
+        elif type_op == PATH_CURVE_TO:
+            x1, y1, x2, y2, x3, y3 = points
+            canvas_path.curveTo(x1, y1, x2, y2, x3, y3)
+
+        elif type_op == PATH_CLOSE_PATH:
+            canvas_path.close()
+
+
+def path_object(code: str) -> PDFPathObject:
+    """ готовые операторы path_code -> PDFPathObject для drawPath, с 'n' в начале, как у beginPath()
+
+    """
+    return PDFPathObject(['n', code] if code else [])
+
+
+def glyph_form(work_canvas: canvas.Canvas, face: str, size: float, char: str, glyph: Glyph) -> str:
+    """ имя form XObject глифа, форма создается при первом использовании в документе
+
+    цвет в форме не задается, берется из графического состояния в месте doForm
+
+    :param work_canvas:
+    :param face:
+    :param size:
+    :param char:
+    :param glyph: get_glyph(face, size, char)
+    :return: name for work_canvas.doForm
+    """
+    name = f'glyph_{_outline_backend.name}_{face}_{float(size)!r}_{ord(char):x}'
+    if not work_canvas.hasForm(name):
+        x1, y1, x2, y2 = glyph.extents
+        work_canvas.beginForm(name, x1 - 1, y1 - 1, x2 + 1, y2 + 1)
+        if not work_canvas.bottomup:
+            # reportlab пишет в форму преамбулу страницы с переворотом y, отменяем его
+            work_canvas.transform(1, 0, 0, -1, 0, work_canvas._pagesize[1])
+        code = path_code(((get_glyph_code(face, size, char), 0.0, 0.0),), canvas_profile(work_canvas).digits)
+        work_canvas.drawPath(path_object(code), fill=1, stroke=0)
+        work_canvas.endForm()
+    return name
+
+
 class TextPath:
 
-    width = SIZES_PT['abstract_width']
-    height = SIZES_PT['abstract_height']
+    width, height = ABSTRACT_SIZE
 
-    def __init__(self, text: str, font: dict):
+    def __init__(self, text: str, font: Font):
         """текст в кривых начало в (0, 0)
 
         :param text:
-        :param font:
+        :param font: layout.Font, {'face': ..., 'size': ...} тоже принимается
         """
+        if isinstance(font, dict):
+            font = Font(font['face'], font['size'], font.get('leading'))
         self.text, self.font = text, font
-        self._init_path()
+        self.path_extents, self.current_point = measure_text(text, font)
+        self._path = None
+        self._pieces = None
+        self._codes = {}
+
+    @property
+    def path(self) -> Outline:
+        """ контур всей строки одним Outline, строится только по запросу: draw берет pieces
+
+        """
+        if self._path is None:
+            self._init_path()
+        return self._path
 
+    @timed('outline')
     def _init_path(self):
-        mem = io.BytesIO()
-        surface = cairo.PDFSurface(mem, self.width, self.height)
-        ctx = cairo.Context(surface)
-        ctx.set_font_face(FONT_FACE[self.font['face']])
-        ctx.set_font_size(self.font['size'])
-        ctx.move_to(0, 0)
-        ctx.text_path(self.text)
-        self.path = ctx.copy_path()
-        self.path_extents = ctx.path_extents()
-        self.current_point = ctx.get_current_point()
+        """ склеиваем закешированные глифы, без cairo поверхности на каждую строку
 
+        """
+        pieces = []
+        x, y = 0.0, 0.0
+        face, size = self.font.face, self.font.size
+        for char in self.text or '':
+            glyph = get_glyph(face, size, char)
+            pieces.append((glyph.path, x, y))
+            x += glyph.advance[0]
+            y += glyph.advance[1]
+        self._path = concatenate(pieces, self.path_extents, self.current_point)
+
+    @property
+    def pieces(self):
+        """ [(GlyphCode, x, y), ...] - глифы строки на своих местах, для path_code
+
+        """
+        if self._pieces is None:
+            self._init_pieces()
+        return self._pieces
+
+    @timed('outline')
+    def _init_pieces(self):
+        pieces = []
+        x, y = 0.0, 0.0
+        face, size = self.font.face, self.font.size
+        for char in self.text or '':
+            glyph = get_glyph(face, size, char)
+            pieces.append((get_glyph_code(face, size, char), x, y))
+            x += glyph.advance[0]
+            y += glyph.advance[1]
+        self._pieces = pieces
+
+    def code(self, digits: int = None) -> str:
+        """ операторы строки (path_code), одна строка на округление: TextPath из COMPONENT_CACHE
+        на следующих табличках только дописывает ее в страницу
+
+        """
+        code = self._codes.get(digits)
+        if code is None:
+            code = self._codes[digits] = path_code(self.pieces, digits)
+        return code
+
+    @timed('draw')
     def draw(self, work_canvas: canvas.Canvas):
         if self.text and self.font:
+            if getattr(work_canvas, 'glyph_forms', False):
+                self._draw_glyph_forms(work_canvas)
+                return
             work_canvas.saveState()
             work_canvas.setFillColor(COLOR_WHITE)
             work_canvas.setStrokeColor(COLOR_WHITE)
-            canvas_path = work_canvas.beginPath()
-            for type_op, points in self.path:
-                if type_op == cairo.PATH_MOVE_TO:
-                    x, y = points
-                    canvas_path.moveTo(x, y)
-
-                elif type_op == cairo.PATH_LINE_TO:
-                    x, y = points
-                    canvas_path.lineTo(x, y)
-
-                elif type_op == cairo.PATH_CURVE_TO:
-                    x1, y1, x2, y2, x3, y3 = points
-                    canvas_path.curveTo(x1, y1, x2, y2, x3, y3)
+            draw_glyphs = getattr(work_canvas, 'draw_glyphs', None)
+            if draw_glyphs is not None:
+                # raster.RasterCanvas: свои закешированные пути глифов, заливка - цвет выше
+                draw_glyphs(self.text, self.font)
+            else:
+                # вся строка одним куском операторов, как add_path(self.path), но без вызова на сегмент
+                work_canvas.drawPath(path_object(self.code(canvas_profile(work_canvas).digits)), fill=1, stroke=0)
+            work_canvas.restoreState()
 
-                elif type_op == cairo.PATH_CLOSE_PATH:
-                    canvas_path.close()
+    def _draw_glyph_forms(self, work_canvas: canvas.Canvas):
+        """ каждый глиф - form XObject, один раз на документ, дальше только сдвиг и Do
 
-            work_canvas.drawPath(canvas_path, fill=1, stroke=0)
-            work_canvas.restoreState()
+        """
+        work_canvas.saveState()
+        work_canvas.setFillColor(COLOR_WHITE)
+        work_canvas.setStrokeColor(COLOR_WHITE)
+        x, placed_x = 0.0, 0.0
+        face, size = self.font.face, self.font.size
+        for char in self.text:
+            glyph = get_glyph(face, size, char)
+            if glyph.extents:
+                name = glyph_form(work_canvas, face, size, char, glyph)
+                if x != placed_x:
+                    work_canvas.translate(x - placed_x, 0)
+                    placed_x = x
+                work_canvas.doForm(name)
+            x += glyph.advance[0]
+        work_canvas.restoreState()
 
     def get_path_extents(self):
         """
@@ -295,18 +486,22 @@ class Slash:
 
     def __init__(self, size):
         self.margin, self.angle, self.length, self.line_width = size
-        self.line = (
-            self.margin,
-            0,
-            self.margin + self.length*cos(radians(self.angle)),
-            - self.length * sin(radians(self.angle))
-        )
+        x2, y2 = self.margin + self.length*cos(radians(self.angle)), - self.length * sin(radians(self.angle))
+        self.outline = Outline(array('B', (PATH_MOVE_TO, PATH_LINE_TO)), array('d', (self.margin, 0, x2, y2)),
+                               (self.margin, y2, x2, 0), (x2 + self.margin, 0))
+
+    @property
+    def line(self):
+        """ (x1, y1, x2, y2) для canvas.line
+
+        """
+        return tuple(self.outline.coords)
 
     def get_path_extents(self):
-        return 0, 0, self.line[2] + self.margin, self.line[3]
+        return 0, 0, self.outline.advance[0], self.outline.extents[1]
 
     def get_current_point(self):
-        return self.line[2] + self.margin, 0
+        return self.outline.advance
 
     def draw(self, work_canvas):
         work_canvas.saveState()
@@ -317,111 +512,352 @@ class Slash:
         work_canvas.restoreState()
 
 
-def parse_house_number(house_num_str, regex_tuple):
+OutputProfile = namedtuple('OutputProfile', ('compression', 'ascii85', 'digits', 'invariant'))
+"""how the pdf bytes are written, None - reportlab default (rl_config)
 
-    for r in regex_tuple:
-        match_res = r.match(house_num_str)
-        if match_res:
-            return match_res.groupdict()
-    return None
+на 200 разных табличках (reportlab 5, мс на табличку, байт на pdf):
+compression: zlib content streams, 13.1 KB -> 5.5 KB, by itself free (less bytes to write)
+ascii85: ASCII85 over zlib, reportlab default, 7-bit clean but +20% size and +1.5 ms (~40% of render time)
+digits: round path coordinates to 10**-digits pt, 2 = 0.01 pt is invisible on a plate.
+    -20% size both compressed and not, +0.7 ms for round() per coordinate
+invariant: fixed dates and document id, the same input gives byte identical pdf (caches, diffs, checksums), free
 
+default 6.6 KB 4.8 ms, compact/archive 4.5 KB 4.3 ms, plain 13.1 KB 3.5 ms
+"""
 
-def house_number_pdf(house_num: str = None, left_num: str = None, right_num: str = None, wide: str = THIN):
+OUTPUT_PROFILES = {
+    'default': OutputProfile(None, None, None, None),
+    # smallest files
+    'compact': OutputProfile(compression=True, ascii85=False, digits=2, invariant=False),
+    # compact and reproducible
+    'archive': OutputProfile(compression=True, ascii85=False, digits=2, invariant=True),
+    # readable content streams for debugging and text diffs, 2x bigger than default
+    'plain': OutputProfile(compression=False, ascii85=False, digits=None, invariant=True),
+}
 
-    arrows = (ARROW_LEFT if left_num else ARROW_NO) | (ARROW_RIGHT if right_num else ARROW_NO)
-    arrow = '_arrow' if arrows else ''
+_ascii85_lock = threading.Lock()
 
-    width = SIZES_PT[f'{wide}_house_number{arrow}_width'][min(len(house_num)-1, 4)]
-    height = SIZES_PT[f'{wide}_height']
-    margin = SIZES_PT[f'{wide}_margin']
 
-    pdf = io.BytesIO()
-    work_canvas = canvas.Canvas(pdf, (width, height), bottomup=0)
+def output_profile(profile=None) -> OutputProfile:
+    """
 
-    draw_background(work_canvas, width, height, SIZES_PT[f'{wide}_round_radius'])
+    :param profile: OutputProfile, name in OUTPUT_PROFILES or None for 'default'
+    :return:
+    """
+    if profile is None:
+        return OUTPUT_PROFILES['default']
+    if isinstance(profile, str):
+        return OUTPUT_PROFILES[profile]
+    return profile
 
-    house_number_dict = parse_house_number(house_num, house_number_re_tuple)
 
+def canvas_profile(work_canvas: canvas.Canvas) -> OutputProfile:
+    return getattr(work_canvas, 'output_profile', OUTPUT_PROFILES['default'])
+
+
+def new_canvas(pdf, pagesize=None, glyph_forms: bool = False, profile=None) -> canvas.Canvas:
+    """ canvas.Canvas с bottomup=0 и настройками профиля
+
+    :param pdf: file name or binary file
+    :param pagesize:
+    :param glyph_forms: see TextPath.draw
+    :param profile: see output_profile
+    :return:
+    """
+    profile = output_profile(profile)
+    kwargs = {}
+    if pagesize is not None:
+        kwargs['pagesize'] = pagesize
+    if profile.compression is not None:
+        kwargs['pageCompression'] = int(profile.compression)
+    if profile.invariant is not None:
+        kwargs['invariant'] = int(profile.invariant)
+    work_canvas = canvas.Canvas(pdf, bottomup=0, **kwargs)
+    work_canvas.glyph_forms = glyph_forms
+    work_canvas.output_profile = profile
+    return work_canvas
+
+
+@timed('save')
+def save_canvas(work_canvas: canvas.Canvas):
+    """ work_canvas.save(), ascii85 профиля
+
+    фильтры потоков reportlab берет из глобального rl_config.useA85 в момент save,
+    поэтому профили с ascii85 != rl_config.useA85 сохраняются по одному
+    """
+    ascii85 = canvas_profile(work_canvas).ascii85
+    if ascii85 is None or bool(ascii85) == bool(rl_config.useA85):
+        work_canvas.save()
+        return
+    with _ascii85_lock:
+        use_a85 = rl_config.useA85
+        rl_config.useA85 = int(ascii85)
+        try:
+            work_canvas.save()
+        finally:
+            rl_config.useA85 = use_a85
+
+
+@contextmanager
+def pdf_sink(output=None):
+    """ куда canvas.Canvas пишет pdf при save
+
+    reportlab собирает документ одним bytes и пишет его в файл одним write,
+    без промежуточного io.BytesIO и его копии pdf.read() у вызывающего
+
+    :param output: None - new io.BytesIO; path; binary file with write (sys.stdout.buffer); socket
+    :return: context manager -> target for canvas.Canvas
+    """
+    if output is None:
+        yield io.BytesIO()
+    elif isinstance(output, (str, os.PathLike)):
+        yield os.fspath(output)
+    elif callable(getattr(output, 'write', None)):
+        yield output
+        flush = getattr(output, 'flush', None)
+        if flush is not None:
+            flush()
+    elif callable(getattr(output, 'makefile', None)):
+        # сокет: свой буферизованный файл, закрытие файла сокет не закрывает
+        with output.makefile('wb') as f:
+            yield f
+    else:
+        raise TypeError(f'cannot write pdf to {output!r}')
+
+
+def write_pdf(output, data):
+    """ готовые байты (например из plate_cache) в тот же output, что принимает pdf_sink
+
+    :param output: path, binary file or socket
+    :param data: bytes-like
+    """
+    with pdf_sink(output) as target:
+        if isinstance(target, str):
+            with open(target, 'wb') as f:
+                f.write(data)
+        else:
+            target.write(data)
+
+
+def plate_pdf(plate, glyph_forms: bool = False, profile=None, output=None):
+    """ одна табличка -> одностраничный pdf
+
+    :param plate: HouseNumberPlate, StreetNamePlate or VerticalPlate
+    :param glyph_forms: glyphs as form XObjects, see TextPath.draw
+    :param profile: OutputProfile or name in OUTPUT_PROFILES
+    :param output: see pdf_sink, default io.BytesIO
+    :return: (pdf, file_name), pdf - io.BytesIO at 0 or output
+    """
+    with pdf_sink(output) as pdf:
+        work_canvas = new_canvas(pdf, (plate.width, plate.height), glyph_forms, profile)
+        plate.draw(work_canvas)
+        work_canvas.showPage()
+        save_canvas(work_canvas)
+    instrument.plate_done(plate.file_name)
+    if output is not None:
+        return output, plate.file_name
+    pdf.seek(0)
+    return pdf, plate.file_name
+
+
+def plates_pdf(plates, glyph_forms: bool = False, profile=None, output=None):
+    """ много табличек -> один pdf, страница на табличку со своим размером
+
+    :param plates: iterable of HouseNumberPlate, StreetNamePlate or VerticalPlate
+    :param glyph_forms: glyphs as form XObjects shared by all pages, see TextPath.draw
+    :param profile: OutputProfile or name in OUTPUT_PROFILES
+    :param output: see pdf_sink, default io.BytesIO
+    :return: pdf - io.BytesIO at 0 or output
+    """
+    with pdf_sink(output) as pdf:
+        work_canvas = new_canvas(pdf, glyph_forms=glyph_forms, profile=profile)
+        for plate in plates:
+            work_canvas.setPageSize((plate.width, plate.height))
+            plate.draw(work_canvas)
+            work_canvas.showPage()
+            instrument.plate_done(plate.file_name)
+        save_canvas(work_canvas)
+    if output is not None:
+        return output
+    pdf.seek(0)
+    return pdf
+
+
+def cached_plate_pdf(spec: PlateSpec, make_plate, glyph_forms: bool = False, profile=None, cache=None,
+                     output=None):
+    """ plate_pdf через дисковый кеш готовых табличек, см. plate_cache
+
+    :param spec: cache key
+    :param make_plate: () -> plate, called on a cache miss only
+    :param glyph_forms:
+    :param profile:
+    :param cache: None - ADDRESS_PLATE_CACHE_DIR if set, False - no cache, PlateCache or directory
+    :param output: see pdf_sink, default io.BytesIO
+    :return: (pdf, file_name)
+    """
+    plate_cache = get_cache(cache)
+    if plate_cache is None:
+        return plate_pdf(make_plate(), glyph_forms, profile, output)
+    rendered = []
+
+    def render():
+        rendered.append(True)
+        return plate_pdf(make_plate(), glyph_forms, profile)
+
+    pdf, file_name = plate_cache.render(spec, render, profile, glyph_forms)
+    if not rendered:
+        instrument.plate_done(file_name)
+    if output is None:
+        return pdf, file_name
+    write_pdf(output, pdf.getbuffer())
+    return output, file_name
+
+
+def house_number_paths(house_number: HouseNumber, number: NumberLayout):
+    """ части номера дома по именам групп: TextPath шрифтами number.fonts и Slash, и их общая ширина
+
+    :param house_number: house_number.parse_house_number result
+    :param number: layout.NumberLayout
+    :return: (paths, width), paths in drawing order
+    """
     paths = {}
     after_slash = False
     house_number_width = 0
-    for key in sorted(house_number_dict.keys()):
-        if key != SLASH:
-            if house_number_dict[key]:
-                temp_text_path = TextPath(house_number_dict[key], SIZES_PT[f'{wide}_house_number{arrow}_font_{key}'])
-                paths.update({key: temp_text_path})
-                if after_slash:
-                    house_number_width += temp_text_path.get_current_point()[0] - temp_text_path.get_path_extents()[0]
-                    after_slash = False
-                else:
-                    house_number_width += temp_text_path.get_current_point()[0]
+    for (key, font), part in zip(number.levels, house_number):
+        if not part:
+            continue
+        if font is not None:
+            temp_text_path = TextPath(part, font)
+            paths[key] = temp_text_path
+            if after_slash:
+                house_number_width += (temp_text_path.get_current_point()[0]
+                                       - temp_text_path.get_path_extents()[0])
+                after_slash = False
+            else:
+                house_number_width += temp_text_path.get_current_point()[0]
         else:
-            temp_slash = Slash(SIZES_PT[f'{wide}_house_number{arrow}_slash_size'])
-            paths.update({key: temp_slash})
+            temp_slash = Slash(number.slash)
+            paths[key] = temp_slash
             after_slash = True
             house_number_width += temp_slash.get_current_point()[0]
+    return paths, house_number_width
 
-    work_canvas.saveState()
-    work_canvas.translate(SIZES_PT[f'{wide}_margin'], SIZES_PT[f'{wide}_house_number{arrow}_bl'])
-    translate_x = (width - house_number_width - SIZES_PT[f'{wide}_margin']*2)/2
-    if translate_x >= 0:
-        work_canvas.translate(translate_x, 0)
-    else:
-        scale = (width - SIZES_PT[f'{wide}_margin']*2)/house_number_width
-        work_canvas.translate(SIZES_PT[f'{wide}_margin']*(1-scale), 0)
-        work_canvas.scale(scale, scale)
 
-    after_slash = False
-    for key in sorted(paths):
-        if after_slash:
-            work_canvas.translate(-paths[key].get_path_extents()[0], 0)
-            after_slash = False
-        paths[key].draw(work_canvas)
-        work_canvas.translate(paths[key].get_current_point()[0], 0)
-        if key == SLASH:
-            after_slash = True
+class ArrowRow:
+    """ стрелки и номера соседних домов, одни на все таблички с теми же соседями и шириной
 
-    work_canvas.restoreState()
+    """
+
+    def __init__(self, left_parts, right_parts, arrow: ArrowLayout, width: float, margin: float):
+        """
+
+        :param left_parts: house_number.ArrowNumber or None
+        :param right_parts: house_number.ArrowNumber or None
+        :param arrow: layout.ArrowLayout
+        :param width: plate width
+        :param margin:
+        """
+        self.arrow, self.width, self.margin = arrow, width, margin
+        self.arrows = (ARROW_LEFT if left_parts else ARROW_NO) | (ARROW_RIGHT if right_parts else ARROW_NO)
+        self.left = self._paths(left_parts)
+        self.right = self._paths(right_parts)
 
-    if arrows:
-        draw_house_number_arrows(work_canvas, width, margin, SIZES_PT[f'{wide}_house_number{arrow}_arrow_bl'],
-                                 SIZES_PT[f'{wide}_house_number{arrow}_arrow_size'], arrows)
+    def _paths(self, parts):
+        """ (lvl_a1 TextPath, lvl_a2c TextPath or None) or None
 
-        if left_num:
+        """
+        if not parts:
+            return None
+        return (TextPath(parts.lvl_a1, self.arrow.lvl_a1),
+                TextPath(parts.lvl_a2c, self.arrow.lvl_a2c) if parts.lvl_a2c else None)
+
+    def draw(self, work_canvas: canvas.Canvas):
+        arrow, width, margin = self.arrow, self.width, self.margin
+        draw_house_number_arrows(work_canvas, width, margin, arrow.baseline, arrow.size, self.arrows)
+
+        if self.left:
+            lvl_a1_path, lvl_a2c_path = self.left
             work_canvas.saveState()
-            left_num_dict = parse_house_number(left_num, house_number_arrow_re_tuple)
-            lvl_a1_path = TextPath(left_num_dict[LVL_A1], SIZES_PT[f'{wide}_house_number_arrow_number_font_{LVL_A1}'])
-            work_canvas.translate(margin, SIZES_PT[f'{wide}_house_number_arrow_number_bl'])
+            work_canvas.translate(margin, arrow.number_baseline)
             lvl_a1_path.draw(work_canvas)
-            if left_num_dict[LVL_A2C]:
-                lvl_a2c_path = TextPath(left_num_dict[LVL_A2C],
-                                        SIZES_PT[f'{wide}_house_number_arrow_number_font_{LVL_A2C}'])
+            if lvl_a2c_path:
                 work_canvas.translate(lvl_a1_path.get_current_point()[0], 0)
                 lvl_a2c_path.draw(work_canvas)
             work_canvas.restoreState()
 
-        if right_num:
-            right_num_dict = parse_house_number(right_num, house_number_arrow_re_tuple)
+        if self.right:
+            lvl_a1_path, lvl_a2c_path = self.right
             work_canvas.saveState()
-            work_canvas.translate(width - margin, SIZES_PT[f'{wide}_house_number_arrow_number_bl'])
-            if right_num_dict[LVL_A2C]:
-                lvl_a2c_path = TextPath(right_num_dict[LVL_A2C],
-                                        SIZES_PT[f'{wide}_house_number_arrow_number_font_{LVL_A2C}'])
+            work_canvas.translate(width - margin, arrow.number_baseline)
+            if lvl_a2c_path:
                 work_canvas.translate(-lvl_a2c_path.get_current_point()[0], 0)
                 lvl_a2c_path.draw(work_canvas)
-            lvl_a1_path = TextPath(right_num_dict[LVL_A1],
-                                   SIZES_PT[f'{wide}_house_number_arrow_number_font_{LVL_A1}'])
             work_canvas.translate(-lvl_a1_path.get_current_point()[0], 0)
             lvl_a1_path.draw(work_canvas)
             work_canvas.restoreState()
 
-    work_canvas.showPage()
-    work_canvas.save()
-    pdf.seek(0)
 
-    file_name = f"{house_num.replace('/', '_')}.pdf"
+class HouseNumberPlate:
+
+    def __init__(self, house_num: str = None, left_num: str = None, right_num: str = None, wide: str = THIN):
+        self.house_num, self.left_num, self.right_num, self.wide = house_num, left_num, right_num, wide
+
+        # все номера разбираются до рисования, неверный -> HouseNumberError здесь
+        house_number = parse_house_number(house_num)
+        self.left_parts = parse_arrow_number(left_num) if left_num else None
+        self.right_parts = parse_arrow_number(right_num) if right_num else None
+        self.arrows = (ARROW_LEFT if left_num else ARROW_NO) | (ARROW_RIGHT if right_num else ARROW_NO)
+
+        self.layout = variant = _layout.variant(wide)
+        self.number_layout = number = variant.number_arrow if self.arrows else variant.number
+
+        self.width = number.width(len(house_num))
+        self.height = variant.height
+        self.margin = variant.margin
+
+        self.paths, self.house_number_width = get_component('number', house_number_paths, house_number, number)
+        self.arrow_row = get_component('arrows', ArrowRow, self.left_parts, self.right_parts, variant.arrow,
+                                       self.width, self.margin) if self.arrows else None
+
+        self.file_name = number_file_name(house_num)
+
+    def draw(self, work_canvas: canvas.Canvas):
+        variant, number, width, height, margin = self.layout, self.number_layout, self.width, self.height, self.margin
+        paths = self.paths
+
+        draw_background(work_canvas, width, height, variant.radius)
+
+        work_canvas.saveState()
+        work_canvas.translate(margin, number.baseline)
+        translate_x = (width - self.house_number_width - margin*2)/2
+        if translate_x >= 0:
+            work_canvas.translate(translate_x, 0)
+        else:
+            scale = (width - margin*2)/self.house_number_width
+            work_canvas.translate(margin*(1-scale), 0)
+            work_canvas.scale(scale, scale)
+
+        after_slash = False
+        for key in sorted(paths):
+            if after_slash:
+                work_canvas.translate(-paths[key].get_path_extents()[0], 0)
+                after_slash = False
+            paths[key].draw(work_canvas)
+            work_canvas.translate(paths[key].get_current_point()[0], 0)
+            if key == SLASH:
+                after_slash = True
+
+        work_canvas.restoreState()
 
-    return pdf, file_name
+        if self.arrow_row is not None:
+            self.arrow_row.draw(work_canvas)
+
+
+def house_number_pdf(house_num: str = None, left_num: str = None, right_num: str = None, wide: str = THIN,
+                     glyph_forms: bool = False, profile=None, cache=None, output=None):
+    spec = PlateSpec(NUMBER, wide, number=house_num, left=left_num, right=right_num)
+    return cached_plate_pdf(spec, lambda: HouseNumberPlate(house_num, left_num, right_num, wide),
+                            glyph_forms, profile, cache, output)
 
 
 def thin_house_number_pdf(house_num: str = None, left_num: str = None, right_num: str = None):
@@ -432,7 +868,7 @@ def wide_house_number_pdf(house_num: str = None, left_num: str = None, right_num
     return house_number_pdf(house_num, left_num, right_num, WIDE)
 
 
-def max_width_plus(text_path_list: list = None, margin: float = SIZES_PT[f'thin_margin']):
+def max_width_plus(text_path_list: list = None, margin: float = pt(40)):
     """ берем максимальное значение, немного увеличиваем, делаем кратной margin и добавляем 2 margin
 
     """
@@ -443,53 +879,70 @@ def max_width_plus(text_path_list: list = None, margin: float = SIZES_PT[f'thin_
     return None
 
 
-def street_name_pdf(street_type: str = None, street_name: str = None, street_translit: str = None, wide: str = THIN):
+def street_name_paths(street_type: str, street_name: str, street_translit: str, street: NameLayout) -> tuple:
+    """ (type, name, translit) TextPath таблички названия улицы
 
-    street_type_text_path = TextPath(text=street_type, font=SIZES_PT[f'{wide}_street_type_font'])
-    street_name_text_path = TextPath(text=street_name, font=SIZES_PT[f'{wide}_street_name_font'])
-    street_translit_text_path = TextPath(text=street_translit, font=SIZES_PT[f'{wide}_street_translit_font'])
+    """
+    return (TextPath(text=street_type, font=street.type.font), TextPath(text=street_name, font=street.name.font),
+            TextPath(text=street_translit, font=street.translit.font))
 
-    width = max_width_plus([street_name_text_path, street_type_text_path, street_translit_text_path],
-                           SIZES_PT[f'{wide}_margin'])
-    height = SIZES_PT[f'{wide}_height']
-    margin = SIZES_PT[f'{wide}_margin']
 
-    pdf = io.BytesIO()
-    work_canvas = canvas.Canvas(pdf, (width, height), bottomup=0)
+class StreetNamePlate:
 
-    draw_background(work_canvas, width, height, SIZES_PT[f'{wide}_round_radius'])
+    def __init__(self, street_type: str = None, street_name: str = None, street_translit: str = None,
+                 wide: str = THIN):
+        self.street_type, self.street_name, self.street_translit, self.wide = \
+            street_type, street_name, street_translit, wide
 
-    work_canvas.saveState()
-    work_canvas.setStrokeColor(COLOR_WHITE)
-    work_canvas.setLineWidth(SIZES_PT[f'{wide}_street_line_width'])
-    work_canvas.line(SIZES_PT[f'{wide}_margin'], SIZES_PT[f'{wide}_street_line_bl'],
-                     width - SIZES_PT[f'{wide}_margin'], SIZES_PT[f'{wide}_street_line_bl'])
-    work_canvas.restoreState()
+        self.layout = variant = _layout.variant(wide)
+        self.street_type_text_path, self.street_name_text_path, self.street_translit_text_path = \
+            get_component('street-name', street_name_paths, street_type, street_name, street_translit, variant.street)
 
-    work_canvas.translate(margin, 0)
+        self.width = max_width_plus([self.street_name_text_path, self.street_type_text_path,
+                                     self.street_translit_text_path], variant.margin)
+        self.height = variant.height
+        self.margin = variant.margin
 
-    work_canvas.saveState()
-    work_canvas.translate(0, SIZES_PT[f'{wide}_street_type_bl'])
-    street_type_text_path.draw(work_canvas)
-    work_canvas.restoreState()
+        self.file_name = street_file_name(street_type, street_name)
 
-    work_canvas.saveState()
-    work_canvas.translate(0, SIZES_PT[f'{wide}_street_name_bl'])
-    street_name_text_path.draw(work_canvas)
-    work_canvas.restoreState()
+    def draw(self, work_canvas: canvas.Canvas):
+        variant, width, height, margin = self.layout, self.width, self.height, self.margin
+        street = variant.street
 
-    work_canvas.saveState()
-    work_canvas.translate(0, SIZES_PT[f'{wide}_street_translit_bl'])
-    street_translit_text_path.draw(work_canvas)
-    work_canvas.restoreState()
+        draw_background(work_canvas, width, height, variant.radius)
 
-    work_canvas.showPage()
-    work_canvas.save()
-    pdf.seek(0)
+        work_canvas.saveState()
+        work_canvas.setStrokeColor(COLOR_WHITE)
+        work_canvas.setLineWidth(street.line.width)
+        work_canvas.line(margin, street.line.baseline, width - margin, street.line.baseline)
+        work_canvas.restoreState()
+
+        work_canvas.saveState()
+        work_canvas.translate(margin, 0)
 
-    file_name = f"{street_type}_{street_name}.pdf"
+        work_canvas.saveState()
+        work_canvas.translate(0, street.type.baseline)
+        self.street_type_text_path.draw(work_canvas)
+        work_canvas.restoreState()
+
+        work_canvas.saveState()
+        work_canvas.translate(0, street.name.baseline)
+        self.street_name_text_path.draw(work_canvas)
+        work_canvas.restoreState()
 
-    return pdf, file_name
+        work_canvas.saveState()
+        work_canvas.translate(0, street.translit.baseline)
+        self.street_translit_text_path.draw(work_canvas)
+        work_canvas.restoreState()
+
+        work_canvas.restoreState()
+
+
+def street_name_pdf(street_type: str = None, street_name: str = None, street_translit: str = None, wide: str = THIN,
+                    glyph_forms: bool = False, profile=None, cache=None, output=None):
+    spec = PlateSpec(NAME, wide, street_type, street_name, street_translit)
+    return cached_plate_pdf(spec, lambda: StreetNamePlate(street_type, street_name, street_translit, wide),
+                            glyph_forms, profile, cache, output)
 
 
 def thin_street_name_pdf(street_type: str = None, street_name: str = None, street_translit: str = None):
@@ -500,117 +953,134 @@ def wide_street_name_pdf(street_type: str = None, street_name: str = None, stree
     return street_name_pdf(street_type, street_name, street_translit, WIDE)
 
 
+def fit_lines(text: str, block: VerticalText, width: float) -> tuple:
+    """ текст вертикальной таблички в ширину: одной строкой или переносом по словам и уменьшением
 
+    переносы выбираются по метрикам (line_breaking.break_lines), кривые строятся только для итоговых строк
 
-def vertical_pdf(street_type: str = None, street_name: str = None, street_translit: str = None,
-                 house_num: str = None, wide: str = THIN):
+    :param text:
+    :param block: layout.VerticalText
+    :param width: space for the text
+    :return: ([TextPath, ...], scale), scale None - one line as is
+    """
+    font = block.font
+    if not text or measure_text(text, font).extents[2] < width:
+        return [TextPath(text=text, font=font)], None
+    metrics = {char: get_glyph_metrics(font.face, font.size, char) for char in set(text)}
+    lines, widest = break_lines(text, metrics.__getitem__, width, block.max_lines)
+    return [TextPath(text=line, font=font) for line in lines], min(1, width / widest)
 
-    width = SIZES_PT[f'{wide}_vertical_width']
-    height = SIZES_PT[f'{wide}_vertical_height']
-    margin = SIZES_PT[f'{wide}_vertical_margin']
 
-    pdf = io.BytesIO()
-    work_canvas = canvas.Canvas(pdf, (width, height), bottomup=0)
+def draw_lines(work_canvas: canvas.Canvas, paths: list, scale, leading: float):
+    """ строки fit_lines одна под другой, текущая точка остается на последней
 
-    draw_background(work_canvas, width, height, SIZES_PT[f'{wide}_round_radius'])
+    """
+    if scale is None:
+        paths[0].draw(work_canvas)
+        return
+    work_canvas.scale(scale, scale)
+    for i, path in enumerate(paths, 1):
+        path.draw(work_canvas)
+        if i < len(paths):
+            work_canvas.translate(0, leading)
+    work_canvas.scale(1, 1)
 
-    work_canvas.saveState()
-    work_canvas.translate(margin, 0)
 
-    street_type_text_path = TextPath(text=street_type, font=SIZES_PT[f'{wide}_vertical_street_type_font'])
-    work_canvas.translate(0, SIZES_PT[f'{wide}_vertical_street_type_bl'])
-    street_type_text_path.draw(work_canvas)
+class VerticalHeader:
+    """ тип, название, линия и транслит вертикальной таблички: переносы, масштаб и кривые один раз на улицу,
+    у табличек улицы меняется только номер
 
-    street_name_text_path = TextPath(text=street_name, font=SIZES_PT[f'{wide}_vertical_street_name_font'])
-    work_canvas.translate(0, SIZES_PT[f'{wide}_vertical_street_name_translate'])
-    if street_name_text_path.get_path_extents()[2] < width - 2 * margin:
-        street_name_text_path.draw(work_canvas)
-    else:
-        str_list = textwrap.wrap(street_name, width=SIZES_PT[f'{wide}_vertical_street_name_max_char'],
-                                 break_long_words=False)
-
-        str_path_list = [TextPath(text=s, font=SIZES_PT[f'{wide}_vertical_street_name_font']) for s in str_list]
-        scale = min(1, (width - margin * 2) / max([path.get_path_extents()[2] for path in str_path_list]))
-        work_canvas.scale(scale, scale)
-        for path in str_path_list:
-            path.draw(work_canvas)
-            if path != str_path_list[-1]:
-                work_canvas.translate(0, SIZES_PT[f'{wide}_vertical_street_name_font']['leading'])
-        work_canvas.scale(1, 1)
-
-    work_canvas.translate(0, SIZES_PT[f'{wide}_vertical_street_line_translate'])
-    work_canvas.setLineWidth(SIZES_PT[f'{wide}_vertical_street_line_width'])
-    work_canvas.setStrokeColor(COLOR_WHITE)
-    work_canvas.line(0, 0, width - 2 * margin, 0)
+    """
 
-    street_translit_text_path = TextPath(text=street_translit, font=SIZES_PT[f'{wide}_vertical_street_translit_font'])
-    work_canvas.translate(0, SIZES_PT[f'{wide}_vertical_street_translit_translate'])
-    if street_translit_text_path.get_path_extents()[2] < width - 2 * margin:
-        street_translit_text_path.draw(work_canvas)
-    else:
-        str_list = textwrap.wrap(street_translit, width=SIZES_PT[f'{wide}_vertical_street_translit_max_char'],
-                                 break_long_words=False)
-
-        str_path_list = [TextPath(text=s, font=SIZES_PT[f'{wide}_vertical_street_translit_font']) for s in str_list]
-        scale = min(1, (width - margin * 2) / max([path.get_path_extents()[2] for path in str_path_list]))
-        work_canvas.scale(scale, scale)
-        for path in str_path_list:
-            path.draw(work_canvas)
-            if path != str_path_list[-1]:
-                work_canvas.translate(0, SIZES_PT[f'{wide}_vertical_street_translit_font']['leading'])
-        work_canvas.scale(1, 1)
+    def __init__(self, street_type: str, street_name: str, street_translit: str, vertical: VerticalLayout):
+        self.vertical = vertical
+        text_width = vertical.width - 2 * vertical.margin
+        self.type_path = TextPath(text=street_type, font=vertical.type.font)
+        self.name_paths, self.name_scale = fit_lines(street_name, vertical.name, text_width)
+        self.translit_paths, self.translit_scale = fit_lines(street_translit, vertical.translit, text_width)
 
-    work_canvas.restoreState()
+    def draw(self, work_canvas: canvas.Canvas):
+        vertical = self.vertical
+        margin = vertical.margin
 
-    # =========================================================================================
-    house_number_dict = parse_house_number(house_num, house_number_re_tuple)
+        work_canvas.saveState()
+        work_canvas.translate(margin, 0)
 
-    paths = {}
-    after_slash = False
-    house_number_width = 0
-    for key in sorted(house_number_dict.keys()):
-        if key != SLASH:
-            if house_number_dict[key]:
-                temp_text_path = TextPath(house_number_dict[key], SIZES_PT[f'{wide}_vertical_house_number_font_{key}'])
-                paths.update({key: temp_text_path})
-                if after_slash:
-                    house_number_width += temp_text_path.get_current_point()[0] - temp_text_path.get_path_extents()[0]
-                    after_slash = False
-                else:
-                    house_number_width += temp_text_path.get_current_point()[0]
-        else:
-            temp_slash = Slash(SIZES_PT[f'{wide}_vertical_house_number_slash_size'])
-            paths.update({key: temp_slash})
-            after_slash = True
-            house_number_width += temp_slash.get_current_point()[0]
+        work_canvas.translate(0, vertical.type.offset)
+        self.type_path.draw(work_canvas)
 
-    work_canvas.saveState()
-    work_canvas.translate(SIZES_PT[f'{wide}_margin'], SIZES_PT[f'{wide}_vertical_house_number_bl'])
-    if house_number_width > width - margin * 2:
-        scale = (width - margin * 2) / house_number_width
-        work_canvas.scale(scale, scale)
+        work_canvas.translate(0, vertical.name.offset)
+        draw_lines(work_canvas, self.name_paths, self.name_scale, vertical.name.font.leading)
 
-    after_slash = False
-    for key in sorted(paths):
-        if after_slash:
-            work_canvas.translate(-paths[key].get_path_extents()[0], 0)
-            after_slash = False
-        paths[key].draw(work_canvas)
-        work_canvas.translate(paths[key].get_current_point()[0], 0)
-        if key == SLASH:
-            after_slash = True
+        work_canvas.translate(0, vertical.line.offset)
+        work_canvas.setLineWidth(vertical.line.width)
+        work_canvas.setStrokeColor(COLOR_WHITE)
+        work_canvas.line(0, 0, vertical.width - 2 * margin, 0)
 
-    work_canvas.restoreState()
+        work_canvas.translate(0, vertical.translit.offset)
+        draw_lines(work_canvas, self.translit_paths, self.translit_scale, vertical.translit.font.leading)
 
-    # =========================================================================================
+        work_canvas.restoreState()
 
-    work_canvas.showPage()
-    work_canvas.save()
-    pdf.seek(0)
 
-    file_name = f"{street_type}_{street_name}.pdf"
+class VerticalPlate:
+
+    def __init__(self, street_type: str = None, street_name: str = None, street_translit: str = None,
+                 house_num: str = None, wide: str = THIN):
+        self.street_type, self.street_name, self.street_translit, self.house_num, self.wide = \
+            street_type, street_name, street_translit, house_num, wide
+
+        self.layout = variant = _layout.variant(wide)
+        vertical = variant.vertical
+        self.width = vertical.width
+        self.height = vertical.height
+        self.margin = vertical.margin
+
+        self.paths, self.house_number_width = get_component('number', house_number_paths,
+                                                            parse_house_number(house_num), vertical.number)
+        self.header = get_component('vertical-header', VerticalHeader, street_type, street_name, street_translit,
+                                    vertical)
+
+        self.file_name = street_file_name(street_type, street_name)
+
+    def draw(self, work_canvas: canvas.Canvas):
+        width, height, margin = self.width, self.height, self.margin
+        vertical = self.layout.vertical
+
+        draw_background(work_canvas, width, height, self.layout.radius)
+
+        self.header.draw(work_canvas)
+
+        # =========================================================================================
+        paths, house_number_width = self.paths, self.house_number_width
 
-    return pdf, file_name
+        work_canvas.saveState()
+        work_canvas.translate(vertical.number_margin, vertical.number.baseline)
+        if house_number_width > width - margin * 2:
+            scale = (width - margin * 2) / house_number_width
+            work_canvas.scale(scale, scale)
+
+        after_slash = False
+        for key in sorted(paths):
+            if after_slash:
+                work_canvas.translate(-paths[key].get_path_extents()[0], 0)
+                after_slash = False
+            paths[key].draw(work_canvas)
+            work_canvas.translate(paths[key].get_current_point()[0], 0)
+            if key == SLASH:
+                after_slash = True
+
+        work_canvas.restoreState()
+
+        # =========================================================================================
+
+
+def vertical_pdf(street_type: str = None, street_name: str = None, street_translit: str = None,
+                 house_num: str = None, wide: str = THIN, glyph_forms: bool = False, profile=None, cache=None,
+                 output=None):
+    spec = PlateSpec(VERTICAL, wide, street_type, street_name, street_translit, house_num)
+    return cached_plate_pdf(spec, lambda: VerticalPlate(street_type, street_name, street_translit, house_num, wide),
+                            glyph_forms, profile, cache, output)
 
 
 def thin_vertical_pdf(street_type: str = None, street_name: str = None, street_translit: str = None,
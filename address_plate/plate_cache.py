@@ -0,0 +1,280 @@
+""" готовые таблички на диске, ключ - sha256 параметров, профиля вывода и pdf_maker.layout_fingerprint()
+
+повторный запрос той же таблички - чтение файла вместо рендера; изменение размеров, цветов, шрифтов
+или кода рендера меняет отпечаток, старые записи больше не находятся и уходят при вытеснении
+
+ADDRESS_PLATE_CACHE_DIR включает кеш по умолчанию (и в процессах пула, и в server),
+ADDRESS_PLATE_CACHE_MAX_MB и ADDRESS_PLATE_CACHE_MAX_DAYS ограничивают его
+"""
+from collections import namedtuple
+import hashlib
+import io
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+import unicodedata
+
+try:
+    import fcntl
+except ImportError:  # windows: вытеснение без межпроцессной блокировки
+    fcntl = None
+
+from .instrument import timed
+from .plate_spec import PlateSpec
+
+CACHE_FORMAT = 1
+_MAGIC = b'%APC1 '
+
+CacheStats = namedtuple('CacheStats', ('hits', 'misses', 'writes', 'evicted'))
+
+
+def _normalize(value):
+    if value is None:
+        return None
+    value = unicodedata.normalize('NFC', str(value).strip())
+    return value or None
+
+
+def spec_key(spec: PlateSpec, fingerprint: str, profile=None, glyph_forms: bool = False) -> str:
+    """ sha256 всего, от чего зависят байты pdf таблички
+
+    :param spec: file is not part of the key
+    :param fingerprint: pdf_maker.layout_fingerprint()
+    :param profile: pdf_maker.OutputProfile or its name, resolved so equal profiles share entries
+    :param glyph_forms:
+    :return: hex sha256
+    """
+    from .pdf_maker import output_profile
+
+    params = [_normalize(value) for value in spec[:-1]]
+    data = [CACHE_FORMAT, fingerprint, params, list(output_profile(profile)), bool(glyph_forms)]
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False).encode()).hexdigest()
+
+
+class PlateCache:
+    """ каталог с файлами <key[:2]>/<key>, запись через временный файл и os.replace
+
+    читатели не блокируются: файл либо виден целиком, либо отсутствует (промах)
+    вытеснение (evict) под flock, по времени последнего использования
+    """
+
+    def __init__(self, directory, max_bytes: int = None, max_age: float = None, evict_every: int = 256):
+        """
+
+        :param directory: created if missing
+        :param max_bytes: total size limit, least recently used go first
+        :param max_age: seconds since last use
+        :param evict_every: run evict() after so many writes
+        """
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self.hits = self.misses = self.writes = self.evicted = 0
+        self._lock = threading.Lock()
+
+    def fingerprint(self) -> str:
+        """ pdf_maker.layout_fingerprint() на каждый запрос: set_layout() и шрифт, замененный на месте,
+        сразу дают другой ключ; sha256 файлов там пересчитываются только по изменению размера или mtime
+
+        """
+        from . import pdf_maker
+
+        return pdf_maker.layout_fingerprint()
+
+    def key(self, spec: PlateSpec, profile=None, glyph_forms: bool = False) -> str:
+        """ see spec_key
+
+        """
+        return spec_key(spec, self.fingerprint(), profile, glyph_forms)
+
+    def path(self, key: str) -> pathlib.Path:
+        return self.directory.joinpath(key[:2], key)
+
+    @timed('cache')
+    def get(self, key: str):
+        """
+
+        :param key:
+        :return: (pdf bytes, file_name) or None
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            os.utime(path)  # время последнего использования для evict, atime часто не обновляется
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        header, _, data = raw.partition(b'\n')
+        if not header.startswith(_MAGIC):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data, header[len(_MAGIC):].decode('utf-8')
+
+    @timed('cache')
+    def put(self, key: str, data: bytes, file_name: str):
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_MAGIC + file_name.encode('utf-8') + b'\n')
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self.writes += 1
+            evict = self.evict_every and self.writes % self.evict_every == 0
+        if evict and (self.max_bytes is not None or self.max_age is not None):
+            self.evict()
+
+    def render(self, spec: PlateSpec, render, profile=None, glyph_forms: bool = False):
+        """ из кеша или render() с записью в кеш
+
+        :param spec:
+        :param render: () -> (pdf, file_name) like plate_pdf
+        :param profile:
+        :param glyph_forms:
+        :return: (pdf, file_name)
+        """
+        key = self.key(spec, profile, glyph_forms)
+        cached = self.get(key)
+        if cached is not None:
+            data, file_name = cached
+            return io.BytesIO(data), file_name
+        pdf, file_name = render()
+        self.put(key, pdf.getvalue(), file_name)
+        return pdf, file_name
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry, stat
+
+    def evict(self) -> int:
+        """ удаляет записи старше max_age, потом самые давние, пока размер больше max_bytes
+
+        один процесс за раз (flock на .lock), остальные пропускают; недописанные .tmp-
+        старше часа считаются брошенными
+
+        :return: removed entries
+        """
+        lock_path = self.directory.joinpath('.lock')
+        with open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return 0
+            now = time.time()
+            entries = []
+            removed = 0
+            for entry, stat in self._entries():
+                if entry.name.startswith('.tmp-'):
+                    expired = stat.st_mtime < now - 3600
+                else:
+                    expired = self.max_age is not None and stat.st_mtime < now - self.max_age
+                    if not expired:
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                if expired:
+                    removed += self._unlink(entry.path)
+
+            if self.max_bytes is not None:
+                total = sum(size for _, size, _ in entries)
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes:
+                        break
+                    removed += self._unlink(path)
+                    total -= size
+        with self._lock:
+            self.evicted += removed
+        return removed
+
+    @staticmethod
+    def _unlink(path) -> int:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return 0
+        return 1
+
+    def clear(self):
+        for entry, _ in self._entries():
+            self._unlink(entry.path)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, self.writes, self.evicted)
+
+    def size(self):
+        """ (entries, bytes) на диске
+
+        """
+        count = total = 0
+        for entry, stat in self._entries():
+            if not entry.name.startswith('.tmp-'):
+                count += 1
+                total += stat.st_size
+        return count, total
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def open_cache(directory, max_bytes: int = None, max_age: float = None) -> PlateCache:
+    """ один PlateCache на каталог в процессе
+
+    """
+    key = (str(pathlib.Path(directory).absolute()), max_bytes, max_age)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = PlateCache(directory, max_bytes, max_age)
+    return cache
+
+
+def default_cache():
+    """ PlateCache из ADDRESS_PLATE_CACHE_DIR или None
+
+    """
+    directory = os.environ.get('ADDRESS_PLATE_CACHE_DIR')
+    if not directory:
+        return None
+    max_mb = os.environ.get('ADDRESS_PLATE_CACHE_MAX_MB')
+    max_days = os.environ.get('ADDRESS_PLATE_CACHE_MAX_DAYS')
+    return open_cache(directory,
+                      int(float(max_mb) * 1024 * 1024) if max_mb else None,
+                      float(max_days) * 86400 if max_days else None)
+
+
+def get_cache(cache=None):
+    """
+
+    :param cache: None - default_cache(), False - no cache, PlateCache or directory
+    :return: PlateCache or None
+    """
+    if cache is None:
+        return default_cache()
+    if cache is False:
+        return None
+    if isinstance(cache, PlateCache):
+        return cache
+    return open_cache(cache)
@@ -0,0 +1,223 @@
+from collections import namedtuple
+import csv
+import json
+import pathlib
+
+from .house_number import HouseNumberError, parse_arrow_number, parse_house_number
+
+NAME = 'name'
+NUMBER = 'number'
+VERTICAL = 'vertical'
+KINDS = (NAME, NUMBER, VERTICAL)
+
+PlateSpec = namedtuple('PlateSpec', ('kind', 'wide', 'type', 'name', 'translit', 'number', 'left', 'right', 'file'),
+                       defaults=(None,) * 7)
+PlateSpec.__doc__ = """одна табличка, поля как у аргументов address_plate.py"""
+
+RenderResult = namedtuple('RenderResult', ('index', 'spec', 'file_name', 'data', 'error'))
+
+_REQUIRED = {
+    NAME: ('type', 'name', 'translit'),
+    NUMBER: ('number',),
+    VERTICAL: ('type', 'name', 'translit', 'number'),
+}
+
+_WIDE_TRUE = ('wide', '1', 'true', 'yes', 'y')
+_WIDE_FALSE = ('thin', '0', 'false', 'no', 'n', '')
+
+
+# номера разбираются уже при чтении строки: плохой номер - ошибка строки, а не рендера
+_NUMBER_FIELDS = {
+    NAME: (),
+    NUMBER: (('number', parse_house_number), ('left', parse_arrow_number), ('right', parse_arrow_number)),
+    VERTICAL: (('number', parse_house_number),),
+}
+
+
+class SpecError(ValueError):
+    """ field - поле строки, если ошибка в нем; для номеров __cause__ - HouseNumberError с позицией
+
+    """
+
+    def __init__(self, message: str, field: str = None):
+        super().__init__(message)
+        self.field = field
+
+    def __reduce__(self):
+        # из процессов пула вместе с field и HouseNumberError
+        return type(self), (self.args[0], self.field), {'__cause__': self.__cause__}
+
+
+def _wide(value, default: str) -> str:
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return 'wide' if value else 'thin'
+    value = str(value).strip().lower()
+    if value in _WIDE_TRUE:
+        return 'wide'
+    if value in _WIDE_FALSE:
+        return 'thin' if value else default
+    raise SpecError(f'bad wide value: {value!r}')
+
+
+def spec_from_dict(row: dict, wide: str = 'thin') -> PlateSpec:
+    """ PlateSpec из строки манифеста, пустые строки -> None
+
+    :param row: {'kind': ..., 'wide': ..., 'type': ..., ...}
+    :param wide: default for rows without wide
+    :return:
+    """
+    values = {}
+    for field in PlateSpec._fields[2:]:
+        value = row.get(field)
+        if value is not None:
+            value = str(value).strip() or None
+        values[field] = value
+
+    kind = str(row.get('kind') or '').strip()
+    if kind not in KINDS:
+        raise SpecError(f'bad kind: {kind!r}, expected one of {", ".join(KINDS)}')
+    missing = [field for field in _REQUIRED[kind] if not values[field]]
+    if missing:
+        raise SpecError(f'{kind}: missing {", ".join(missing)}')
+    for field, parse in _NUMBER_FIELDS[kind]:
+        if values[field]:
+            try:
+                parse(values[field])
+            except HouseNumberError as e:
+                raise SpecError(f'{field}: {e}', field) from e
+
+    return PlateSpec(kind=kind, wide=_wide(row.get('wide'), wide), **values)
+
+
+def read_manifest(path, wide: str = 'thin'):
+    """ CSV (с заголовком) или JSONL, по расширению файла
+
+    yields (row_number, PlateSpec or SpecError), плохие строки не останавливают чтение
+
+    :param path:
+    :param wide: default for rows without wide
+    :return:
+    """
+    path = pathlib.Path(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.suffix.lower() in ('.jsonl', '.ndjson', '.json'):
+            for row_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    error = SpecError(f'bad JSON: {e}')
+                    error.__cause__ = e
+                    yield row_number, error
+                    continue
+                if not isinstance(row, dict):
+                    yield row_number, SpecError('row is not an object')
+                    continue
+                try:
+                    yield row_number, spec_from_dict(row, wide)
+                except SpecError as e:
+                    yield row_number, e
+        else:
+            for row_number, row in enumerate(csv.DictReader(f), 2):
+                try:
+                    yield row_number, spec_from_dict(row, wide)
+                except SpecError as e:
+                    yield row_number, e
+
+
+def validate_manifest(path, wide: str = 'thin') -> list:
+    """ весь манифест без рендера: все плохие строки сразу, а не по одной в процессе batch
+
+    :param path: see read_manifest
+    :param wide:
+    :return: [(row_number, SpecError), ...], empty - every row is fine
+    """
+    return [(row_number, spec) for row_number, spec in read_manifest(path, wide) if isinstance(spec, Exception)]
+
+
+def number_file_name(house_num: str) -> str:
+    return f"{house_num.replace('/', '_')}.pdf"
+
+
+def street_file_name(street_type: str, street_name: str) -> str:
+    return f"{street_type}_{street_name}.pdf"
+
+
+def plate_file_name(spec: PlateSpec) -> str:
+    """ имя pdf таблички без рендера: spec.file или file_name объекта таблички
+
+    """
+    if spec.file:
+        return spec.file
+    if spec.kind == NUMBER:
+        return number_file_name(spec.number)
+    return street_file_name(spec.type, spec.name)
+
+
+def make_plate(spec: PlateSpec):
+    """ объект таблички для pdf_maker.plate_pdf / plates_pdf
+
+    :param spec:
+    :return: HouseNumberPlate, StreetNamePlate or VerticalPlate
+    """
+    from .pdf_maker import StreetNamePlate, HouseNumberPlate, VerticalPlate
+
+    if spec.kind == NAME:
+        return StreetNamePlate(street_type=spec.type, street_name=spec.name, street_translit=spec.translit,
+                               wide=spec.wide)
+    if spec.kind == NUMBER:
+        return HouseNumberPlate(house_num=spec.number, left_num=spec.left, right_num=spec.right, wide=spec.wide)
+    if spec.kind == VERTICAL:
+        return VerticalPlate(street_type=spec.type, street_name=spec.name, street_translit=spec.translit,
+                             house_num=spec.number, wide=spec.wide)
+    raise SpecError(f'bad kind: {spec.kind!r}')
+
+
+def render_plate(spec: PlateSpec, profile=None, glyph_forms: bool = False, cache=None):
+    """ одностраничный pdf как у *_pdf функций
+
+    :param spec:
+    :param profile: pdf_maker.OutputProfile or its name
+    :param glyph_forms: see pdf_maker.plate_pdf
+    :param cache: see pdf_maker.cached_plate_pdf
+    :return: (pdf, file_name)
+    """
+    from .pdf_maker import cached_plate_pdf
+
+    pdf, file_name = cached_plate_pdf(spec, lambda: make_plate(spec), glyph_forms, profile, cache)
+    return pdf, spec.file or file_name
+
+
+def render_result(spec, index: int = None, profile=None, glyph_forms: bool = False) -> RenderResult:
+    """ render_plate без исключений, для batch, пула процессов и server
+
+    :param spec: PlateSpec, or Exception which is passed through as error
+    :param index: position in batch
+    :param profile: pdf_maker.OutputProfile or its name
+    :param glyph_forms: see pdf_maker.plate_pdf
+    :return:
+    """
+    if isinstance(spec, Exception):
+        return RenderResult(index, None, None, None, spec)
+    try:
+        pdf, file_name = render_plate(spec, profile, glyph_forms)
+        return RenderResult(index, spec, file_name, pdf.getvalue(), None)
+    except Exception as e:
+        return RenderResult(index, spec, None, None, e)
+
+
+def render_document(specs, glyph_forms: bool = False, profile=None, output=None):
+    """ все таблички одним pdf, страница на табличку
+
+    :param specs: iterable of PlateSpec
+    :param glyph_forms: glyphs as form XObjects shared by all pages
+    :param profile: pdf_maker.OutputProfile or its name
+    :param output: see pdf_maker.pdf_sink
+    :return: pdf
+    """
+    from .pdf_maker import plates_pdf
+
+    return plates_pdf((make_plate(spec) for spec in specs), glyph_forms, profile, output)
@@ -0,0 +1,279 @@
+""" превью табличек в PNG: тот же plate.draw, что у pdf, на cairo.ImageSurface
+
+RasterCanvas повторяет ту часть API reportlab canvas, которой пользуются таблички (фон, линии,
+Slash, стрелки draw_house_number_arrows), текст - контуры глифов get_glyph, как в pdf
+
+между рендерами живут поверхности (одна на размер в пикселях, на поток) и контуры глифов
+в виде cairo.Path, так что превью - это заливка готовых путей и сжатие PNG
+
+plate_png(HouseNumberPlate('12'), dpi=72) -> (io.BytesIO, '12.png')
+"""
+from collections import OrderedDict
+from math import ceil, pi
+import threading
+
+from .glyph_cache import GlyphCache, PATH_MOVE_TO, PATH_LINE_TO, PATH_CURVE_TO, PATH_CLOSE_PATH
+from .plate_spec import RenderResult
+from . import instrument
+from .instrument import timed
+from . import pdf_maker
+
+DEFAULT_DPI = 96
+
+# cairo.Path глифа по ключу GLYPH_CACHE, общий для потоков: cairo.Path не меняется после copy_path
+RASTER_GLYPH_CACHE = GlyphCache()
+
+# ARGB поверхности, кешированные на поток: всего байт и самая большая, что еще кешируется
+SURFACE_CACHE_BYTES = 64 * 1024 * 1024
+SURFACE_MAX_CACHED = 16 * 1024 * 1024
+
+_local = threading.local()
+
+
+def _color(color) -> tuple:
+    """ reportlab цвет (PCMYKColor) -> rgba для cairo
+
+    """
+    return (*color.rgb(), color.alpha)
+
+
+class RasterError(ValueError):
+    pass
+
+
+class RasterPath:
+    """ beginPath() без промежуточного списка: сегменты сразу в путь cairo.Context
+
+    между beginPath и drawPath на контексте ничего больше не рисуется, как и в табличках
+    """
+
+    __slots__ = ('moveTo', 'lineTo', 'curveTo', 'close')
+
+    def __init__(self, ctx):
+        ctx.new_path()
+        self.moveTo, self.lineTo, self.curveTo, self.close = ctx.move_to, ctx.line_to, ctx.curve_to, ctx.close_path
+
+
+class RasterCanvas:
+    """ cairo.Context с методами reportlab canvas, нужными plate.draw
+
+    y вниз от левого верхнего угла, как у canvas с bottomup=0, единицы - пункты
+    """
+
+    glyph_forms = False
+    output_profile = pdf_maker.OUTPUT_PROFILES['default']
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.fill_color = self.stroke_color = (0.0, 0.0, 0.0, 1.0)
+        self._states = []
+
+    def saveState(self):
+        self.ctx.save()
+        self._states.append((self.fill_color, self.stroke_color))
+
+    def restoreState(self):
+        self.ctx.restore()
+        self.fill_color, self.stroke_color = self._states.pop()
+
+    def setFillColor(self, color):
+        self.fill_color = _color(color)
+
+    def setStrokeColor(self, color):
+        self.stroke_color = _color(color)
+
+    def setLineWidth(self, width: float):
+        self.ctx.set_line_width(width)
+
+    def translate(self, dx: float, dy: float):
+        self.ctx.translate(dx, dy)
+
+    def scale(self, x: float, y: float):
+        self.ctx.scale(x, y)
+
+    def transform(self, a: float, b: float, c: float, d: float, e: float, f: float):
+        import cairo
+
+        self.ctx.transform(cairo.Matrix(a, b, c, d, e, f))
+
+    def beginPath(self) -> RasterPath:
+        return RasterPath(self.ctx)
+
+    def drawPath(self, path: RasterPath, stroke: int = 1, fill: int = 0):
+        ctx = self.ctx
+        if fill:
+            ctx.set_source_rgba(*self.fill_color)
+            ctx.fill_preserve()
+        if stroke:
+            ctx.set_source_rgba(*self.stroke_color)
+            ctx.stroke_preserve()
+        ctx.new_path()
+
+    def line(self, x1: float, y1: float, x2: float, y2: float):
+        ctx = self.ctx
+        ctx.new_path()
+        ctx.move_to(x1, y1)
+        ctx.line_to(x2, y2)
+        ctx.set_source_rgba(*self.stroke_color)
+        ctx.stroke()
+
+    def roundRect(self, x: float, y: float, width: float, height: float, radius: float, stroke: int = 1,
+                  fill: int = 0):
+        ctx = self.ctx
+        ctx.new_path()
+        ctx.arc(x + width - radius, y + radius, radius, -pi / 2, 0)
+        ctx.arc(x + width - radius, y + height - radius, radius, 0, pi / 2)
+        ctx.arc(x + radius, y + height - radius, radius, pi / 2, pi)
+        ctx.arc(x + radius, y + radius, radius, pi, 3 * pi / 2)
+        ctx.close_path()
+        self.drawPath(None, stroke, fill)
+
+    def draw_glyphs(self, text: str, font):
+        """ TextPath.draw: готовые cairo.Path глифов со сдвигом на advance, одна заливка на строку
+        текущим fill_color (TextPath.draw ставит COLOR_WHITE)
+
+        """
+        ctx = self.ctx
+        face, size = font.face, font.size
+        backend = pdf_maker.get_outline_backend().name
+        ctx.new_path()
+        ctx.save()
+        for char in text:
+            glyph = pdf_maker.get_glyph(face, size, char)
+            if glyph.extents:
+                ctx.append_path(RASTER_GLYPH_CACHE.get((backend, face, size, char), _make_glyph_path))
+            ctx.translate(*glyph.advance)
+        ctx.restore()
+        ctx.set_source_rgba(*self.fill_color)
+        ctx.fill()
+
+
+def _scratch_context():
+    """ контекст потока для сборки cairo.Path, на поверхности 1x1 без рисования
+
+    """
+    ctx = getattr(_local, 'scratch', None)
+    if ctx is None:
+        import cairo
+
+        ctx = _local.scratch = cairo.Context(cairo.ImageSurface(cairo.FORMAT_A8, 1, 1))
+    return ctx
+
+
+@timed('glyph')
+def _make_glyph_path(backend: str, face: str, size: float, char: str):
+    ctx = _scratch_context()
+    ctx.new_path()
+    for type_op, points in pdf_maker.get_glyph(face, size, char).path:
+        if type_op == PATH_MOVE_TO:
+            ctx.move_to(*points)
+        elif type_op == PATH_LINE_TO:
+            ctx.line_to(*points)
+        elif type_op == PATH_CURVE_TO:
+            ctx.curve_to(*points)
+        elif type_op == PATH_CLOSE_PATH:
+            ctx.close_path()
+    path = ctx.copy_path()
+    ctx.new_path()
+    return path
+
+
+def _surface(width: int, height: int, max_bytes: int = None, max_cached: int = None):
+    """ ImageSurface и Context потока нужного размера, недавние размеры остаются
+
+    таблички одного вида и ширины (thin/wide) одного размера, названия улиц - кратны margin;
+    поверхности потока вместе не больше max_bytes, одна больше max_cached (большой dpi) не сохраняется
+
+    :param max_bytes: default SURFACE_CACHE_BYTES
+    :param max_cached: default SURFACE_MAX_CACHED
+    :return: (surface, ctx), surface cleared, ctx with identity matrix
+    """
+    import cairo
+
+    max_bytes = SURFACE_CACHE_BYTES if max_bytes is None else max_bytes
+    max_cached = SURFACE_MAX_CACHED if max_cached is None else max_cached
+    surfaces = getattr(_local, 'surfaces', None)
+    if surfaces is None:
+        surfaces = _local.surfaces = OrderedDict()
+    key = (width, height)
+    entry = surfaces.get(key)
+    if entry is None:
+        size = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width) * height
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        entry = (surface, cairo.Context(surface), size)
+        if size <= min(max_cached, max_bytes):
+            surfaces[key] = entry
+            total = sum(cached[2] for cached in surfaces.values())
+            while total > max_bytes:
+                _, (_, _, evicted) = surfaces.popitem(last=False)
+                total -= evicted
+    else:
+        surfaces.move_to_end(key)
+    surface, ctx, _ = entry
+    ctx.identity_matrix()
+    ctx.reset_clip()
+    ctx.set_operator(cairo.OPERATOR_CLEAR)
+    ctx.paint()
+    ctx.set_operator(cairo.OPERATOR_OVER)
+    return surface, ctx
+
+
+def png_name(file_name: str) -> str:
+    return file_name[:-4] + '.png' if file_name.endswith('.pdf') else file_name + '.png'
+
+
+@timed('save')
+def _write_png(surface, output):
+    with pdf_maker.pdf_sink(output) as png:
+        surface.flush()
+        surface.write_to_png(png)
+    return png
+
+
+def plate_png(plate, dpi: float = DEFAULT_DPI, output=None, max_pixels: int = None):
+    """ одна табличка -> PNG, углы за скруглением прозрачные
+
+    :param plate: HouseNumberPlate, StreetNamePlate or VerticalPlate
+    :param dpi: 72 - pixel per pt
+    :param output: see pdf_maker.pdf_sink, default io.BytesIO
+    :param max_pixels: RasterError for a larger image, before the surface is allocated
+    :return: (png, file_name), png - io.BytesIO at 0 or output
+    """
+    zoom = dpi / 72
+    width, height = max(1, ceil(plate.width * zoom)), max(1, ceil(plate.height * zoom))
+    if max_pixels is not None and width * height > max_pixels:
+        raise RasterError(f'{width}x{height} px at {dpi:g} dpi, more than {max_pixels} pixels')
+    surface, ctx = _surface(width, height)
+    ctx.scale(zoom, zoom)
+    plate.draw(RasterCanvas(ctx))
+    png = _write_png(surface, output)
+    file_name = png_name(plate.file_name)
+    instrument.plate_done(file_name)
+    if output is not None:
+        return output, file_name
+    png.seek(0)
+    return png, file_name
+
+
+def render_png(spec, dpi: float = DEFAULT_DPI, output=None, max_pixels: int = None):
+    """ plate_png по PlateSpec, без дискового кеша
+
+    :return: (png, file_name)
+    """
+    from .plate_spec import make_plate
+
+    png, file_name = plate_png(make_plate(spec), dpi, output, max_pixels)
+    return png, png_name(spec.file) if spec.file else file_name
+
+
+def png_result(spec, index: int = None, dpi: float = DEFAULT_DPI, max_pixels: int = None) -> RenderResult:
+    """ render_png без исключений, как plate_spec.render_result
+
+    """
+    if isinstance(spec, Exception):
+        return RenderResult(index, None, None, None, spec)
+    try:
+        png, file_name = render_png(spec, dpi, max_pixels=max_pixels)
+        return RenderResult(index, spec, file_name, png.getvalue(), None)
+    except Exception as e:
+        return RenderResult(index, spec, None, None, e)
@@ -0,0 +1,374 @@
+""" HTTP сервис на asyncio: шрифты и кеши глифов живут между запросами
+
+GET или POST (form, JSON) с параметрами как у *_pdf функций:
+
+/name?type=вулиця&name=Хорива&translit=Khoryva vulytsia&wide=1
+/number?number=12&left=14&right=12А
+/vertical?type=вулиця&name=Хорива&translit=Khoryva vulytsia&number=25
+/health - задержки и пропускная способность, JSON
+
+необязательные параметры: wide, profile (pdf_maker.OUTPUT_PROFILES), glyph_forms,
+format=png и dpi (по умолчанию raster.DEFAULT_DPI) - превью вместо pdf, не больше MAX_DPI и MAX_PIXELS
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from email.utils import formatdate
+from functools import partial
+import json
+import logging
+import os
+import time
+from urllib.parse import urlsplit, parse_qsl, quote
+
+from .plate_spec import NAME, NUMBER, VERTICAL, SpecError, spec_from_dict, render_result
+
+logger = logging.getLogger(__name__)
+
+ROUTES = {'/name': NAME, '/number': NUMBER, '/vertical': VERTICAL}
+
+STREAM_CHUNK = 64 * 1024
+MAX_HEADER = 16 * 1024
+MAX_BODY = 64 * 1024
+MAX_DPI = 600
+# png: ширина * высота; 300 dpi проходит для любой таблички, 600 dpi широкой вертикальной - 217 Mpx, 870 MB ARGB
+MAX_PIXELS = 64 * 1000 * 1000
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error',
+            503: 'Service Unavailable'}
+
+_PROFILES = ('default', 'compact', 'archive', 'plain')
+_TRUE = ('1', 'true', 'yes', 'y', 'on')
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceStats:
+    """ счетчики и скользящее окно задержек для /health
+
+    """
+
+    def __init__(self, window: int = 1024, period: float = 60.0):
+        self.started = time.monotonic()
+        self.period = period
+        self.requests = 0
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.bytes = 0
+        self.in_flight = 0
+        self._latencies = deque(maxlen=window)
+        self._finished = deque()
+
+    def add(self, latency: float, size: int = 0, error: bool = False):
+        now = time.monotonic()
+        if error:
+            self.failed += 1
+        else:
+            self.rendered += 1
+            self.bytes += size
+            self._latencies.append(latency)
+            self._finished.append(now)
+        while self._finished and self._finished[0] < now - self.period:
+            self._finished.popleft()
+
+    def as_dict(self) -> dict:
+        now = time.monotonic()
+        while self._finished and self._finished[0] < now - self.period:
+            self._finished.popleft()
+        latencies = sorted(self._latencies)
+
+        def percentile(q):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2)
+
+        uptime = now - self.started
+        return {
+            'status': 'ok',
+            'uptime_s': round(uptime, 1),
+            'requests': self.requests,
+            'rendered': self.rendered,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'in_flight': self.in_flight,
+            'bytes': self.bytes,
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'p99': percentile(0.99),
+                           'max': percentile(1.0), 'samples': len(latencies)},
+            'plates_per_second': round(len(self._finished) / min(self.period, uptime or 1.0), 2),
+        }
+
+
+class PlateServer:
+    """ рендер в executor, event loop только принимает соединения и отдает байты
+
+    max_concurrency рендеров одновременно, еще max_queue ждут, остальным 503
+    """
+
+    def __init__(self, workers: int = None, executor: str = 'process', max_concurrency: int = None,
+                 max_queue: int = 64, timeout: float = 30.0, wide: str = 'thin'):
+        """
+
+        :param workers: executor size, default os.cpu_count()
+        :param executor: 'process' - parallel rendering, caches per process; 'thread' - one shared cache, GIL
+        :param max_concurrency: renders at once, default workers
+        :param max_queue: requests waiting for a render slot
+        :param timeout: seconds for reading a request and for a render
+        :param wide: default for requests without wide
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.executor_kind = executor
+        self.max_concurrency = max_concurrency or self.workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.wide = wide
+        self.stats = ServiceStats()
+        self._executor = None
+        self._slots = None
+        self._waiting = 0
+
+    def start_executor(self):
+        from .parallel import _init_worker
+
+        if self.executor_kind == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            # процессы стартуют и грузят шрифты до первого запроса
+            for future in [self._executor.submit(_init_worker) for _ in range(self.workers)]:
+                future.result()
+        elif self.executor_kind == 'thread':
+            _init_worker()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            raise ValueError(f'bad executor: {self.executor_kind!r}')
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8000):
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        if self._executor is None:
+            self.start_executor()
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.shutdown()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader), self.timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except HTTPError as e:
+                    await self.send(writer, e.status, str(e).encode() + b'\n', keep_alive=False)
+                    break
+                except Exception:
+                    logger.exception('reading request failed')
+                    await self.send(writer, 500, b'internal error\n', keep_alive=False)
+                    break
+                method, path, params, keep_alive = request
+                await self.respond(writer, method, path, params, keep_alive)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader: asyncio.StreamReader):
+        """
+
+        :return: (method, path, params, keep_alive)
+        """
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413, 'headers too large')
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HTTPError(400, 'bad request line')
+        headers = {}
+        for line in lines[1:]:
+            name, colon, value = line.partition(':')
+            if colon:
+                headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HTTPError(400, 'bad Content-Length')
+        if length > MAX_BODY:
+            raise HTTPError(413, 'body too large')
+        if length:
+            body = await reader.readexactly(length)
+            if headers.get('content-type', '').startswith('application/json'):
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise HTTPError(400, 'bad JSON body')
+                if not isinstance(data, dict):
+                    raise HTTPError(400, 'JSON body must be an object')
+                params.update(data)
+            else:
+                try:
+                    params.update(parse_qsl(body.decode('utf-8'), keep_blank_values=True))
+                except UnicodeDecodeError:
+                    raise HTTPError(400, 'body is not UTF-8')
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        return method, url.path, params, keep_alive
+
+    async def respond(self, writer, method: str, path: str, params: dict, keep_alive: bool):
+        self.stats.requests += 1
+        if path == '/health':
+            body = json.dumps(self.health()).encode()
+            await self.send(writer, 200, body, 'application/json', keep_alive=keep_alive)
+            return
+        kind = ROUTES.get(path.rstrip('/'))
+        if kind is None:
+            await self.send(writer, 404, b'not found\n', keep_alive=keep_alive)
+            return
+        if method not in ('GET', 'POST'):
+            await self.send(writer, 405, b'GET or POST\n', keep_alive=keep_alive)
+            return
+
+        try:
+            data, file_name, content_type = await self.render(kind, params)
+        except HTTPError as e:
+            await self.send(writer, e.status, str(e).encode() + b'\n', keep_alive=keep_alive)
+            return
+        except Exception:
+            # сломанный пул процессов, ошибка executor: ответ 500, а не оборванное соединение
+            logger.exception('render failed: %s %r', path, params)
+            self.stats.failed += 1
+            await self.send(writer, 500, b'internal error\n', keep_alive=keep_alive)
+            return
+        headers = {'Content-Disposition': f"inline; filename*=UTF-8''{quote(file_name)}"}
+        await self.send(writer, 200, data, content_type, headers, keep_alive)
+
+    async def render(self, kind: str, params: dict):
+        """ PlateSpec из параметров, рендер в executor с ограничением параллельности
+
+        :return: (pdf or png bytes, file_name, content type)
+        """
+        params = dict(params, kind=kind)
+        profile = params.pop('profile', None) or None
+        if profile is not None and profile not in _PROFILES:
+            raise HTTPError(400, f'bad profile: {profile!r}, expected one of {", ".join(_PROFILES)}')
+        glyph_forms = str(params.pop('glyph_forms', '')).lower() in _TRUE
+        output_format = str(params.pop('format', None) or 'pdf').lower()
+        dpi = params.pop('dpi', None)
+        if output_format == 'png':
+            from .raster import DEFAULT_DPI, png_result
+
+            try:
+                dpi = float(dpi) if dpi not in (None, '') else DEFAULT_DPI
+            except (TypeError, ValueError):
+                raise HTTPError(400, f'bad dpi: {dpi!r}')
+            if not 0 < dpi <= MAX_DPI:
+                raise HTTPError(400, f'dpi must be in (0, {MAX_DPI}]')
+            job, content_type = partial(png_result, index=None, dpi=dpi, max_pixels=MAX_PIXELS), 'image/png'
+        elif output_format == 'pdf':
+            job, content_type = partial(render_result, index=None, profile=profile, glyph_forms=glyph_forms), \
+                'application/pdf'
+        else:
+            raise HTTPError(400, f'bad format: {output_format!r}, expected pdf or png')
+        try:
+            spec = spec_from_dict(params, self.wide)
+        except SpecError as e:
+            raise HTTPError(400, str(e))
+
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            self.stats.rejected += 1
+            raise HTTPError(503, 'too many requests')
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        self.stats.in_flight += 1
+
+        def release(_):
+            # слот занят, пока executor реально работает, даже если клиент уже получил timeout
+            self.stats.in_flight -= 1
+            self._slots.release()
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, partial(job, spec))
+        except BaseException:
+            # BrokenProcessPool и т.п. уже при отправке: слот освобождается сразу
+            release(None)
+            raise
+        future.add_done_callback(release)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats.add(time.perf_counter() - started, error=True)
+            raise HTTPError(503, 'render timeout')
+
+        self.stats.add(time.perf_counter() - started, len(result.data or b''), result.error is not None)
+        if result.error is not None:
+            raise HTTPError(422, f'{type(result.error).__name__}: {result.error}')
+        return result.data, result.file_name, content_type
+
+    def health(self) -> dict:
+        health = self.stats.as_dict()
+        health.update(executor=self.executor_kind, workers=self.workers, max_concurrency=self.max_concurrency,
+                      max_queue=self.max_queue)
+        if self.executor_kind == 'thread':
+            from .pdf_maker import COMPONENT_CACHE, GLYPH_CACHE, METRICS_CACHE
+
+            health['glyph_cache'] = GLYPH_CACHE.cache_info()._asdict()
+            health['metrics_cache'] = METRICS_CACHE.cache_info()._asdict()
+            health['component_cache'] = COMPONENT_CACHE.cache_info()._asdict()
+        return health
+
+    @staticmethod
+    async def send(writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str = 'text/plain',
+                   headers: dict = None, keep_alive: bool = True):
+        """ заголовки и тело кусками по STREAM_CHUNK, drain между кусками
+
+        """
+        head = [f'HTTP/1.1 {status} {_REASONS.get(status, "")}',
+                f'Date: {formatdate(usegmt=True)}',
+                f'Content-Type: {content_type}',
+                f'Content-Length: {len(body)}',
+                f'Connection: {"keep-alive" if keep_alive else "close"}']
+        head.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        view = memoryview(body)
+        for start in range(0, len(view), STREAM_CHUNK):
+            writer.write(view[start:start + STREAM_CHUNK])
+            await writer.drain()
+        await writer.drain()
+
+
+def run_server(host: str = '127.0.0.1', port: int = 8000, **kwargs):
+    """ блокирует до Ctrl+C
+
+    :param host:
+    :param port:
+    :param kwargs: see PlateServer
+    """
+    server = PlateServer(**kwargs)
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,319 @@
+""" чтение TrueType (glyf) шрифтов без FreeType и cairo
+
+только то, что нужно для табличек: cmap, метрики, контуры глифов и таблица kern
+"""
+import struct
+
+ON_CURVE = 0x01
+X_SHORT = 0x02
+Y_SHORT = 0x04
+REPEAT = 0x08
+X_SAME_OR_POSITIVE = 0x10
+Y_SAME_OR_POSITIVE = 0x20
+
+ARG_1_AND_2_ARE_WORDS = 0x0001
+ARGS_ARE_XY_VALUES = 0x0002
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+# сегменты контура в единицах шрифта, y вверх
+SEG_MOVE = 0
+SEG_LINE = 1
+SEG_QUAD = 2
+SEG_CLOSE = 3
+
+
+class TrueTypeError(ValueError):
+    pass
+
+
+class TrueTypeFont:
+    """ glyf-шрифт из .ttf или .ttc файла
+
+    контуры в единицах шрифта (units_per_em), y вверх, как в файле
+    """
+
+    def __init__(self, filename: str, faceindex: int = 0):
+        with open(filename, 'rb') as f:
+            self.data = f.read()
+        self.filename = filename
+        self.tables = self._read_tables(faceindex)
+
+        head = self._table('head')
+        self.units_per_em, = struct.unpack_from('>H', head, 18)
+        self.index_to_loc_format, = struct.unpack_from('>h', head, 50)
+        self.num_glyphs, = struct.unpack_from('>H', self._table('maxp'), 4)
+        self.number_of_h_metrics, = struct.unpack_from('>H', self._table('hhea'), 34)
+
+        if 'glyf' not in self.tables:
+            raise TrueTypeError(f'{filename}: no glyf table, CFF outlines are not supported')
+
+        self.cmap = self._read_cmap()
+        self._outlines = {}
+
+    def _read_tables(self, faceindex):
+        offset = 0
+        tag = self.data[:4]
+        if tag == b'ttcf':
+            num_fonts, = struct.unpack_from('>I', self.data, 8)
+            if faceindex >= num_fonts:
+                raise TrueTypeError(f'{self.filename}: no face {faceindex}')
+            offset, = struct.unpack_from('>I', self.data, 12 + 4 * faceindex)
+        elif faceindex:
+            raise TrueTypeError(f'{self.filename}: no face {faceindex}')
+
+        num_tables, = struct.unpack_from('>H', self.data, offset + 4)
+        tables = {}
+        for i in range(num_tables):
+            tag, _, table_offset, length = struct.unpack_from('>4sIII', self.data, offset + 12 + 16 * i)
+            tables[tag.decode('latin-1')] = (table_offset, length)
+        return tables
+
+    def _table(self, tag: str) -> memoryview:
+        try:
+            offset, length = self.tables[tag]
+        except KeyError:
+            raise TrueTypeError(f'{self.filename}: no {tag} table') from None
+        return memoryview(self.data)[offset:offset + length]
+
+    def _read_cmap(self) -> dict:
+        cmap = self._table('cmap')
+        num_tables, = struct.unpack_from('>H', cmap, 2)
+        subtables = {}
+        for i in range(num_tables):
+            platform_id, encoding_id, offset = struct.unpack_from('>HHI', cmap, 4 + 8 * i)
+            subtable_format, = struct.unpack_from('>H', cmap, offset)
+            subtables[(platform_id, encoding_id, subtable_format)] = offset
+
+        for key in ((3, 10, 12), (0, 4, 12), (0, 6, 12), (3, 1, 4), (0, 3, 4), (0, 1, 4), (0, 0, 4)):
+            if key in subtables:
+                offset = subtables[key]
+                return self._read_cmap_12(cmap, offset) if key[2] == 12 else self._read_cmap_4(cmap, offset)
+        raise TrueTypeError(f'{self.filename}: no unicode cmap')
+
+    @staticmethod
+    def _read_cmap_4(cmap, offset) -> dict:
+        seg_count = struct.unpack_from('>H', cmap, offset + 6)[0] // 2
+        end_codes = struct.unpack_from(f'>{seg_count}H', cmap, offset + 14)
+        start_codes = struct.unpack_from(f'>{seg_count}H', cmap, offset + 16 + 2 * seg_count)
+        id_deltas = struct.unpack_from(f'>{seg_count}h', cmap, offset + 16 + 4 * seg_count)
+        id_range_offsets_at = offset + 16 + 6 * seg_count
+        id_range_offsets = struct.unpack_from(f'>{seg_count}H', cmap, id_range_offsets_at)
+
+        result = {}
+        for i, (start, end, delta, range_offset) in enumerate(zip(start_codes, end_codes, id_deltas,
+                                                                  id_range_offsets)):
+            if start == 0xFFFF:
+                continue
+            for code in range(start, end + 1):
+                if range_offset == 0:
+                    glyph_id = (code + delta) & 0xFFFF
+                else:
+                    at = id_range_offsets_at + 2 * i + range_offset + 2 * (code - start)
+                    glyph_id, = struct.unpack_from('>H', cmap, at)
+                    if glyph_id:
+                        glyph_id = (glyph_id + delta) & 0xFFFF
+                if glyph_id:
+                    result[chr(code)] = glyph_id
+        return result
+
+    @staticmethod
+    def _read_cmap_12(cmap, offset) -> dict:
+        num_groups, = struct.unpack_from('>I', cmap, offset + 12)
+        result = {}
+        for i in range(num_groups):
+            start, end, start_glyph = struct.unpack_from('>III', cmap, offset + 16 + 12 * i)
+            for code in range(start, end + 1):
+                result[chr(code)] = start_glyph + code - start
+        return result
+
+    def glyph_id(self, char: str) -> int:
+        """ 0 (.notdef) for chars missing in the font, как cairo
+
+        """
+        return self.cmap.get(char, 0)
+
+    def advance(self, glyph_id: int) -> int:
+        hmtx = self._table('hmtx')
+        advance, = struct.unpack_from('>H', hmtx, 4 * min(glyph_id, self.number_of_h_metrics - 1))
+        return advance
+
+    def kerning(self) -> dict:
+        """ {(left_glyph_id, right_glyph_id): value} из таблицы kern (format 0), без GPOS
+
+        """
+        if 'kern' not in self.tables:
+            return {}
+        kern = self._table('kern')
+        version, num_tables = struct.unpack_from('>HH', kern, 0)
+        if version != 0:
+            return {}
+        pairs = {}
+        offset = 4
+        for _ in range(num_tables):
+            _, length, coverage = struct.unpack_from('>HHH', kern, offset)
+            if coverage >> 8 == 0 and coverage & 0x1 and not coverage & 0x4:
+                num_pairs, = struct.unpack_from('>H', kern, offset + 6)
+                for i in range(num_pairs):
+                    left, right, value = struct.unpack_from('>HHh', kern, offset + 14 + 6 * i)
+                    pairs[(left, right)] = pairs.get((left, right), 0) + value
+            offset += length
+        return pairs
+
+    def _glyph_data(self, glyph_id: int) -> memoryview:
+        loca = self._table('loca')
+        if self.index_to_loc_format == 0:
+            start, end = struct.unpack_from('>HH', loca, 2 * glyph_id)
+            start, end = start * 2, end * 2
+        else:
+            start, end = struct.unpack_from('>II', loca, 4 * glyph_id)
+        return self._table('glyf')[start:end]
+
+    def _contours(self, glyph_id: int, depth: int = 0) -> list:
+        """ [[(x, y, on_curve), ...], ...] with composite glyphs resolved
+
+        """
+        if depth > 16:
+            raise TrueTypeError(f'{self.filename}: composite glyph {glyph_id} is too deep')
+        data = self._glyph_data(glyph_id)
+        if not data:
+            return []
+        number_of_contours, = struct.unpack_from('>h', data, 0)
+        if number_of_contours >= 0:
+            return self._simple_contours(data, number_of_contours)
+        return self._composite_contours(data, depth)
+
+    @staticmethod
+    def _simple_contours(data, number_of_contours) -> list:
+        end_points = struct.unpack_from(f'>{number_of_contours}H', data, 10)
+        if not end_points:
+            return []
+        num_points = end_points[-1] + 1
+        instruction_length, = struct.unpack_from('>H', data, 10 + 2 * number_of_contours)
+        at = 12 + 2 * number_of_contours + instruction_length
+
+        flags = []
+        while len(flags) < num_points:
+            flag = data[at]
+            at += 1
+            flags.append(flag)
+            if flag & REPEAT:
+                flags.extend([flag] * data[at])
+                at += 1
+
+        def coordinates(short, same_or_positive):
+            nonlocal at
+            values = []
+            value = 0
+            for flag in flags:
+                if flag & short:
+                    delta = data[at]
+                    at += 1
+                    value += delta if flag & same_or_positive else -delta
+                elif not flag & same_or_positive:
+                    delta, = struct.unpack_from('>h', data, at)
+                    at += 2
+                    value += delta
+                values.append(value)
+            return values
+
+        xs = coordinates(X_SHORT, X_SAME_OR_POSITIVE)
+        ys = coordinates(Y_SHORT, Y_SAME_OR_POSITIVE)
+
+        contours = []
+        start = 0
+        for end in end_points:
+            contours.append([(xs[i], ys[i], bool(flags[i] & ON_CURVE)) for i in range(start, end + 1)])
+            start = end + 1
+        return contours
+
+    def _composite_contours(self, data, depth) -> list:
+        contours = []
+        at = 10
+        flags = MORE_COMPONENTS
+        while flags & MORE_COMPONENTS:
+            flags, glyph_id = struct.unpack_from('>HH', data, at)
+            at += 4
+            if flags & ARG_1_AND_2_ARE_WORDS:
+                args = struct.unpack_from('>hh' if flags & ARGS_ARE_XY_VALUES else '>HH', data, at)
+                at += 4
+            else:
+                args = struct.unpack_from('>bb' if flags & ARGS_ARE_XY_VALUES else '>BB', data, at)
+                at += 2
+
+            a, b, c, d = 1.0, 0.0, 0.0, 1.0
+            if flags & WE_HAVE_A_SCALE:
+                a = d = struct.unpack_from('>h', data, at)[0] / 16384
+                at += 2
+            elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+                a, d = (v / 16384 for v in struct.unpack_from('>hh', data, at))
+                at += 4
+            elif flags & WE_HAVE_A_TWO_BY_TWO:
+                a, b, c, d = (v / 16384 for v in struct.unpack_from('>hhhh', data, at))
+                at += 8
+
+            component = self._contours(glyph_id, depth + 1)
+            if flags & ARGS_ARE_XY_VALUES:
+                dx, dy = args
+            else:
+                # совмещение точек: точка args[0] родителя на точку args[1] компонента
+                parent_points = [p for contour in contours for p in contour]
+                child_points = [p for contour in component for p in contour]
+                try:
+                    px, py, _ = parent_points[args[0]]
+                    cx, cy, _ = child_points[args[1]]
+                except IndexError:
+                    raise TrueTypeError(f'{self.filename}: bad point matching in composite glyph') from None
+                cx, cy = a * cx + c * cy, b * cx + d * cy
+                dx, dy = px - cx, py - cy
+
+            for contour in component:
+                contours.append([(a * x + c * y + dx, b * x + d * y + dy, on) for x, y, on in contour])
+        return contours
+
+    def outline(self, glyph_id: int) -> tuple:
+        """ segments in font units: (SEG_MOVE, x, y), (SEG_LINE, x, y), (SEG_QUAD, cx, cy, x, y), (SEG_CLOSE,)
+
+        контур раскладывается как FT_Outline_Decompose, замыкающий line_to в начало не пишется
+        """
+        outline = self._outlines.get(glyph_id)
+        if outline is None:
+            outline = self._outlines[glyph_id] = tuple(self._decompose(self._contours(glyph_id)))
+        return outline
+
+    @staticmethod
+    def _decompose(contours):
+        for points in contours:
+            if not points:
+                continue
+            first_x, first_y, first_on = points[0]
+            last_x, last_y, last_on = points[-1]
+            if first_on:
+                start = (first_x, first_y)
+                rest = points[1:]
+            elif last_on:
+                start = (last_x, last_y)
+                rest = points[:-1]
+            else:
+                start = ((first_x + last_x) / 2, (first_y + last_y) / 2)
+                rest = points
+
+            yield SEG_MOVE, start[0], start[1]
+            control = None
+            for x, y, on in rest:
+                if on:
+                    if control is None:
+                        yield SEG_LINE, x, y
+                    else:
+                        yield SEG_QUAD, control[0], control[1], x, y
+                        control = None
+                else:
+                    if control is not None:
+                        yield SEG_QUAD, control[0], control[1], (control[0] + x) / 2, (control[1] + y) / 2
+                    control = (x, y)
+            if control is not None:
+                yield SEG_QUAD, control[0], control[1], start[0], start[1]
+            # line_to в начало контура не нужен, его дает close, как в cairo
+            yield SEG_CLOSE,
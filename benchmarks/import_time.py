@@ -0,0 +1,79 @@
+""" cold start: python -X importtime для модулей и время запуска CLI
+
+python benchmarks/import_time.py
+python benchmarks/import_time.py --repeat 20 --json import_time.json
+"""
+from argparse import ArgumentParser
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).parent.parent.absolute()
+
+MODULES = (
+    'address_plate.plate_spec',
+    'address_plate.batch',
+    'address_plate.pdf_maker',
+)
+
+COMMANDS = {
+    'cli --help': [str(ROOT.joinpath('address_plate.py')), '--help'],
+    'cli bad args': [str(ROOT.joinpath('address_plate.py')), 'number'],
+}
+
+
+def import_time_us(module: str) -> dict:
+    """ cumulative us for module and its heaviest imports, из stderr -X importtime
+
+    :param module:
+    :return: {'total': us, 'top': [(us, name), ...]}
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), name.rstrip()))
+    total = next(us for us, name in reversed(rows) if name.strip() == module)
+    top = sorted((row for row in rows if row[1].strip() != module), reverse=True)[:5]
+    return {'total': total, 'top': [(us, name.strip()) for us, name in top]}
+
+
+def wall_time_ms(args: list) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--repeat', help='Runs per measurement, median is reported', type=int, default=7)
+    parser.add_argument('--json', help='Save results to file', type=str)
+    args = parser.parse_args()
+
+    results = {'python': sys.version, 'modules': {}, 'commands': {}}
+
+    for module in MODULES:
+        runs = [import_time_us(module) for _ in range(args.repeat)]
+        median = statistics.median(run['total'] for run in runs)
+        results['modules'][module] = {'median_us': median, 'top': runs[-1]['top']}
+        print(f'import {module:<28} {median / 1000:8.1f} ms')
+        for us, name in runs[-1]['top']:
+            print(f'    {name:<40} {us / 1000:8.1f} ms')
+
+    for name, command in COMMANDS.items():
+        median = statistics.median(wall_time_ms(command) for _ in range(args.repeat))
+        results['commands'][name] = {'median_ms': median}
+        print(f'{name:<35} {median:8.1f} ms wall')
+
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
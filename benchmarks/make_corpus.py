@@ -0,0 +1,171 @@
+""" корпус адрес для benchmarks/plates.py, детерминированный (seed)
+
+python benchmarks/make_corpus.py  # -> benchmarks/corpus/addresses.csv
+
+колонки как у манифеста batch плюс case - группа в отчете:
+number:<форма номера>:<стрелки>, name:<short|long|hyphen>, vertical:<short|long|hyphen>:<форма номера>
+wide пустой, benchmarks/plates.py прогоняет каждую строку в thin и wide
+"""
+from argparse import ArgumentParser
+import csv
+import pathlib
+import random
+
+CORPUS = pathlib.Path(__file__).parent.joinpath('corpus', 'addresses.csv')
+
+STREET_TYPES = {
+    'вулиця': 'vulytsia',
+    'провулок': 'provulok',
+    'проспект': 'prospekt',
+    'бульвар': 'bulvar',
+    'площа': 'ploshcha',
+    'узвіз': 'uzviz',
+    'набережна': 'naberezhna',
+    'шосе': 'shose',
+    'проїзд': 'proizd',
+    'тупик': 'tupyk',
+}
+
+SHORT_NAMES = (
+    'Лісова', 'Садова', 'Шкільна', 'Миру', 'Польова', 'Зелена', 'Центральна', 'Хорива', 'Набережна', 'Річкова',
+    'Вишнева', 'Виноградна', 'Київська', 'Одеська', 'Львівська', 'Волинська', 'Паркова', 'Гагаріна', 'Мирна',
+    'Соборна', 'Весняна', 'Сонячна', 'Степова', 'Квіткова', 'Козацька', 'Горіхова', 'Липова', 'Кленова',
+    'Дачна', 'Нова', 'Тиха', 'Озерна', 'Морська', 'Портова', 'Заводська', 'Шевченка', 'Франка', 'Лугова',
+    'Ставкова', 'Вокзальна', 'Спортивна', 'Промислова', 'Інститутська', 'Хрещатик', 'Ярославська',
+)
+
+LONG_NAMES = (
+    'Тараса Шевченка', 'Івана Франка', 'Лесі Українки', 'Михайла Грушевського', 'Богдана Хмельницького',
+    'Григорія Сковороди', 'Володимира Великого', 'Ярослава Мудрого', 'Січових Стрільців',
+    'Героїв Небесної Сотні', 'Гетьмана Павла Скоропадського', 'Академіка Заболотного', 'Василя Стуса',
+    'Олени Теліги', 'Степана Бандери', 'Володимира Винниченка', 'Пантелеймона Куліша', 'Михайла Коцюбинського',
+    'Максима Рильського', 'Олександра Довженка', 'Соломії Крушельницької', 'Симона Петлюри', 'Героїв Крут',
+    'Андрія Шептицького', 'Івана Мазепи', 'Петра Сагайдачного', 'Данила Галицького', 'Князя Романа Мстиславича',
+    'Незалежності України', 'Двадцять Четвертого Серпня', 'Академіка Володимира Вернадського',
+    'Генерала Михайла Омеляновича-Павленка', 'Митрополита Андрея Шептицького', 'Тридцятої Гвардійської Дивізії',
+    'Українських Повстанців', 'Захисників України', 'Героїв Оборони Маріуполя',
+    'Велика Васильківська', 'Кирила Осьмака', 'Марії Заньковецької', 'Анатолія Солов\'яненка',
+    'Катерини Білокур', 'Івана Огієнка',
+)
+
+HYPHEN_NAMES = (
+    'Омеляновича-Павленка', 'Квітки-Основ\'яненка', 'Нечуя-Левицького', 'Карпенка-Карого',
+    'Гулака-Артемовського', 'Шолом-Алейхема', 'Кирило-Мефодіївська', 'Кос-Анатольського',
+    'Бойчука-Семенка', 'Лепкого-Франка', 'Гетьмана Дорошенка-Сірка', 'Професора Підвисоцького-Горбаня',
+    'Академіка Шульгина-Косача', 'Генерала Алмазова-Удовиченка',
+)
+
+HOUSE_FORMS = ('lvl1', 'range', 'lvl2c', 'slash', 'slash_lvl3', 'corp')
+ARROWS = ('none', 'left', 'right', 'both')
+
+LETTERS = 'АБВГДЕЖ'
+
+# КМУ 2010, в начале слова - отдельные варианты
+_TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'h', 'ґ': 'g', 'д': 'd', 'е': 'e', 'є': 'ie', 'ж': 'zh', 'з': 'z',
+    'и': 'y', 'і': 'i', 'ї': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+    'щ': 'shch', 'ь': '', 'ю': 'iu', 'я': 'ia', '\'': '',
+}
+_TRANSLIT_FIRST = {'є': 'ye', 'ї': 'yi', 'й': 'y', 'ю': 'yu', 'я': 'ya'}
+
+
+def translit(text: str) -> str:
+    result = []
+    first = True
+    previous = ''
+    for char in text:
+        lower = char.lower()
+        if lower in _TRANSLIT:
+            latin = _TRANSLIT_FIRST.get(lower, _TRANSLIT[lower]) if first else _TRANSLIT[lower]
+            if lower == 'г' and previous == 'з':
+                latin = 'gh'
+            if char != lower:
+                latin = latin.capitalize()
+            result.append(latin)
+            first = False
+        else:
+            result.append(char)
+            first = not char.isalpha()
+        previous = lower
+    return ''.join(result)
+
+
+def house_number(rnd: random.Random, form: str) -> str:
+    number = rnd.choice((rnd.randint(1, 9), rnd.randint(10, 99), rnd.randint(100, 250)))
+    if form == 'lvl1':
+        return str(number)
+    if form == 'range':
+        return f'{number}-{number + 2}'
+    if form == 'lvl2c':
+        return f'{number}{rnd.choice(LETTERS)}'
+    if form == 'slash':
+        return f'{number}/{rnd.randint(1, 40)}'
+    if form == 'slash_lvl3':
+        return f'{number}/{rnd.randint(1, 40)}{rnd.choice(LETTERS)}'
+    if form == 'corp':
+        return f'{number} к{rnd.randint(1, 9)}'
+    raise ValueError(form)
+
+
+def arrow_number(rnd: random.Random) -> str:
+    number = rnd.randint(1, 250)
+    return rnd.choice((str(number), f'{number}{rnd.choice(LETTERS)}', f'{number}-{number + 2}'))
+
+
+def street(rnd: random.Random, name_case: str):
+    names = {'short': SHORT_NAMES, 'long': LONG_NAMES, 'hyphen': HYPHEN_NAMES}[name_case]
+    name = rnd.choice(names)
+    street_type = rnd.choice(tuple(STREET_TYPES))
+    return street_type, name, f'{translit(name)} {STREET_TYPES[street_type]}'
+
+
+def rows(seed: int = 2020, per_case: int = 50):
+    """
+
+    :param seed:
+    :param per_case: rows per number form x arrows, per name case, per vertical case
+    :return: generator of dict
+    """
+    rnd = random.Random(seed)
+    for form in HOUSE_FORMS:
+        for arrows in ARROWS:
+            for _ in range(per_case):
+                yield {'case': f'number:{form}:{arrows}', 'kind': 'number', 'number': house_number(rnd, form),
+                       'left': arrow_number(rnd) if arrows in ('left', 'both') else '',
+                       'right': arrow_number(rnd) if arrows in ('right', 'both') else ''}
+    for name_case in ('short', 'long', 'hyphen'):
+        for _ in range(per_case * 6):
+            street_type, name, street_translit = street(rnd, name_case)
+            yield {'case': f'name:{name_case}', 'kind': 'name', 'type': street_type, 'name': name,
+                   'translit': street_translit}
+    for name_case in ('short', 'long', 'hyphen'):
+        for form in HOUSE_FORMS:
+            for _ in range(per_case):
+                street_type, name, street_translit = street(rnd, name_case)
+                yield {'case': f'vertical:{name_case}:{form}', 'kind': 'vertical', 'type': street_type,
+                       'name': name, 'translit': street_translit, 'number': house_number(rnd, form)}
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--output', help='CSV file', type=str, default=str(CORPUS))
+    parser.add_argument('--seed', type=int, default=2020)
+    parser.add_argument('--per-case', help='Rows per case', type=int, default=50)
+    args = parser.parse_args()
+
+    output = pathlib.Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    fields = ('case', 'kind', 'wide', 'type', 'name', 'translit', 'number', 'left', 'right')
+    count = 0
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fields, restval='')
+        writer.writeheader()
+        for row in rows(args.seed, args.per_case):
+            writer.writerow(row)
+            count += 1
+    print(f'{count} rows -> {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+""" cairo против чтения .ttf на чистом python и атласа глифов: контуры глифов и табличка целиком
+
+python benchmarks/outline_backends.py
+python benchmarks/outline_backends.py --backends truetype --repeat 50
+python address_plate.py atlas && python benchmarks/outline_backends.py --backends truetype,atlas
+"""
+from argparse import ArgumentParser
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.absolute()))
+
+from address_plate import pdf_maker  # noqa: E402
+from address_plate.glyph_cache import GLYPH_CACHE, METRICS_CACHE  # noqa: E402
+
+CHARS = ('абвгґдеєжзиіїйклмнопрстуфхцчшщьюя'
+         'АБВГҐДЕЄЖЗИІЇЙКЛМНОПРСТУФХЦЧШЩЬЮЯ'
+         'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-/ ')
+
+
+def cold_glyphs(backend) -> float:
+    """ все CHARS во всех FONT_FACE, без кеша
+
+    :return: seconds
+    """
+    started = time.perf_counter()
+    for face in pdf_maker.FONT_FILES:
+        for char in CHARS:
+            backend.glyph(face, 100.0, char)
+    return time.perf_counter() - started
+
+
+def plates(repeat: int) -> float:
+    """ табличка каждого вида, кеши глифов очищаются перед замером
+
+    :return: seconds per plate
+    """
+    GLYPH_CACHE.cache_clear()
+    METRICS_CACHE.cache_clear()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        pdf_maker.street_name_pdf('вулиця', 'Омеляновича-Павленка', 'Omelyanovycha-Pavlenka vulytsia')
+        pdf_maker.house_number_pdf('25/3А', '23А', '27')
+        pdf_maker.vertical_pdf('вулиця', 'Омеляновича-Павленка', 'Omelyanovycha-Pavlenka vulytsia', '25', 'wide')
+    return (time.perf_counter() - started) / (repeat * 3)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--backends', help='Comma separated', type=str, default='cairo,truetype')
+    parser.add_argument('--repeat', help='Plates of each kind', type=int, default=20)
+    args = parser.parse_args()
+
+    for name in args.backends.split(','):
+        pdf_maker.set_outline_backend(name)
+        backend = pdf_maker.get_outline_backend()
+        glyphs = cold_glyphs(backend)
+        per_plate = plates(args.repeat)
+        print(f'{name:<10} {len(CHARS) * len(pdf_maker.FONT_FILES)} cold glyphs {glyphs * 1000:8.1f} ms   '
+              f'plate {per_plate * 1000:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+""" скорость *_pdf функций на корпусе адрес (benchmarks/corpus/addresses.csv)
+
+python benchmarks/plates.py
+python benchmarks/plates.py --wide thin --limit 20 --json before.json
+python benchmarks/plates.py --json after.json --compare before.json
+
+группы по case из корпуса (форма номера, стрелки, длина названия) и по thin/wide:
+задержка на табличку p50/p90/p99/max, plates/s, средний размер pdf, пик памяти (tracemalloc)
+"""
+from argparse import ArgumentParser
+from collections import defaultdict
+import csv
+import datetime
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(ROOT))
+
+from address_plate import pdf_maker  # noqa: E402
+from address_plate.glyph_cache import GLYPH_CACHE, METRICS_CACHE  # noqa: E402
+
+CORPUS = ROOT.joinpath('benchmarks', 'corpus', 'addresses.csv')
+
+
+def load_corpus(path, limit: int = None) -> dict:
+    """
+
+    :param path: CSV from make_corpus.py
+    :param limit: rows per case
+    :return: {case: [row, ...]}
+    """
+    cases = defaultdict(list)
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            rows = cases[row['case']]
+            if limit is None or len(rows) < limit:
+                rows.append({key: value or None for key, value in row.items()})
+    return cases
+
+
+def render(row: dict, wide: str, profile=None):
+    """ одна табличка как из CLI, без дискового кеша
+
+    :return: pdf bytes
+    """
+    kind = row['kind']
+    if kind == 'number':
+        pdf, _ = pdf_maker.house_number_pdf(row['number'], row['left'], row['right'], wide,
+                                            profile=profile, cache=False)
+    elif kind == 'name':
+        pdf, _ = pdf_maker.street_name_pdf(row['type'], row['name'], row['translit'], wide,
+                                           profile=profile, cache=False)
+    else:
+        pdf, _ = pdf_maker.vertical_pdf(row['type'], row['name'], row['translit'], row['number'], wide,
+                                        profile=profile, cache=False)
+    return pdf.getvalue()
+
+
+def percentile(values: list, q: float) -> float:
+    """ nearest rank, values sorted
+
+    """
+    return values[min(len(values) - 1, max(0, round(q * len(values)) - 1))]
+
+
+def run_case(rows: list, wide: str, repeat: int, profile=None, memory_rows: int = 20) -> dict:
+    latencies = []
+    sizes = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for row in rows:
+            t = time.perf_counter()
+            data = render(row, wide, profile)
+            latencies.append(time.perf_counter() - t)
+            sizes.append(len(data))
+    elapsed = time.perf_counter() - started
+
+    # отдельным проходом: tracemalloc замедляет рендер в разы
+    tracemalloc.start()
+    peak = 0
+    for row in rows[:memory_rows]:
+        tracemalloc.reset_peak()
+        render(row, wide, profile)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    latencies.sort()
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        'plates': len(latencies),
+        'p50_ms': round(percentile(ms, 0.50), 3),
+        'p90_ms': round(percentile(ms, 0.90), 3),
+        'p99_ms': round(percentile(ms, 0.99), 3),
+        'max_ms': round(ms[-1], 3),
+        'mean_ms': round(statistics.fmean(ms), 3),
+        'plates_per_second': round(len(latencies) / elapsed, 1),
+        'bytes_mean': round(statistics.fmean(sizes)),
+        'bytes_total': sum(sizes),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def compare(results: dict, baseline: dict):
+    print(f'\n{"vs " + baseline["date"]:<34} {"p50":>9} {"p99":>9} {"plates/s":>10} {"bytes":>9}')
+    for name, case in results['cases'].items():
+        old = baseline['cases'].get(name)
+        if old is None:
+            continue
+
+        def delta(key):
+            if not old[key]:
+                return '       -'
+            return f'{(case[key] - old[key]) / old[key] * 100:+8.1f}%'
+
+        print(f'{name:<34} {delta("p50_ms")} {delta("p99_ms")} {delta("plates_per_second"):>10} '
+              f'{delta("bytes_mean"):>9}')
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--corpus', help='CSV from benchmarks/make_corpus.py', type=str, default=str(CORPUS))
+    parser.add_argument('--wide', help='Comma separated variants', type=str, default='thin,wide')
+    parser.add_argument('--cases', help='Only cases starting with this prefix, e.g. number: or vertical:long',
+                        type=str)
+    parser.add_argument('--limit', help='Rows per case', type=int)
+    parser.add_argument('--repeat', help='Passes over the rows of a case', type=int, default=1)
+    parser.add_argument('--profile', help='Output profile', choices=tuple(pdf_maker.OUTPUT_PROFILES))
+    parser.add_argument('--outline-backend', help='Glyph outlines', choices=tuple(pdf_maker.OUTLINE_BACKENDS))
+    parser.add_argument('--cold', help='Do not warm glyph caches before measuring', action='store_true')
+    parser.add_argument('--json', help='Save results to file', type=str)
+    parser.add_argument('--compare', help='Earlier --json results, print the difference', type=str)
+    args = parser.parse_args()
+
+    if args.outline_backend:
+        pdf_maker.set_outline_backend(args.outline_backend)
+    cases = load_corpus(args.corpus, args.limit)
+    if args.cases:
+        cases = {name: rows for name, rows in cases.items() if name.startswith(args.cases)}
+    variants = args.wide.split(',')
+
+    GLYPH_CACHE.cache_clear()
+    METRICS_CACHE.cache_clear()
+    pdf_maker.COMPONENT_CACHE.cache_clear()
+    if not args.cold:
+        started = time.perf_counter()
+        for rows in cases.values():
+            for wide in variants:
+                for row in rows:
+                    render(row, wide, args.profile)
+        print(f'warm up {time.perf_counter() - started:.1f} s, {len(GLYPH_CACHE)} glyphs')
+
+    results = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'outline_backend': pdf_maker.get_outline_backend().name,
+        'profile': args.profile or 'default',
+        'corpus': str(args.corpus),
+        'cases': {},
+    }
+
+    print(f'{"case":<34} {"n":>5} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"max ms":>8} {"plates/s":>9} '
+          f'{"bytes":>7} {"peak KB":>8}')
+    total_plates = total_seconds = 0
+    for name in sorted(cases):
+        for wide in variants:
+            case = run_case(cases[name], wide, args.repeat, args.profile)
+            results['cases'][f'{name}:{wide}'] = case
+            total_plates += case['plates']
+            total_seconds += case['plates'] / case['plates_per_second']
+            print(f'{name + ":" + wide:<34} {case["plates"]:>5} {case["p50_ms"]:>8.2f} {case["p90_ms"]:>8.2f} '
+                  f'{case["p99_ms"]:>8.2f} {case["max_ms"]:>8.2f} {case["plates_per_second"]:>9.1f} '
+                  f'{case["bytes_mean"]:>7} {case["peak_kb"]:>8.1f}')
+
+    results['total'] = {
+        'plates': total_plates,
+        'seconds': round(total_seconds, 2),
+        'plates_per_second': round(total_plates / total_seconds, 1) if total_seconds else 0,
+        'max_rss_kb': max_rss_kb(),
+        'glyph_cache': GLYPH_CACHE.cache_info()._asdict(),
+        'component_cache': pdf_maker.COMPONENT_CACHE.cache_info()._asdict(),
+    }
+    print(f'total {total_plates} plates in {results["total"]["seconds"]} s, '
+          f'{results["total"]["plates_per_second"]} plates/s, max RSS {results["total"]["max_rss_kb"]} KB')
+
+    if args.compare:
+        compare(results, json.loads(pathlib.Path(args.compare).read_text()))
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.absolute()))
+
+import pytest  # noqa: E402
+
+# шрифты reportlab, если probanav2 не положены в address_plate/fonts
+_REPORTLAB_FONTS = {'regular': 'Vera.ttf', 'semi-bold': 'VeraBd.ttf', 'bold': 'VeraBd.ttf'}
+
+
+@pytest.fixture
+def plate_fonts(monkeypatch):
+    """ FONT_FILES, которые есть на диске, и контуры через truetype (cairo не нужен)
+
+    """
+    from address_plate import pdf_maker
+
+    if not all(pathlib.Path(filename).exists() for filename in pdf_maker.FONT_FILES.values()):
+        import reportlab
+
+        fonts = pathlib.Path(reportlab.__file__).parent.joinpath('fonts')
+        for face, filename in _REPORTLAB_FONTS.items():
+            monkeypatch.setitem(pdf_maker.FONT_FILES, face, str(fonts.joinpath(filename)))
+    backend = pdf_maker.get_outline_backend().name
+    pdf_maker.set_outline_backend('truetype')
+    yield pdf_maker.FONT_FILES
+    pdf_maker.set_outline_backend(backend)
@@ -0,0 +1,101 @@
+import shutil
+
+import pytest
+
+from address_plate import pdf_maker
+from address_plate.atlas import ATLAS_VERSION, AtlasError, GlyphAtlas, build_atlas, is_current
+from address_plate.glyph_cache import PATH_CLOSE_PATH
+from address_plate.incremental import plan_build
+from address_plate.outline_backend import AtlasBackend
+from address_plate.plate_spec import PlateSpec
+
+CHARS = 'вулиця Хорива Khoryva 0123456789/АБ'
+
+
+@pytest.fixture
+def font_copies(tmp_path, plate_fonts, monkeypatch):
+    """ FONT_FILES - копии шрифтов во временном каталоге, их можно удалить
+
+    """
+    fonts = tmp_path.joinpath('fonts')
+    fonts.mkdir()
+    for face, filename in list(plate_fonts.items()):
+        copy = fonts.joinpath(f'{face}.ttf')
+        shutil.copyfile(filename, copy)
+        monkeypatch.setitem(plate_fonts, face, str(copy))
+    return fonts
+
+
+def test_atlas_matches_truetype(tmp_path, font_copies):
+    path = build_atlas(pdf_maker.FONT_FACE, tmp_path.joinpath('atlas.bin'))
+    atlas = GlyphAtlas(path)
+    assert sorted(atlas) == sorted(pdf_maker.FONT_FILES)
+    assert is_current(pdf_maker.FONT_FACE, path)
+
+    truetype = pdf_maker.OUTLINE_BACKENDS['truetype']
+    backend = AtlasBackend(pdf_maker.FONT_FACE, path)
+    for face in pdf_maker.FONT_FILES:
+        for char in CHARS:
+            expected, glyph = truetype.glyph(face, 100.0, char), backend.glyph(face, 100.0, char)
+            assert (glyph.advance, glyph.extents) == (expected.advance, expected.extents)
+            assert bytes(glyph.path.ops) == bytes(expected.path.ops)
+            assert list(glyph.path.coords) == pytest.approx(list(expected.path.coords), abs=1e-9)
+            assert backend.metrics(face, 100.0, char) == truetype.metrics(face, 100.0, char)
+
+    # контур атласа - memoryview в отображенный файл, без копии
+    face = atlas['regular']
+    outline = face.outline(face.glyph_id('Х'))
+    assert isinstance(outline.coords, memoryview) and outline.ops[-1] == PATH_CLOSE_PATH
+    assert face.glyph_id('￿') == 0
+    font = truetype.font('regular')
+    for (left, right), value in list(font.kerning().items())[:50]:
+        assert face.kerning(left, right) == value
+
+
+def test_stale_and_broken_atlas(tmp_path, font_copies):
+    path = tmp_path.joinpath('atlas.bin')
+    with pytest.raises(AtlasError, match='build it with'):
+        GlyphAtlas(path)
+    build_atlas(pdf_maker.FONT_FACE, path)
+
+    # шрифт изменился после сборки
+    regular = font_copies.joinpath('regular.ttf')
+    regular.write_bytes(font_copies.joinpath('bold.ttf').read_bytes())
+    assert not is_current(pdf_maker.FONT_FACE, path)
+    with pytest.raises(AtlasError, match='built from other fonts'):
+        AtlasBackend(pdf_maker.FONT_FACE, path).load_fonts()
+
+    data = bytearray(path.read_bytes())
+    data[8] = ATLAS_VERSION + 1
+    path.write_bytes(bytes(data))
+    with pytest.raises(AtlasError, match='rebuild'):
+        GlyphAtlas(path)
+    path.write_bytes(b'not an atlas')
+    with pytest.raises(AtlasError, match='not a glyph atlas'):
+        GlyphAtlas(path)
+
+
+def test_render_without_fonts(tmp_path, font_copies, monkeypatch):
+    """ атлас собран, .ttf удалены: рендер, дисковый кеш и план сборки работают
+
+    """
+    path = build_atlas(pdf_maker.FONT_FACE, tmp_path.joinpath('atlas.bin'))
+    spec = PlateSpec('vertical', 'thin', 'вулиця', 'Хорива', 'Khoryva vulytsia', '25/3А', None, None, None)
+    uncached, _ = pdf_maker.vertical_pdf(spec.type, spec.name, spec.translit, spec.number, cache=False,
+                                         profile='archive')
+    shutil.rmtree(font_copies)
+
+    monkeypatch.setitem(pdf_maker.OUTLINE_BACKENDS, 'atlas', AtlasBackend(pdf_maker.FONT_FACE, path))
+    pdf_maker.set_outline_backend('atlas')
+    cache = tmp_path.joinpath('cache')
+    first, _ = pdf_maker.vertical_pdf(spec.type, spec.name, spec.translit, spec.number, cache=cache,
+                                      profile='archive')
+    second, _ = pdf_maker.vertical_pdf(spec.type, spec.name, spec.translit, spec.number, cache=cache,
+                                       profile='archive')
+    data = first.read()
+    assert data.startswith(b'%PDF-') and second.read() == data
+    assert len([entry for entry in cache.rglob('*') if entry.is_file()]) == 1
+    assert len(data) == pytest.approx(len(uncached.read()), rel=0.01)
+
+    plan = plan_build([(2, spec)], tmp_path.joinpath('out'), profile='archive')
+    assert [plate.reason for plate in plan.plates] == ['new']
@@ -0,0 +1,56 @@
+import io
+
+from address_plate import batch
+from address_plate.batch import render_document_batch, run_batch
+from address_plate.plate_spec import read_manifest
+
+MANIFEST = 'kind,number\nnumber,12\nnumber,\nnumber,14\nnumber,16\n'
+
+
+class Plate:
+    """ табличка, которая отмечает, когда ее нарисовали
+
+    """
+
+    def __init__(self, plate, events):
+        self.plate = plate
+        self.events = events
+
+    def __getattr__(self, name):
+        return getattr(self.plate, name)
+
+    def draw(self, work_canvas):
+        self.events.append(('draw', self.plate.file_name))
+        self.plate.draw(work_canvas)
+
+
+def test_document_is_streamed(tmp_path, plate_fonts, monkeypatch):
+    manifest = tmp_path.joinpath('city.csv')
+    manifest.write_text(MANIFEST, encoding='utf-8')
+    document = tmp_path.joinpath('city.pdf')
+    events = []
+    make_plate = batch.make_plate
+
+    def recording(spec):
+        plate = make_plate(spec)
+        events.append(('make', plate.file_name))
+        return Plate(plate, events)
+
+    monkeypatch.setattr(batch, 'make_plate', recording)
+    results = list(render_document_batch(read_manifest(manifest), document))
+    # следующая табличка создается только после того, как нарисована предыдущая
+    assert events == [(event, f'{number}.pdf') for number in (12, 14, 16) for event in ('make', 'draw')]
+    assert [(result.row, result.error is None) for result in results] == [(2, True), (3, False), (4, True),
+                                                                           (5, True)]
+    assert [result.size for result in results] == [0, 0, 0, document.stat().st_size]
+    assert document.read_bytes().count(b'/Type /Page\n') == 3
+
+
+def test_run_batch_document(tmp_path, plate_fonts):
+    manifest = tmp_path.joinpath('city.csv')
+    manifest.write_text(MANIFEST, encoding='utf-8')
+    document = tmp_path.joinpath('city.pdf')
+    log = io.StringIO()
+    summary = run_batch(manifest, document=document, log=log)
+    assert (summary.rendered, summary.failed, summary.bytes) == (3, 1, document.stat().st_size)
+    assert log.getvalue().startswith(f'{manifest}:3: ')
@@ -0,0 +1,128 @@
+import pytest
+
+from address_plate.house_number import (ArrowNumber, HouseNumber, HouseNumberError, parse_arrow_number,
+                                        parse_house_number, validate_house_numbers)
+from address_plate.plate_spec import SpecError, read_manifest, spec_from_dict, validate_manifest
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('12', HouseNumber('12', None, None, None, None)),
+    ('12-14', HouseNumber('12-14', None, None, None, None)),
+    ('12А', HouseNumber('12', None, 'А', None, None)),
+    ('12 к2', HouseNumber('12', None, ' к2', None, None)),
+    ('12/3', HouseNumber('12', '/', None, '3', None)),
+    ('25/3А', HouseNumber('25', '/', None, '3', 'А')),
+])
+def test_parse_house_number(value, expected):
+    number = parse_house_number(value)
+    assert number == expected
+    assert str(number) == value
+
+
+@pytest.mark.parametrize('value, position, expected', [
+    ('', 0, 'digit 1-9'),
+    ('012', 0, 'digit 1-9'),
+    ('12$', 2, "digit, '-', letter А-Я, '/', ' к' or end"),
+    ('12-', 3, 'digit 1-9'),
+    ('12/', 3, 'digit 1-9'),
+    ('12/3$', 4, 'letter А-Я or end'),
+    ('12А1', 3, 'end'),
+    ('12 2', 3, "'к'"),
+    ('12 к', 4, 'digit 1-9'),
+    ('12 к2А', 5, 'end'),
+])
+def test_bad_house_number(value, position, expected):
+    with pytest.raises(HouseNumberError) as info:
+        parse_house_number(value)
+    error = info.value
+    assert (error.value, error.position, error.expected) == (value, position, expected)
+    assert error.as_dict()['position'] == position
+
+
+def test_bad_house_number_type():
+    with pytest.raises(HouseNumberError) as info:
+        parse_house_number(12)
+    assert info.value.expected == 'a string'
+
+
+def test_arrow_number():
+    assert parse_arrow_number('14') == ArrowNumber('14', None)
+    assert parse_arrow_number('12А') == ArrowNumber('12', 'А')
+    with pytest.raises(HouseNumberError) as info:
+        parse_arrow_number('3/1')
+    assert (info.value.position, info.value.expected) == (1, 'letter А-Я or end')
+
+
+def test_validate_house_numbers():
+    errors = validate_house_numbers(['12', '12$', '25/3А', None, '7'])
+    assert [index for index, _ in errors] == [1, 3]
+    assert errors[0][1].position == 2
+    assert [index for index, _ in validate_house_numbers(['14', '3/1'], arrow=True)] == [1]
+
+
+def test_spec_error_field():
+    with pytest.raises(SpecError) as info:
+        spec_from_dict({'kind': 'number', 'number': '12', 'left': '3/1'})
+    assert info.value.field == 'left'
+    assert isinstance(info.value.__cause__, HouseNumberError)
+
+    with pytest.raises(SpecError) as info:
+        spec_from_dict({'kind': 'vertical', 'number': '12'})
+    assert info.value.field is None
+
+
+def test_manifest_errors(tmp_path):
+    csv_path = tmp_path.joinpath('city.csv')
+    csv_path.write_text('kind,type,name,translit,number\n'
+                        'number,,,,12\n'
+                        'number,,,,12$\n'
+                        'street,,,,\n', encoding='utf-8')
+    jsonl_path = tmp_path.joinpath('city.jsonl')
+    jsonl_path.write_text('{"kind": "number", "number": "12"}\n'
+                          '{"kind": "number", "number": "12$"}\n'
+                          '{"kind": "street"}\n'
+                          '{bad\n'
+                          '\n'
+                          '[1]\n', encoding='utf-8')
+
+    csv_errors = validate_manifest(csv_path)
+    assert [row for row, _ in csv_errors] == [3, 4]
+    jsonl_errors = validate_manifest(jsonl_path)
+    assert [row for row, _ in jsonl_errors] == [2, 3, 4, 6]
+
+    for errors in (csv_errors, jsonl_errors):
+        number_error = errors[0][1]
+        assert number_error.field == 'number'
+        assert isinstance(number_error.__cause__, HouseNumberError)
+        assert number_error.__cause__.position == 2
+    assert str(jsonl_errors[2][1]).startswith('bad JSON: ')
+    assert str(jsonl_errors[3][1]) == 'row is not an object'
+
+    specs = [spec for _, spec in read_manifest(jsonl_path) if not isinstance(spec, Exception)]
+    assert [(spec.kind, spec.number) for spec in specs] == [('number', '12')]
+
+
+def test_errors_pickle():
+    import pickle
+
+    with pytest.raises(HouseNumberError) as info:
+        parse_house_number('12$')
+    error = pickle.loads(pickle.dumps(info.value))
+    assert (type(error), str(error), error.as_dict()) == (HouseNumberError, str(info.value), info.value.as_dict())
+
+    with pytest.raises(SpecError) as info:
+        spec_from_dict({'kind': 'number', 'number': '12$'})
+    error = pickle.loads(pickle.dumps(info.value))
+    assert (type(error), str(error), error.field) == (SpecError, str(info.value), 'number')
+    assert isinstance(error.__cause__, HouseNumberError) and error.__cause__.position == 2
+    assert pickle.loads(pickle.dumps(SpecError('bad kind'))).field is None
+
+
+def test_render_result_error_pickles():
+    import pickle
+
+    from address_plate.plate_spec import PlateSpec, render_result
+
+    result = render_result(PlateSpec('number', 'thin', None, None, None, '12Z', None, None, None), 0)
+    copy = pickle.loads(pickle.dumps(result))
+    assert isinstance(copy.error, HouseNumberError) and copy.error.position == result.error.position
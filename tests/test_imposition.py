@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from address_plate.imposition import Sheet, pack, parse_sheet
+from address_plate.layout import pt
+
+EPS = 1e-6
+
+
+def check_placements(sizes, placements, sheet):
+    """ каждая табличка в рабочей области листа, со своим размером, без наложений с учетом gap
+
+    """
+    margin, gap = pt(sheet.margin), pt(sheet.gap)
+    right, bottom = pt(sheet.width) - margin, pt(sheet.height) - margin
+    by_sheet = {}
+    for index, placement in enumerate(placements):
+        if placement is None:
+            continue
+        assert placement.index == index
+        width, height = sizes[index]
+        if placement.rotated:
+            width, height = height, width
+        assert (placement.width, placement.height) == pytest.approx((width, height))
+        assert placement.x >= margin - EPS and placement.y >= margin - EPS
+        assert placement.x + placement.width <= right + EPS
+        assert placement.y + placement.height <= bottom + EPS
+        by_sheet.setdefault(placement.sheet, []).append(placement)
+
+    for sheet_placements in by_sheet.values():
+        for i, a in enumerate(sheet_placements):
+            for b in sheet_placements[i + 1:]:
+                apart = (a.x + a.width + gap <= b.x + EPS or b.x + b.width + gap <= a.x + EPS
+                         or a.y + a.height + gap <= b.y + EPS or b.y + b.height + gap <= a.y + EPS)
+                assert apart, (a, b)
+    return by_sheet
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_pack_random(seed):
+    rng = random.Random(seed)
+    kinds = [(pt(rng.choice((280, 450, 600, 900))), pt(rng.choice((180, 215, 300)))) for _ in range(6)]
+    sizes = [rng.choice(kinds) for _ in range(400)]
+    sheet = Sheet(2500, 1250, margin=10, gap=4)
+    placements, count = pack(sizes, sheet)
+    assert all(placement is not None for placement in placements)
+    by_sheet = check_placements(sizes, placements, sheet)
+    assert sorted(by_sheet) == list(range(count))
+
+    used = sum(width * height for width, height in sizes)
+    assert used / (count * pt(2500) * pt(1250)) > 0.6
+
+
+def test_pack_too_large():
+    sheet = Sheet(1000, 500, margin=10, gap=4)
+    sizes = [(pt(300), pt(200)), (pt(1200), pt(100)), (pt(100), pt(600))]
+    placements, count = pack(sizes, sheet)
+    assert placements[1] is None and placements[2] is None
+    assert count == 1
+    check_placements(sizes, placements, sheet)
+
+
+def test_pack_rotate():
+    sheet = Sheet(1000, 500, margin=10, gap=4)
+    sizes = [(pt(300), pt(700)), (pt(300), pt(200))]
+    placements, _ = pack(sizes, sheet)
+    assert placements[0] is None
+    placements, _ = pack(sizes, sheet, rotate=True)
+    assert placements[0].rotated and not placements[1].rotated
+    check_placements(sizes, placements, sheet)
+
+
+def test_pack_exact_fit():
+    # четыре таблички ровно по рабочей области: зазор только между ними
+    sheet = Sheet(2 * 100 + 4 + 2 * 10, 2 * 50 + 4 + 2 * 10, margin=10, gap=4)
+    sizes = [(pt(100), pt(50))] * 4
+    placements, count = pack(sizes, sheet)
+    assert count == 1
+    check_placements(sizes, placements, sheet)
+    placements, count = pack(sizes * 2, sheet)
+    assert count == 2
+
+
+def test_parse_sheet():
+    assert parse_sheet('2500x1250') == Sheet(2500.0, 1250.0)
+    assert parse_sheet('1000х500', margin=5, gap=2) == Sheet(1000.0, 500.0, 5, 2)
+    with pytest.raises(ValueError):
+        parse_sheet('2500')
+
+
+@pytest.mark.parametrize('glyph_forms, expected', [(None, True), (True, True), (False, False)])
+def test_sheets_glyph_forms(tmp_path, plate_fonts, glyph_forms, expected):
+    import io
+
+    from address_plate.batch import run_batch
+
+    manifest = tmp_path.joinpath('city.csv')
+    manifest.write_text('kind,number\nnumber,12\nnumber,14\n', encoding='utf-8')
+    sheets = tmp_path.joinpath('sheets.pdf')
+    summary = run_batch(manifest, sheets=sheets, glyph_forms=glyph_forms, profile='plain', log=io.StringIO())
+    assert summary.failed == 0
+    assert (b'/FormXob.glyph_' in sheets.read_bytes()) is expected
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+
+from address_plate.incremental import (BUILD_MANIFEST, CHANGED, MISSING, NEW, build_incremental, load_build_manifest,
+                                       plan_build)
+from address_plate.plate_spec import RenderResult, read_manifest
+
+HEADER = 'kind,type,name,translit,number,left,right,file\n'
+ROWS = [
+    'number,,,,12,10,14,',
+    'number,,,,14,12,16,',
+    'name,вулиця,Хорива,Khoryva vulytsia,,,,',
+    'vertical,вулиця,Хорива,Khoryva vulytsia,1,,,',
+    'vertical,вулиця,Хорива,Khoryva vulytsia,3,,,',
+    'vertical,вулиця,Хорива,Khoryva vulytsia,5,,,',
+]
+
+
+@pytest.fixture
+def registry(tmp_path, plate_fonts):
+    path = tmp_path.joinpath('city.csv')
+
+    def write(rows):
+        path.write_text(HEADER + ''.join(row + '\n' for row in rows), encoding='utf-8')
+        return path
+
+    return write
+
+
+def build(registry_path, output, prune=False, **kwargs):
+    plan = plan_build(read_manifest(registry_path), output, profile='archive', **kwargs)
+    results = list(build_incremental(plan, output, profile='archive', prune=prune))
+    assert [result.error for result in results if result.error is not None] == []
+    return plan
+
+
+def files(output) -> dict:
+    return {path.name: path.read_bytes() for path in output.iterdir() if path.name != BUILD_MANIFEST}
+
+
+def test_incremental_rebuild(tmp_path, registry):
+    output = tmp_path.joinpath('out')
+
+    plan = build(registry(ROWS), output)
+    assert [plate.reason for plate in plan.plates] == [NEW] * len(ROWS)
+    first = files(output)
+    assert sorted(first) == sorted(['12.pdf', '14.pdf', 'вулиця_Хорива.pdf', 'вулиця_Хорива_2.pdf',
+                                    'вулиця_Хорива_3.pdf', 'вулиця_Хорива_4.pdf'])
+
+    plan = build(registry(ROWS), output)
+    assert (len(plan.render), len(plan.moved), len(plan.unchanged), plan.removed) == (0, 0, len(ROWS), [])
+    assert files(output) == first
+
+    # правка: другой номер соседа; переименование: file у номера 14; удаление: вертикальная 1
+    rows = list(ROWS)
+    rows[0] = 'number,,,,12,10,14А,'
+    rows[1] = 'number,,,,14,12,16,fourteen.pdf'
+    del rows[3]
+    plan = build(registry(rows), output, prune=True)
+    by_file = {plate.file: plate for plate in plan.plates}
+    assert by_file['12.pdf'].reason == CHANGED
+    assert (by_file['fourteen.pdf'].reason, by_file['fourteen.pdf'].source) == ('moved', '14.pdf')
+    # вертикальные 3 и 5 сдвинулись на имена _2, _3
+    assert (by_file['вулиця_Хорива_2.pdf'].reason, by_file['вулиця_Хорива_2.pdf'].source) == \
+        ('moved', 'вулиця_Хорива_3.pdf')
+    assert (by_file['вулиця_Хорива_3.pdf'].reason, by_file['вулиця_Хорива_3.pdf'].source) == \
+        ('moved', 'вулиця_Хорива_4.pdf')
+    assert by_file['вулиця_Хорива.pdf'].reason is None
+    assert plan.removed == ['14.pdf', 'вулиця_Хорива_4.pdf']
+
+    second = files(output)
+    assert sorted(second) == sorted(['12.pdf', 'fourteen.pdf', 'вулиця_Хорива.pdf', 'вулиця_Хорива_2.pdf',
+                                     'вулиця_Хорива_3.pdf'])
+    assert second['12.pdf'] != first['12.pdf']
+    assert second['fourteen.pdf'] == first['14.pdf']
+    assert second['вулиця_Хорива_2.pdf'] == first['вулиця_Хорива_3.pdf']
+
+    # то же, что полная сборка с нуля
+    fresh = tmp_path.joinpath('fresh')
+    build(registry(rows), fresh)
+    assert files(fresh) == second
+    assert set(load_build_manifest(output)['files']) == set(second)
+
+
+def test_removed_without_prune_and_missing(tmp_path, registry):
+    output = tmp_path.joinpath('out')
+    build(registry(ROWS), output)
+
+    build(registry(ROWS[:2]), output)
+    manifest = json.loads(output.joinpath(BUILD_MANIFEST).read_text(encoding='utf-8'))
+    removed = {file for file, entry in manifest['files'].items() if entry.get('removed')}
+    assert removed == {'вулиця_Хорива.pdf', 'вулиця_Хорива_2.pdf', 'вулиця_Хорива_3.pdf', 'вулиця_Хорива_4.pdf'}
+    assert output.joinpath('вулиця_Хорива.pdf').exists()
+
+    # файл удален или изменен снаружи
+    output.joinpath('12.pdf').unlink()
+    data = output.joinpath('14.pdf').read_bytes()
+    output.joinpath('14.pdf').write_bytes(data[:-1] + b'x')
+    plan = plan_build(read_manifest(registry(ROWS[:2])), output, profile='archive')
+    assert [plate.reason for plate in plan.plates] == [MISSING, None]
+    plan = plan_build(read_manifest(registry(ROWS[:2])), output, profile='archive', verify=True)
+    assert [plate.reason for plate in plan.plates] == [MISSING, MISSING]
+
+
+def test_profile_change_renders_everything(tmp_path, registry):
+    output = tmp_path.joinpath('out')
+    build(registry(ROWS), output)
+    plan = plan_build(read_manifest(registry(ROWS)), output, profile='compact')
+    assert len(plan.render) == len(ROWS)
+
+
+def test_failed_render_is_retried(tmp_path, registry, monkeypatch):
+    from address_plate import incremental
+
+    output = tmp_path.joinpath('out')
+    build(registry(ROWS), output)
+    first = files(output)
+
+    rows = list(ROWS)
+    rows[0] = 'number,,,,12,10,14А,'
+    render_result = incremental.render_result
+
+    def failing(spec, index=None, profile=None):
+        if spec.number == '12':
+            return RenderResult(index, spec, None, None, ValueError('render failed'))
+        return render_result(spec, index, profile)
+
+    monkeypatch.setattr(incremental, 'render_result', failing)
+    plan = plan_build(read_manifest(registry(rows)), output, profile='archive')
+    results = list(build_incremental(plan, output, profile='archive'))
+    assert [(result.row, str(result.error)) for result in results if result.error is not None] == \
+        [(plan.plates[0].row, 'render failed')]
+    # старая табличка 12 не остается под видом новой
+    assert not output.joinpath('12.pdf').exists()
+    assert '12.pdf' not in load_build_manifest(output)['files']
+
+    monkeypatch.setattr(incremental, 'render_result', render_result)
+    plan = build(registry(rows), output)
+    assert [plate.reason for plate in plan.plates] == [NEW] + [None] * (len(ROWS) - 1)
+    assert files(output)['12.pdf'] != first['12.pdf']
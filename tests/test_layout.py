@@ -0,0 +1,207 @@
+import json
+
+import pytest
+
+from address_plate.layout import (DEFAULT_LAYOUT, Font, LayoutError, SlashSize, compile_layout, load_layout, pt)
+
+# pdf_maker.SIZES_PT до compile_layout, без abstract_* и *_max_char (теперь ABSTRACT_SIZE и max_lines)
+SIZES_PT = {
+    'thin_round_radius': pt(15.0),
+    'wide_round_radius': pt(22.5),
+
+    'thin_margin': pt(40),
+    'thin_height': pt(215),
+
+    'wide_margin': pt(60),
+    'wide_height': pt(320),
+
+    'thin_street_type_font': {'face': 'regular', 'size': 90.0},
+    'thin_street_type_bl': pt(215-173),
+    'thin_street_name_font': {'face': 'semi-bold', 'size': 220.0},
+    'thin_street_name_bl': pt(215-94),
+    'thin_street_line_width': 4.0,
+    'thin_street_line_bl': pt(215-62),
+    'thin_street_translit_font': {'face': 'regular', 'size': 90.0},
+    'thin_street_translit_bl': pt(215-24),
+
+    'wide_street_type_font': {'face': 'regular', 'size': 135.0},
+    'wide_street_type_bl': pt(320-260),
+    'wide_street_name_font': {'face': 'semi-bold', 'size': 330.0},
+    'wide_street_name_bl': pt(320-140),
+    'wide_street_line_width': 6.0,
+    'wide_street_line_bl': pt(320-92),
+    'wide_street_translit_font': {'face': 'regular', 'size': 135.0},
+    'wide_street_translit_bl': pt(320-36),
+
+    'thin_house_number_width': (pt(215), pt(280), pt(380), pt(440), pt(520)),
+    'thin_house_number_bl': pt(215-50),
+    'thin_house_number_font_lvl1': {'face': 'semi-bold', 'size': 480.0},
+    'thin_house_number_font_lvl2c': {'face': 'bold', 'size': 300.0},
+    'thin_house_number_font_lvl2s': {'face': 'semi-bold', 'size': 300.0},
+    'thin_house_number_font_lvl3': {'face': 'semi-bold', 'size': 220.0},
+    'thin_house_number_slash_size': (pt(12), 75, pt(80), pt(6)),
+
+    'wide_house_number_width': (pt(320), pt(420), pt(565), pt(640), pt(720)),
+    'wide_house_number_bl': pt(320-75),
+    'wide_house_number_font_lvl1': {'face': 'semi-bold', 'size': 720.0},
+    'wide_house_number_font_lvl2c': {'face': 'bold', 'size': 450.0},
+    'wide_house_number_font_lvl2s': {'face': 'bold', 'size': 450.0},
+    'wide_house_number_font_lvl3': {'face': 'bold', 'size': 330.0},
+    'wide_house_number_slash_size': (pt(20), 75, pt(125), pt(9)),
+
+    'thin_house_number_arrow_width': (pt(215), pt(215), pt(280), pt(340), pt(440)),
+    'thin_house_number_arrow_bl': pt(215 - 90),
+    'thin_house_number_arrow_font_lvl1': {'face': 'semi-bold', 'size': 380.0},
+    'thin_house_number_arrow_font_lvl2c': {'face': 'bold', 'size': 240.0},
+    'thin_house_number_arrow_font_lvl2s': {'face': 'bold', 'size': 240.0},
+    'thin_house_number_arrow_font_lvl3': {'face': 'semi-bold', 'size': 140.0},
+    'thin_house_number_arrow_slash_size': (pt(10), 75, pt(65), pt(5)),
+    'thin_house_number_arrow_arrow_bl': pt(215-62),
+    'thin_house_number_arrow_arrow_size': {'line_width': 4, 'length': pt(9.8),
+                                           'half_height': pt(8.5/2), 'half_space': pt(15/2)},
+    'thin_house_number_arrow_number_bl': pt(215-24),
+    'thin_house_number_arrow_number_font_lvl_a1': {'face': 'regular', 'size': 90},
+    'thin_house_number_arrow_number_font_lvl_a2c': {'face': 'semi-bold', 'size': 50},
+
+    'wide_house_number_arrow_width': (pt(320), pt(320), pt(420), pt(510), pt(660)),
+    'wide_house_number_arrow_bl': pt(320 - 135),
+    'wide_house_number_arrow_font_lvl1': {'face': 'semi-bold', 'size': 570.0},
+    'wide_house_number_arrow_font_lvl2c': {'face': 'bold', 'size': 330.0},
+    'wide_house_number_arrow_font_lvl2s': {'face': 'bold', 'size': 330.0},
+    'wide_house_number_arrow_font_lvl3': {'face': 'bold', 'size': 210.0},
+    'wide_house_number_arrow_slash_size': (pt(12), 75, pt(98), pt(7.5)),
+    'wide_house_number_arrow_arrow_bl': pt(320-94),
+    'wide_house_number_arrow_arrow_size': {'line_width': 6, 'length': pt(18.8),
+                                           'half_height': pt(14.8/2), 'half_space': pt(22.5/2)},
+    'wide_house_number_arrow_number_bl': pt(320-37),
+    'wide_house_number_arrow_number_font_lvl_a1': {'face': 'regular', 'size': 135},
+    'wide_house_number_arrow_number_font_lvl_a2c': {'face': 'semi-bold', 'size': 75},
+
+    'thin_vertical_width': pt(360),
+    'thin_vertical_height': pt(480),
+    'thin_vertical_margin': pt(36),
+    'thin_vertical_street_type_font': {'face': 'regular', 'size': 65.0},
+    'thin_vertical_street_type_bl': pt(36.0) + 32.625,
+    'thin_vertical_street_name_font': {'face': 'semi-bold', 'size': 110.0, 'leading': 120.0},
+    'thin_vertical_street_name_translate': pt(18) + 77.984375,
+    'thin_vertical_street_line_width': pt(2.0),
+    'thin_vertical_street_line_translate': pt(24.0),
+    'thin_vertical_street_translit_font': {'face': 'regular', 'size': 65.0, 'leading': 78.0},
+    'thin_vertical_street_translit_translate': pt(24) + 32.625,
+    'thin_vertical_house_number_bl': pt(480 - 48),
+    'thin_vertical_house_number_font_lvl1': {'face': 'semi-bold', 'size': 540.0},
+    'thin_vertical_house_number_font_lvl2c': {'face': 'bold', 'size': 312.0},
+    'thin_vertical_house_number_font_lvl2s': {'face': 'bold', 'size': 312.0},
+    'thin_vertical_house_number_font_lvl3': {'face': 'bold', 'size': 220.0},
+    'thin_vertical_house_number_slash_size': (pt(12), 75, pt(80), pt(6)),
+
+    'wide_vertical_width': pt(540),
+    'wide_vertical_height': pt(720),
+    'wide_vertical_margin': pt(54),
+    'wide_vertical_street_type_font': {'face': 'regular', 'size': 100.0},
+    'wide_vertical_street_type_bl': pt(54.0) + 50.203125,
+    'wide_vertical_street_name_font': {'face': 'semi-bold', 'size': 165.0, 'leading': 180.0},
+    'wide_vertical_street_name_translate': pt(18) + 116.984375,
+    'wide_vertical_street_line_width': pt(3.0),
+    'wide_vertical_street_line_translate': pt(36.0),
+    'wide_vertical_street_translit_font': {'face': 'regular', 'size': 100.0, 'leading': 120.0},
+    'wide_vertical_street_translit_translate': pt(57.0),
+    'wide_vertical_house_number_bl': pt(720 - 72),
+    'wide_vertical_house_number_font_lvl1': {'face': 'semi-bold', 'size': 810.0},
+    'wide_vertical_house_number_font_lvl2c': {'face': 'bold', 'size': 470.0},
+    'wide_vertical_house_number_font_lvl2s': {'face': 'bold', 'size': 470.0},
+    'wide_vertical_house_number_font_lvl3': {'face': 'bold', 'size': 330.0},
+    'wide_vertical_house_number_slash_size': (pt(12), 75, pt(80), pt(6)),
+}
+
+
+def old_sizes(variant) -> dict:
+    """ скомпилированный вариант под ключами SIZES_PT
+
+    """
+    name = variant.name
+    sizes = {f'{name}_round_radius': variant.radius, f'{name}_margin': variant.margin,
+             f'{name}_height': variant.height}
+    street = variant.street
+    for key in ('type', 'name', 'translit'):
+        sizes[f'{name}_street_{key}_font'] = getattr(street, key).font
+        sizes[f'{name}_street_{key}_bl'] = getattr(street, key).baseline
+    sizes[f'{name}_street_line_width'], sizes[f'{name}_street_line_bl'] = street.line
+
+    def number(prefix, layout, widths=True):
+        if widths:
+            sizes[f'{prefix}_width'] = layout.widths
+        sizes[f'{prefix}_bl'] = layout.baseline
+        for level, font in layout.fonts._asdict().items():
+            sizes[f'{prefix}_font_{level}'] = font
+        sizes[f'{prefix}_slash_size'] = layout.slash
+
+    number(f'{name}_house_number', variant.number)
+    number(f'{name}_house_number_arrow', variant.number_arrow)
+    arrow = variant.arrow
+    sizes[f'{name}_house_number_arrow_arrow_bl'] = arrow.baseline
+    sizes[f'{name}_house_number_arrow_arrow_size'] = arrow.size._asdict()
+    sizes[f'{name}_house_number_arrow_number_bl'] = arrow.number_baseline
+    sizes[f'{name}_house_number_arrow_number_font_lvl_a1'] = arrow.lvl_a1
+    sizes[f'{name}_house_number_arrow_number_font_lvl_a2c'] = arrow.lvl_a2c
+
+    vertical = variant.vertical
+    prefix = f'{name}_vertical'
+    sizes[f'{prefix}_width'], sizes[f'{prefix}_height'] = vertical.width, vertical.height
+    sizes[f'{prefix}_margin'] = vertical.margin
+    sizes[f'{prefix}_street_type_font'] = vertical.type.font
+    sizes[f'{prefix}_street_type_bl'] = vertical.type.offset
+    for key in ('name', 'translit'):
+        sizes[f'{prefix}_street_{key}_font'] = getattr(vertical, key).font
+        sizes[f'{prefix}_street_{key}_translate'] = getattr(vertical, key).offset
+    sizes[f'{prefix}_street_line_width'], sizes[f'{prefix}_street_line_translate'] = vertical.line
+    number(f'{prefix}_house_number', vertical.number, widths=False)
+    return sizes
+
+
+def as_compiled(key, value):
+    if key.endswith('_slash_size'):
+        return SlashSize(*value)
+    if isinstance(value, dict) and 'face' in value:
+        return Font(**value)
+    return value
+
+
+def test_default_layout_matches_sizes_pt():
+    """ те же числа до бита: pdf по умолчанию не меняется
+
+    """
+    layout = compile_layout(DEFAULT_LAYOUT, ('regular', 'semi-bold', 'bold'))
+    sizes = {}
+    for variant in layout.variants.values():
+        sizes.update(old_sizes(variant))
+    assert sizes == {key: as_compiled(key, value) for key, value in SIZES_PT.items()}
+    assert layout.variant('thin').number.width(9) == pt(520)
+    assert layout.variant('wide').vertical.name.max_lines == 3
+
+
+@pytest.mark.parametrize('change, message', [
+    (lambda thin: thin.update(margin='40 cm'), "thin.margin: bad length '40 cm'"),
+    (lambda thin: thin['number']['fonts']['lvl1'].update(face='italic'), 'thin.number.fonts.lvl1.face: unknown font'),
+    (lambda thin: thin['vertical']['name']['font'].pop('leading'), 'thin.vertical.name.font: missing leading'),
+    (lambda thin: thin['street'].update(extra=1), 'thin.street: unknown keys extra'),
+    (lambda thin: thin.update(radius='200mm'), 'thin.radius: more than half'),
+])
+def test_layout_errors(change, message):
+    description = json.loads(json.dumps(DEFAULT_LAYOUT))
+    change(description['thin'])
+    with pytest.raises(LayoutError, match=message):
+        compile_layout(description, ('regular', 'semi-bold', 'bold'))
+
+
+def test_load_layout_over_default(tmp_path):
+    wide = json.loads(json.dumps(DEFAULT_LAYOUT['wide']))
+    wide['margin'] = '70mm'
+    path = tmp_path.joinpath('layout.json')
+    path.write_text(json.dumps({'wide': wide, 'street': DEFAULT_LAYOUT['thin']}), encoding='utf-8')
+    layout = load_layout(path)
+    assert list(layout.variants) == ['thin', 'wide', 'street']
+    assert layout.variant('wide').margin == pt(70)
+    assert layout.variant('street').street == layout.variant('thin').street
+    with pytest.raises(LayoutError, match="no layout variant 'huge'"):
+        layout.variant('huge')
@@ -0,0 +1,96 @@
+import itertools
+import random
+
+import pytest
+
+from address_plate.glyph_cache import GlyphMetrics
+from address_plate.line_breaking import break_lines, break_points, line_widths
+
+
+def metrics(char: str) -> GlyphMetrics:
+    """ моноширинный шрифт: буква 10pt с ink до 8pt, пробел 5pt без ink, дефис 6pt
+
+    """
+    if char == ' ':
+        return GlyphMetrics((5.0, 0.0), None)
+    if char == '-':
+        return GlyphMetrics((6.0, 0.0), (1.0, 4.0, 5.0, 5.0))
+    return GlyphMetrics((10.0, 0.0), (1.0, 0.0, 8.0, 10.0))
+
+
+def width(line: str) -> float:
+    """ правый край ink последнего видимого символа
+
+    """
+    x = right = 0.0
+    for char in line:
+        glyph = metrics(char)
+        if glyph.extents:
+            right = x + glyph.extents[2]
+        x += glyph.advance[0]
+    return right
+
+
+def test_break_points():
+    text = ' Омеляновича-Павленка  вул -x'
+    assert [text[start:end] for start, end in break_points(text)] == ['Омеляновича-', 'Павленка', 'вул', '-x']
+    assert break_points('   ') == []
+
+
+def test_line_widths():
+    text = 'aa bbb-cc'
+    pieces = break_points(text)
+    widths = line_widths(text, pieces, metrics)
+    for i, j in itertools.combinations_with_replacement(range(len(pieces)), 2):
+        assert widths[i][j - i] == width(text[pieces[i][0]:pieces[j][1]])
+    assert widths[0] == [18.0, 60.0, 79.0]
+
+
+@pytest.mark.parametrize('text, room, max_lines, expected', [
+    ('aa bb cc', 100.0, 3, ['aa bb cc']),
+    # не жадно: вторая строка короче первой жадной 'aa bb'
+    ('aa bb c', 43.0, 3, ['aa', 'bb c']),
+    ('aa bb cc', 30.0, 3, ['aa', 'bb', 'cc']),
+    # не влезает в 2 строки: самая узкая самая широкая строка
+    ('aaaa b cc', 20.0, 2, ['aaaa', 'b cc']),
+    ('Омеляновича-Павленка', 150.0, 3, ['Омеляновича-', 'Павленка']),
+    # слово длиннее места остается целым
+    ('aaaaaaaa', 20.0, 3, ['aaaaaaaa']),
+    ('', 20.0, 3, ['']),
+])
+def test_break_lines(text, room, max_lines, expected):
+    lines, widest = break_lines(text, metrics, room, max_lines)
+    assert lines == expected
+    assert widest == max(map(width, lines))
+
+
+def brute_force(text: str, room: float, max_lines: int) -> tuple:
+    """ перебор всех разбиений: (число строк, самая широкая) по правилу break_lines
+
+    """
+    pieces = break_points(text)
+    best = {}
+    for k in range(1, min(max_lines, len(pieces)) + 1):
+        for cuts in itertools.combinations(range(1, len(pieces)), k - 1):
+            bounds = (0,) + cuts + (len(pieces),)
+            widest = max(width(text[pieces[i][0]:pieces[j - 1][1]]) for i, j in zip(bounds, bounds[1:]))
+            best[k] = min(best.get(k, widest), widest)
+    for k in sorted(best):
+        if best[k] <= room:
+            return k, best[k]
+    widest = min(best.values())
+    return min(k for k in best if best[k] == widest), widest
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_break_lines_is_optimal(seed):
+    rng = random.Random(seed)
+    words = [''.join(rng.choice('ab') for _ in range(rng.randint(1, 6))) for _ in range(rng.randint(1, 7))]
+    text = ' '.join(word if rng.random() < 0.7 else word + '-' + word for word in words)
+    room = rng.uniform(10.0, 200.0)
+    max_lines = rng.randint(1, 4)
+    lines, widest = break_lines(text, metrics, room, max_lines)
+    assert (len(lines), widest) == brute_force(text, room, max_lines)
+    assert widest == max(map(width, lines))
+    # переносы только на местах break_points: пробел пропадает, дефис остается
+    assert ' '.join(lines).replace('- ', '-') == text
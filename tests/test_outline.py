@@ -0,0 +1,93 @@
+import pickle
+
+import pytest
+
+from address_plate.glyph_cache import PATH_MOVE_TO, PATH_LINE_TO, PATH_CURVE_TO, PATH_CLOSE_PATH
+from address_plate.outline import Outline, concatenate
+
+PATH = [
+    (PATH_MOVE_TO, (0.0, 0.0)),
+    (PATH_LINE_TO, (10.0, 0.0)),
+    (PATH_CURVE_TO, (12.0, 1.0, 12.0, 9.0, 10.0, 10.0)),
+    (PATH_CLOSE_PATH, ()),
+    (PATH_MOVE_TO, (2.5, 2.5)),
+    (PATH_LINE_TO, (7.5, 2.5)),
+    (PATH_CLOSE_PATH, ()),
+]
+
+
+@pytest.fixture
+def outline():
+    return Outline.from_path(PATH, (0.0, 0.0, 12.0, 10.0), (14.0, 0.0))
+
+
+def test_from_path(outline):
+    assert list(outline) == PATH
+    assert len(outline) == len(PATH) and outline
+    assert not Outline() and list(Outline()) == []
+    assert [outline[i] for i in range(len(PATH))] == PATH
+    assert outline[-1] == PATH[-1] and outline[-3] == PATH[-3]
+    assert outline.offset(3) == 10 and outline.offset(len(PATH)) == len(outline.coords) == 14
+    assert outline.nbytes == len(PATH) + 14 * 8
+
+
+@pytest.mark.parametrize('start, stop', [(0, 7), (2, 5), (4, 7), (3, 3), (5, 2), (-3, None), (None, -4), (0, 100)])
+def test_slice(outline, start, stop):
+    piece = outline[start:stop]
+    assert list(piece) == PATH[start:stop]
+    assert len(piece) == len(PATH[start:stop])
+    assert (piece.extents, piece.advance) == (None, (0.0, 0.0))
+    # срез второго уровня и доступ по индексу у среза
+    assert list(piece[1:]) == PATH[start:stop][1:]
+    if piece:
+        assert piece[-1] == PATH[start:stop][-1]
+
+
+def test_slice_shares_arrays(outline):
+    piece = outline[2:5]
+    assert isinstance(piece.ops, memoryview) and isinstance(piece.coords, memoryview)
+    assert piece.coords.obj is outline.coords
+    with pytest.raises(ValueError, match='step'):
+        outline[::2]
+
+
+@pytest.mark.parametrize('part', [slice(None), slice(2, 5), slice(3, 3)])
+def test_pickle(outline, part):
+    piece = outline[part]
+    restored = pickle.loads(pickle.dumps(piece))
+    assert restored == piece
+    assert list(restored) == list(piece)
+    assert (restored.extents, restored.advance) == (piece.extents, piece.advance)
+    # копия на своих массивах, не memoryview
+    assert type(restored.ops).__name__ == type(restored.coords).__name__ == 'array'
+
+
+def test_eq(outline):
+    assert outline == Outline.from_path(PATH, (0.0, 0.0, 12.0, 10.0), (14.0, 0.0))
+    assert outline[0:7] != outline  # без extents и advance
+    assert outline != Outline.from_path(PATH[:-1], (0.0, 0.0, 12.0, 10.0), (14.0, 0.0))
+    assert outline.__eq__(PATH) is NotImplemented
+    with pytest.raises(TypeError):
+        hash(outline)
+
+
+def test_transformed(outline):
+    moved = outline.transformed(2.0, 1.0, -1.0)
+    assert moved.ops is outline.ops
+    assert list(moved) == [(type_op, tuple(v * 2.0 + (1.0 if i % 2 == 0 else -1.0) for i, v in enumerate(points)))
+                           for type_op, points in PATH]
+    assert (moved.extents, moved.advance) == ((1.0, -1.0, 25.0, 19.0), (28.0, 0.0))
+    # отрицательный масштаб меняет края местами
+    assert outline.transformed(-1.0).extents == (-12.0, -10.0, -0.0, -0.0)
+    assert list(outline) == PATH
+    assert list(outline[2:4].transformed(1.0, 1.0, 1.0)) == [(PATH_CURVE_TO, (13.0, 2.0, 13.0, 10.0, 11.0, 11.0)),
+                                                              (PATH_CLOSE_PATH, ())]
+
+
+def test_concatenate(outline):
+    text = concatenate([(outline, 0.0, 0.0), (outline[4:], 14.0, 0.0), (outline[:2], 0.0, 5.0)],
+                       (0.0, 0.0, 21.5, 10.0), (28.0, 0.0))
+    assert list(text) == PATH + [(PATH_MOVE_TO, (16.5, 2.5)), (PATH_LINE_TO, (21.5, 2.5)), (PATH_CLOSE_PATH, ()),
+                                 (PATH_MOVE_TO, (0.0, 5.0)), (PATH_LINE_TO, (10.0, 5.0))]
+    assert (text.extents, text.advance) == ((0.0, 0.0, 21.5, 10.0), (28.0, 0.0))
+    assert concatenate([]) == Outline()
@@ -0,0 +1,117 @@
+import random
+
+import pytest
+from reportlab.pdfgen.pathobject import PDFPathObject
+
+from address_plate import path_code as path_code_module
+from address_plate.glyph_cache import PATH_MOVE_TO, PATH_LINE_TO, PATH_CURVE_TO, PATH_CLOSE_PATH
+from address_plate.outline import Outline
+from address_plate.path_code import format_numbers, glyph_code, path_code
+from address_plate.pdf_maker import add_path, path_object
+
+DIGITS = (None, 0, 1, 2, 3)
+
+
+def reference(pieces, digits, scale=1.0, dx=0.0, dy=0.0) -> str:
+    """ то же через PDFPathObject и fp_str, как рисовал add_path до path_code
+
+    """
+    path = PDFPathObject()
+    for outline, x, y in pieces:
+        moved = []
+        for type_op, points in outline:
+            points = tuple((v + (y if i % 2 else x)) * scale + (dy if i % 2 else dx) for i, v in enumerate(points))
+            moved.append((type_op, points))
+        add_path(path, moved, digits)
+    return path.getCode()
+
+
+def random_value(rng: random.Random) -> float:
+    kind = rng.random()
+    if kind < 0.05:
+        return rng.choice((0.0, -0.0, 1e-9, -1e-9, 0.5, -0.5, 1e-7, 0.004999, 0.005, -0.005))
+    if kind < 0.1:
+        return rng.choice((1.0, 10.0, 99.99999, 100.0, 9999.996, 12345.678, -123456.789, 1e5))
+    if kind < 0.15:
+        return round(rng.uniform(-500, 500), rng.randint(0, 4))
+    return rng.uniform(-1, 1) * 10 ** rng.uniform(-3, 4)
+
+
+def random_outline(rng: random.Random) -> Outline:
+    path = []
+    for _ in range(rng.randint(1, 4)):
+        path.append((PATH_MOVE_TO, (random_value(rng), random_value(rng))))
+        for _ in range(rng.randint(0, 8)):
+            if rng.random() < 0.5:
+                path.append((PATH_LINE_TO, (random_value(rng), random_value(rng))))
+            else:
+                path.append((PATH_CURVE_TO, tuple(random_value(rng) for _ in range(6))))
+        if rng.random() < 0.8:
+            path.append((PATH_CLOSE_PATH, ()))
+    return Outline.from_path(path)
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def numpy_mode(request, monkeypatch):
+    """ чистый python и numpy (со всех длин строки), если numpy установлен
+
+    """
+    if request.param == 'numpy':
+        numpy = pytest.importorskip('numpy')
+        monkeypatch.setattr(path_code_module, '_numpy', numpy)
+        monkeypatch.setattr(path_code_module, 'STRING_NUMPY_MIN', 1)
+    else:
+        monkeypatch.setattr(path_code_module, '_numpy', False)
+    return request.param
+
+
+@pytest.mark.parametrize('digits', DIGITS)
+@pytest.mark.parametrize('seed', range(20))
+def test_path_code_as_pdf_path_object(seed, digits, numpy_mode):
+    rng = random.Random(seed)
+    outlines = [random_outline(rng) for _ in range(rng.randint(1, 6))]
+    pieces = [(outline, rng.choice((0.0, random_value(rng))), rng.choice((0.0, random_value(rng))))
+              for outline in outlines]
+    transform = rng.choice(((1.0, 0.0, 0.0), (rng.uniform(0.1, 3), random_value(rng), random_value(rng))))
+
+    expected = reference(pieces, digits, *transform)
+    code = path_code([(glyph_code(outline), x, y) for outline, x, y in pieces], digits, *transform)
+    assert path_object(code).getCode() == expected
+
+    # (type_op, points) вместо Outline - тот же результат
+    code = path_code([(glyph_code(list(outline)), x, y) for outline, x, y in pieces], digits, *transform)
+    assert path_object(code).getCode() == expected
+
+
+@pytest.mark.parametrize('digits', DIGITS)
+def test_format_numbers_edges(digits, numpy_mode):
+    from reportlab.lib.rl_accel import fp_str
+
+    values = [0.0, -0.0, 1e-9, -1e-9, 1e-7, -1e-7, 0.5, -0.5, 0.05, 0.0049999, 0.005, 0.015, 1.5, 2.5, 9.9999999,
+              10.0, 99.999999, 100.0000001, 999.99999, 9999.99999, 12345.6785, -0.004, 1e5 - 1e-3, 3.0]
+    expected = fp_str([round(v, digits) for v in values] if digits is not None else values)
+    assert format_numbers(values, digits) == expected
+    # число >= 1e5 переводит всю строку на fp_str
+    assert format_numbers(values + [123456.5], digits) == \
+        fp_str([round(v, digits) for v in values + [123456.5]] if digits is not None else values + [123456.5])
+
+
+def test_empty():
+    assert path_code([]) == ''
+    assert path_code([(glyph_code(Outline()), 1.0, 2.0)]) == ''
+    close = Outline.from_path([(PATH_CLOSE_PATH, ())])
+    assert path_code([(glyph_code(close), 1.0, 2.0)], 2) == 'h'
+
+
+def test_glyph_form_names_by_size(plate_fonts):
+    import io
+
+    from reportlab.pdfgen import canvas
+
+    from address_plate.pdf_maker import get_glyph, glyph_form
+
+    work_canvas = canvas.Canvas(io.BytesIO())
+    # 37.5 и 37.5000001 одинаковы в {:g}, но это разные глифы
+    names = {glyph_form(work_canvas, 'bold', size, '1', get_glyph('bold', size, '1'))
+             for size in (37.5, 37.5000001, 37.5, 40, 40.0)}
+    assert len(names) == 3
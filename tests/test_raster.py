@@ -0,0 +1,62 @@
+import pytest
+
+from address_plate import pdf_maker
+from address_plate.plate_spec import PlateSpec, make_plate
+from address_plate.raster import RasterCanvas, _color
+
+WHITE = _color(pdf_maker.COLOR_WHITE)
+DARK_BLUE = _color(pdf_maker.COLOR_DARK_BLUE)
+
+
+class _Context:
+    """ cairo.Context, который ничего не рисует
+
+    """
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class RecordingCanvas(RasterCanvas):
+    """ RasterCanvas без cairo: цвет каждой заливки
+
+    """
+
+    def __init__(self):
+        super().__init__(_Context())
+        self.fills = []
+
+    def drawPath(self, path, stroke=1, fill=0):
+        if fill:
+            self.fills.append(('path', self.fill_color))
+
+    def draw_glyphs(self, text, font):
+        self.fills.append((text, self.fill_color))
+
+
+@pytest.mark.parametrize('spec', [
+    PlateSpec('number', 'thin', None, None, None, '12', '10', '14', None),
+    PlateSpec('name', 'wide', 'вулиця', 'Хорива', 'Khoryva vulytsia', None, None, None, None),
+    PlateSpec('vertical', 'thin', 'вулиця', 'Хорива', 'Khoryva vulytsia', '25/3А', None, None, None),
+])
+def test_text_is_white(spec, plate_fonts):
+    work_canvas = RecordingCanvas()
+    make_plate(spec).draw(work_canvas)
+    texts = [(text, color) for text, color in work_canvas.fills if text != 'path']
+    assert texts
+    assert all(color == WHITE for _, color in texts), texts
+    assert work_canvas.fills[0] == ('path', DARK_BLUE)  # фон
+
+
+def test_png_glyph_pixels_white(plate_fonts):
+    cairo = pytest.importorskip('cairo')
+    from address_plate.raster import plate_png
+
+    png, _ = plate_png(make_plate(PlateSpec('number', 'thin', None, None, None, '88', None, None, None)), dpi=36)
+    surface = cairo.ImageSurface.create_from_png(png)
+    data = surface.get_data()
+    stride, width, height = surface.get_stride(), surface.get_width(), surface.get_height()
+    pixels = {bytes(data[y * stride + 4 * x:y * stride + 4 * x + 4]) for y in range(height) for x in range(width)}
+    # ARGB32 little-endian: b, g, r, a; черного текста быть не должно, белый есть
+    assert b'\xff\xff\xff\xff' in pixels
+    assert b'\x00\x00\x00\xff' not in pixels
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from urllib.parse import quote
+
+import pytest
+
+from address_plate import server
+from address_plate.server import PlateServer
+
+
+def request(plate_server: PlateServer, *raw: bytes) -> list:
+    """ запросы одним соединением к PlateServer на свободном порту
+
+    :return: [(status, headers, body), ...]
+    """
+
+    async def run():
+        plate_server._slots = asyncio.Semaphore(plate_server.max_concurrency)
+        listener = await asyncio.start_server(plate_server.handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        responses = []
+        async with listener:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            for data in raw:
+                writer.write(data)
+                await writer.drain()
+                head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+                headers = dict(line.split(': ', 1) for line in head[1:] if line)
+                body = await reader.readexactly(int(headers['Content-Length']))
+                responses.append((int(head[0].split(' ')[1]), headers, body))
+            writer.close()
+        return responses
+
+    return asyncio.run(run())
+
+
+def get(path: str) -> bytes:
+    return f'GET {quote(path, safe="/?=&")} HTTP/1.1\r\nHost: test\r\n\r\n'.encode()
+
+
+def post(path: str, body: bytes, content_type: str = 'application/x-www-form-urlencoded') -> bytes:
+    return (f'POST {path} HTTP/1.1\r\nHost: test\r\nContent-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n').encode() + body
+
+
+@pytest.fixture
+def plate_server(plate_fonts):
+    plate_server = PlateServer(workers=1, executor='thread', timeout=10)
+    plate_server.start_executor()
+    yield plate_server
+    plate_server.shutdown()
+
+
+def test_render(plate_server):
+    responses = request(plate_server,
+                        get('/number?number=12&left=10&right=14А'),
+                        post('/name', 'type=вулиця&name=Хорива&translit=Khoryva vulytsia'.encode()),
+                        post('/vertical', json.dumps({'type': 'вулиця', 'name': 'Хорива', 'translit': 'Khoryva',
+                                                      'number': '25', 'profile': 'archive'}).encode(),
+                             'application/json'),
+                        get('/health'))
+    for status, headers, body in responses[:3]:
+        assert status == 200
+        assert headers['Content-Type'] == 'application/pdf'
+        assert body.startswith(b'%PDF-')
+    assert "filename*=UTF-8''12.pdf" in responses[0][1]['Content-Disposition']
+    status, _, body = responses[3]
+    assert status == 200 and json.loads(body)['rendered'] == 3
+
+
+@pytest.mark.parametrize('raw, status, message', [
+    (get('/number?number=12Z'), 400, b"number: bad house number '12Z'"),
+    (get('/number'), 400, b'number: missing number'),
+    (get('/name?type=a&name=b&translit=c&profile=bad'), 400, b'bad profile'),
+    (get('/number?number=12&format=gif'), 400, b'bad format'),
+    (get('/number?number=12&format=png&dpi=5000'), 400, b'dpi must be'),
+    (post('/number', b'{"number": ', 'application/json'), 400, b'bad JSON body'),
+    (post('/number', b'number=\xff\xfe'), 400, b'body is not UTF-8'),
+    (get('/nope'), 404, b'not found'),
+])
+def test_bad_request(plate_server, raw, status, message):
+    (got, _, body), = request(plate_server, raw)
+    assert got == status
+    assert body.startswith(message)
+
+
+def test_render_failure_is_500(plate_server, monkeypatch):
+    def broken(spec, index=None, profile=None, glyph_forms=False):
+        raise RuntimeError('worker died')
+
+    monkeypatch.setattr(server, 'render_result', broken)
+    # после 500 соединение живо, следующий запрос отвечает
+    responses = request(plate_server, get('/number?number=12'), get('/health'))
+    assert [status for status, _, _ in responses] == [500, 200]
+    assert responses[0][2] == b'internal error\n'
+    health = json.loads(responses[1][2])
+    assert (health['failed'], health['in_flight']) == (1, 0)